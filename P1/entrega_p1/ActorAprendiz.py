@@ -0,0 +1,153 @@
+import copy
+import threading
+import time
+
+import numpy as np
+from stable_baselines3.common.logger import configure
+
+# Entrenamiento de SAC con actor y aprendiz en paralelo. Con Entorno casi todo
+# el paso es esperar al periodo de control, asi que un hilo (actor) mueve el
+# robot con una copia de la politica y guarda transiciones en el replay buffer
+# del modelo, mientras otro (aprendiz) hace pasos de gradiente sin parar y de
+# vez en cuando publica los pesos nuevos al actor. torch suelta el GIL en los
+# calculos, asi que con hilos basta.
+
+
+class BufferCompartido:
+    """Replay buffer del modelo protegido con un lock para add/sample desde dos hilos"""
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.lock = threading.Lock()
+
+    def add(self, *args, **kwargs):
+        with self.lock:
+            self.buffer.add(*args, **kwargs)
+
+    def sample(self, *args, **kwargs):
+        with self.lock:
+            return self.buffer.sample(*args, **kwargs)
+
+    def size(self):
+        return self.buffer.size()
+
+    def __getattr__(self, nombre):
+        return getattr(self.buffer, nombre)
+
+
+class ActorAprendiz:
+
+    def __init__(self, modelo, entorno,
+                 publica_cada = 50,
+                 max_gradientes_por_paso = 20,
+                 informa_cada = 1000):
+        """
+        publica_cada: pasos de gradiente entre copias de pesos al actor.
+        max_gradientes_por_paso: tope de pasos de gradiente por transicion
+        recogida, para no sobreajustar un buffer casi vacio.
+        """
+        self.modelo = modelo
+        self.entorno = entorno
+        self.publica_cada = publica_cada
+        self.max_gradientes_por_paso = max_gradientes_por_paso
+        self.informa_cada = informa_cada
+
+        # el actor tiene su propia copia de la politica en cpu
+        self.politica_actor = copy.deepcopy(modelo.policy).to('cpu')
+        self.politica_actor.set_training_mode(False)
+        self.lock_pesos = threading.Lock()
+
+        self.pasos = 0
+        self.gradientes = 0
+        self.publicaciones = 0
+        self._terminado = threading.Event()
+        self._error = None
+
+    def _publica_pesos(self):
+        pesos = {clave: valor.detach().to('cpu') for clave, valor in self.modelo.policy.actor.state_dict().items()}
+        with self.lock_pesos:
+            self.politica_actor.actor.load_state_dict(pesos)
+        self.publicaciones += 1
+
+    def _accion(self, observacion):
+        """Accion del actor (sin escalar) y la misma escalada a [-1, 1] para el buffer"""
+        if self.pasos < self.modelo.learning_starts:
+            accion = self.entorno.action_space.sample()
+        else:
+            with self.lock_pesos:
+                accion, _ = self.politica_actor.predict(observacion, deterministic=False)
+        return accion, self.politica_actor.scale_action(accion)
+
+    def _actor(self, total_pasos):
+        try:
+            observacion, _ = self.entorno.reset()
+            # tambien para si el aprendiz falla o se interrumpe (entrena marca _terminado)
+            while self.pasos < total_pasos and not self._terminado.is_set():
+                accion, accion_buffer = self._accion(observacion)
+                siguiente, recompensa, terminated, truncated, info = self.entorno.step(accion)
+
+                info = dict(info, **{"TimeLimit.truncated": truncated and not terminated})
+                self.modelo.replay_buffer.add(
+                    {clave: np.asarray(valor)[None] for clave, valor in observacion.items()},
+                    {clave: np.asarray(valor)[None] for clave, valor in siguiente.items()},
+                    np.asarray(accion_buffer)[None],
+                    np.array([recompensa]),
+                    np.array([terminated or truncated]),
+                    [info])
+
+                self.pasos += 1
+                self.modelo.num_timesteps = self.pasos
+                self.modelo._current_progress_remaining = 1.0 - self.pasos / total_pasos
+
+                if terminated or truncated:
+                    observacion, _ = self.entorno.reset()
+                else:
+                    observacion = siguiente
+        except Exception as e:
+            self._error = e
+        finally:
+            self._terminado.set()
+
+    def _aprendiz(self):
+        modelo = self.modelo
+        while not self._terminado.is_set():
+            listo = modelo.replay_buffer.size() >= max(modelo.batch_size, modelo.learning_starts)
+            tope = self.max_gradientes_por_paso * self.pasos
+            if not listo or self.gradientes >= tope:
+                # esperamos a que el actor traiga mas datos
+                time.sleep(0.01)
+                continue
+
+            modelo.train(gradient_steps=1, batch_size=modelo.batch_size)
+            self.gradientes += 1
+
+            if self.gradientes % self.publica_cada == 0:
+                self._publica_pesos()
+            if self.gradientes % self.informa_cada == 0:
+                modelo.logger.record("asincrono/pasos_entorno", self.pasos)
+                modelo.logger.record("asincrono/gradientes", self.gradientes)
+                modelo.logger.dump(self.pasos)
+
+    def entrena(self, total_pasos):
+        """Equivalente a modelo.learn(total_pasos) con actor y aprendiz en paralelo"""
+        modelo = self.modelo
+        if getattr(modelo, '_logger', None) is None:
+            modelo.set_logger(configure(None, ["stdout"]))
+        buffer_original = modelo.replay_buffer
+        modelo.replay_buffer = BufferCompartido(buffer_original)
+
+        inicio = time.perf_counter()
+        actor = threading.Thread(target=self._actor, args=(total_pasos,), daemon=True)
+        actor.start()
+        try:
+            self._aprendiz()
+        finally:
+            self._terminado.set()
+            actor.join()
+            modelo.replay_buffer = buffer_original
+        if self._error is not None:
+            raise self._error
+
+        duracion = time.perf_counter() - inicio
+        print(f"[ActorAprendiz] {self.pasos} pasos de entorno, {self.gradientes} pasos de gradiente, "
+              f"{self.publicaciones} publicaciones de pesos en {duracion:.1f} s")
+        return modelo
@@ -17,7 +17,10 @@ class Entorno(gym.Env):
                 alpha3 = 0.00001,
                 alpha4 = 0.1,
                 sigma = 15,
-                velocidad_blob = 20):
+                velocidad_blob = 20,
+                backend = 'robobosim',
+                opciones_backend = None,
+                frecuencia_control = 1.0):
 
         self.pasos_por_episodio =  pasos_por_episodio
         self.alpha1 = alpha1
@@ -27,10 +30,23 @@ class Entorno(gym.Env):
         self.sigma = sigma
         self._velocidad_blob = velocidad_blob
 
-        self.robocop = RoboboAPI.init_Robobo()
+        if backend == 'cinematico':
+            # un unico mundo en proceso hace de robot y de simulador
+            self.robocop = self.sim = RoboboAPI.init_SimuladorCinematico(**(opciones_backend or {}))
+        else:
+            self.robocop = RoboboAPI.init_Robobo()
+            self.sim = RoboboAPI.init_RoboboSim()
         self.robocop.connect()
-        self.sim = RoboboAPI.init_RoboboSim()
         self.sim.connect()
+        # poses reales del robot y del objeto, cacheadas por paso
+        self.poses = RoboboAPI.init_ServicioPoses(self.sim)
+        # periodo de control con plazos fijos (en el cinematico con su tiempo simulado)
+        if backend == 'cinematico':
+            self.planificador = RoboboAPI.init_PlanificadorControl(frecuencia_control,
+                                                                   reloj=lambda: self.robocop.tiempo,
+                                                                   espera=self.robocop.wait)
+        else:
+            self.planificador = RoboboAPI.init_PlanificadorControl(frecuencia_control)
 
         self.velocidad_min = -2
         self.velocidad_max = 2
@@ -39,16 +55,17 @@ class Entorno(gym.Env):
         self.historial_recompensas = []  # Lista de listas
         self.historial_xy_objeto = []    # Lista de listas
         self.historial_xy_robot = []     # Lista de listas
+        self.historial_sensores = []     # Lista de listas de SensorSnapshot
         
         # Variables para el episodio actual
         self.recompensas_episodio = []
         self.xy_objeto_episodio = []
         self.xy_robot_episodio = []
+        self.sensores_episodio = []
 
         # inicializacion de las variables 
-        self._blob_xy = np.array([-1, -1], dtype=np.int32)
-        self._IR = np.array([0, 0], dtype=np.int32)
-        self._tamano_blob = np.array([-1], dtype=np.int32)
+        # blob_xy, IR y tamano_blob salen de una unica lectura por paso
+        self._sensores = RoboboAPI.SensorSnapshot.vacio(num_IR=2)
         self._velocidad = np.array([0, 0], dtype=np.float32)
         self.tamano_blob_max = 1000
         self.IR_max = 10000
@@ -74,10 +91,12 @@ class Entorno(gym.Env):
         """Convierte estado interno a observación"""
         
         return {
-            "blob_xy": self._blob_xy, 
-            "IR": self._IR,
-            "tamano_blob": self._tamano_blob, 
-            "velocidad": self._velocidad
+            "blob_xy": self._sensores.blob_xy, 
+            "IR": self._sensores.IR,
+            "tamano_blob": self._sensores.tamano_blob, 
+            # copia: step actualiza _velocidad en su sitio y la observacion anterior
+            # (la que va al replay buffer con la siguiente) no debe cambiar con ella
+            "velocidad": self._velocidad.copy()
         }
 
 
@@ -96,20 +115,23 @@ class Entorno(gym.Env):
             self.historial_recompensas.append(self.recompensas_episodio)
             self.historial_xy_objeto.append(self.xy_objeto_episodio)
             self.historial_xy_robot.append(self.xy_robot_episodio)
+            self.historial_sensores.append(self.sensores_episodio)
 
         # Limpiar listas del episodio actual
         self.recompensas_episodio = []
         self.xy_objeto_episodio = []
         self.xy_robot_episodio = []
+        self.sensores_episodio = []
 
         RoboboAPI.reset(self)
+        self.poses.nuevo_episodio()
+        self.planificador.reinicia()
 
         self.numero_de_pasos = 1
 
-        # los metodos hablan con robocop y lo meten en las variables
-        self._blob_xy = RoboboAPI._get_xy(self)
-        self._IR = RoboboAPI._get_IR(self)
-        self._tamano_blob = RoboboAPI._get_tamano_blob(self)
+        # una sola lectura de robocop para todos los sensores
+        self._sensores = RoboboAPI.lee_sensores(self)
+        self.sensores_episodio.append(self._sensores)
 
         # Guardar posición inicial del objeto
         self.xy_objeto_episodio.append(RoboboAPI._get_object_xz(self))
@@ -128,11 +150,12 @@ class Entorno(gym.Env):
         Método auxiliar para devolver la recompensa a partir de los atributos de la clase
         """
 
-        x = self._blob_xy[0]
+        x = self._sensores.blob_xy[0]
         d = RoboboAPI._distancia_a_blob(self)
-        atras = self._IR[1]
-        print(f'descentre: {(x-50)**2}, distancia_a_blob: {d}, atras: {max(0,atras-58)}, tamano_blob: {self._tamano_blob}')
-        return self.alpha1 * math.exp(-(x-50)**2) + self.alpha2 * math.exp(-(d/self.sigma)**2) - self.alpha3 * max(0,atras-58) + self.alpha4 * float(self._tamano_blob)
+        atras = self._sensores.IR[1]
+        tamano_blob = self._sensores.tamano_blob
+        print(f'descentre: {(x-50)**2}, distancia_a_blob: {d}, atras: {max(0,atras-58)}, tamano_blob: {tamano_blob}')
+        return self.alpha1 * math.exp(-(x-50)**2) + self.alpha2 * math.exp(-(d/self.sigma)**2) - self.alpha3 * max(0,atras-58) + self.alpha4 * float(tamano_blob[0])
 
     def step(self, accion):
         """Ejecuta un instante"""
@@ -144,7 +167,10 @@ class Entorno(gym.Env):
 
 
         self.robocop.moveWheels(self._velocidad[0] + dx, self._velocidad[1] + dy)
-        time.sleep(1)
+        # duerme solo lo que queda del periodo de control
+        self.planificador.espera_plazo()
+        # una sola consulta de poses al simulador por paso
+        self.poses.actualiza()
         self._velocidad[0] = np.clip(self._velocidad[0] + dx, self.velocidad_min, self.velocidad_max)
         self._velocidad[1] = np.clip(self._velocidad[1] + dy, self.velocidad_min, self.velocidad_max)
 
@@ -163,9 +189,8 @@ class Entorno(gym.Env):
         #print(self.recompensas_episodio)
         
         
-        self._blob_xy = RoboboAPI._get_xy(self)
-        self._IR = RoboboAPI._get_IR(self)
-        self._tamano_blob = RoboboAPI._get_tamano_blob(self)
+        self._sensores = RoboboAPI.lee_sensores(self)
+        self.sensores_episodio.append(self._sensores)
 
         # Guardar posiciones en el historial del episodio
         self.xy_objeto_episodio.append(RoboboAPI._get_object_xz(self))
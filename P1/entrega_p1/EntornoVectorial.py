@@ -0,0 +1,247 @@
+import math
+import numpy as np
+import gymnasium as gym
+from gymnasium.vector import AutoresetMode
+from gymnasium.vector.utils import batch_space
+from stable_baselines3.common.vec_env import VecEnv
+
+from SimuladorCinematico import (SimuladorCinematico, ANGULOS_IR, avanza_diferencial,
+                                 resuelve_colisiones, proyecta_blob, distancia_rayo, valor_IR)
+
+
+# N robots y N blobs con el backend cinematico en un unico entorno.
+# El estado esta en estructura de arrays (un array por magnitud, una fila por
+# robot) y cinematica, proyeccion del blob y recompensa se calculan de una vez
+# para todos. Observacion, accion y recompensa son las de Entorno (P1).
+class EntornoVectorial(gym.vector.VectorEnv):
+
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(self,
+                num_entornos = 8,
+                pasos_por_episodio = 10,
+                alpha1 = 0.5,
+                alpha2 = 0.5,
+                alpha3 = 0.00001,
+                alpha4 = 0.1,
+                sigma = 15,
+                velocidad_blob = 20,
+                periodo = 1.0,
+                opciones_backend = None):
+
+        self.num_envs = num_entornos
+        self.pasos_por_episodio = pasos_por_episodio
+        self.alpha1 = alpha1
+        self.alpha2 = alpha2
+        self.alpha3 = alpha3
+        self.alpha4 = alpha4
+        self.sigma = sigma
+        self._velocidad_blob = velocidad_blob
+        self.periodo = periodo
+
+        # el simulador escalar solo se usa como plantilla de parametros y estado inicial
+        self.mundo = SimuladorCinematico(**(opciones_backend or {}))
+        self.mundo.moveTiltTo(110, 100)  # igual que RoboboAPI.reset
+        self._inclinacion = math.radians(105.0 - self.mundo.tilt)
+        self._angulos_IR = np.radians([ANGULOS_IR["Front-C"], ANGULOS_IR["Back-C"]])
+
+        self.velocidad_min = -2
+        self.velocidad_max = 2
+        self.tamano_blob_max = 1000
+        self.IR_max = 10000
+
+        n = num_entornos
+        self.x = np.zeros(n)
+        self.z = np.zeros(n)
+        self.yaw = np.zeros(n)
+        self.x_obj = np.zeros(n)
+        self.z_obj = np.zeros(n)
+        self.velocidad = np.zeros((n, 2), dtype=np.float32)
+        self.numero_de_pasos = np.ones(n, dtype=np.int64)
+        self.blob_xy = np.full((n, 2), -1, dtype=np.int64)
+        self.IR = np.zeros((n, 2), dtype=np.int64)
+        self.tamano_blob = np.full((n, 1), -1, dtype=np.int64)
+
+        # mismo historial que Entorno, solo para el robot 0 (lo usan los Plots)
+        self.historial_recompensas = []
+        self.historial_xy_objeto = []
+        self.historial_xy_robot = []
+        self.recompensas_episodio = []
+        self.xy_objeto_episodio = []
+        self.xy_robot_episodio = []
+
+        # mismos espacios que Entorno
+        self.single_observation_space = gym.spaces.Dict(
+            {
+                "blob_xy": gym.spaces.Box(-1, 102, shape=(2,), dtype=int),
+                "IR": gym.spaces.Box(0, self.tamano_blob_max, shape=(2,), dtype=int),
+                "tamano_blob": gym.spaces.Box(0, 1000, shape=(1,), dtype=int),
+                "velocidad": gym.spaces.Box(self.velocidad_min, self.velocidad_max, shape=(2,), dtype=float)
+            }
+        )
+        self.single_action_space = gym.spaces.Box(self.velocidad_min, self.velocidad_max, shape=(2,), dtype=float)
+        self.observation_space = batch_space(self.single_observation_space, n)
+        self.action_space = batch_space(self.single_action_space, n)
+
+    def _get_observacion(self):
+        return {
+            "blob_xy": self.blob_xy.copy(),
+            "IR": self.IR.copy(),
+            "tamano_blob": self.tamano_blob.copy(),
+            "velocidad": self.velocidad.copy()
+        }
+
+    def _lee_sensores(self, mascara):
+        """Proyeccion del blob e IR de todos los robots, se guardan solo los de la mascara"""
+        m = self.mundo
+        visible, posx, posy, size = proyecta_blob(
+            self.x, self.z, self.yaw, self.x_obj, self.z_obj, self._inclinacion,
+            m.fov_h, m.fov_v, m.focal, m.radio_objeto, m.altura_camara, m.rango_vision)
+        blob_xy = np.where(visible[:, None], np.stack([posx, posy], axis=1), -1)
+        tamano_blob = np.where(visible, size, -1)[:, None]
+
+        distancias = distancia_rayo(self.x[:, None], self.z[:, None], self.yaw[:, None], self._angulos_IR,
+                                    self.x_obj[:, None], self.z_obj[:, None],
+                                    m.limite, m.radio_robot, m.radio_objeto)
+        IR = valor_IR(distancias, m.ir_max, m.decaimiento_ir, m.rango_ir)
+
+        self.blob_xy[mascara] = blob_xy[mascara]
+        self.tamano_blob[mascara] = tamano_blob[mascara]
+        self.IR[mascara] = IR[mascara]
+
+    def _reinicia(self, mascara):
+        x, z, yaw = self.mundo._inicial['robot']
+        x_obj, z_obj = self.mundo._inicial['objeto']
+        self.x[mascara], self.z[mascara], self.yaw[mascara] = x, z, yaw
+        self.x_obj[mascara], self.z_obj[mascara] = x_obj, z_obj
+        self.velocidad[mascara] = 0
+        self.numero_de_pasos[mascara] = 1
+        self._lee_sensores(mascara)
+
+        if mascara[0]:
+            if self.recompensas_episodio:
+                self.historial_recompensas.append(self.recompensas_episodio)
+                self.historial_xy_objeto.append(self.xy_objeto_episodio)
+                self.historial_xy_robot.append(self.xy_robot_episodio)
+            self.recompensas_episodio = []
+            self.xy_objeto_episodio = [np.array([self.x_obj[0], self.z_obj[0]])]
+            self.xy_robot_episodio = [np.array([self.x[0], self.z[0]])]
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self._reinicia(np.ones(self.num_envs, dtype=bool))
+        return self._get_observacion(), {}
+
+    def _integra(self, v_der, v_izq, segundos):
+        m = self.mundo
+        restante = float(segundos)
+        while restante > 1e-12:
+            dt = min(m.paso_integracion, restante)
+            x, z, self.yaw = avanza_diferencial(self.x, self.z, self.yaw, v_der, v_izq,
+                                                dt, m.mm_por_unidad, m.eje)
+            self.x, self.z = resuelve_colisiones(x, z, self.x_obj, self.z_obj, m.limite,
+                                                 m.radio_robot, m.radio_objeto)
+            restante -= dt
+
+    def _get_recompensa(self):
+        """Recompensa de Entorno: sensores del paso anterior y distancia con la pose nueva"""
+        x = self.blob_xy[:, 0]
+        atras = self.IR[:, 1]
+        d = np.hypot(self.x_obj - self.x, self.mundo.altura_objeto - self.mundo.altura_robot)
+        return (self.alpha1 * np.exp(-(x - 50.0) ** 2) +
+                self.alpha2 * np.exp(-(d / self.sigma) ** 2) -
+                self.alpha3 * np.maximum(0, atras - 58) +
+                self.alpha4 * self.tamano_blob[:, 0])
+
+    def _mueve_blobs(self):
+        if self._velocidad_blob == 0:
+            return
+        signos = self.np_random.choice([-1.0, 1.0], size=(self.num_envs, 2))
+        paso = signos * self._velocidad_blob
+        limite = self.mundo.limite
+        self.x_obj = np.clip(self.x_obj + paso[:, 0], -limite, limite)
+        self.z_obj = np.clip(self.z_obj + paso[:, 1], -limite, limite)
+
+    def step(self, acciones):
+        acciones = np.asarray(acciones, dtype=np.float32).reshape(self.num_envs, 2)
+        avance_recto, gire_derecha = acciones[:, 0], acciones[:, 1]
+        dx = avance_recto + gire_derecha
+        dy = avance_recto - gire_derecha
+
+        self._integra(self.velocidad[:, 0] + dx, self.velocidad[:, 1] + dy, self.periodo)
+        self.velocidad[:, 0] = np.clip(self.velocidad[:, 0] + dx, self.velocidad_min, self.velocidad_max)
+        self.velocidad[:, 1] = np.clip(self.velocidad[:, 1] + dy, self.velocidad_min, self.velocidad_max)
+
+        terminados = self.numero_de_pasos == self.pasos_por_episodio
+        truncados = terminados.copy()
+        self.numero_de_pasos += 1
+
+        recompensa = self._get_recompensa()
+        self._lee_sensores(np.ones(self.num_envs, dtype=bool))
+
+        self.recompensas_episodio.append(float(recompensa[0]))
+        self.xy_objeto_episodio.append(np.array([self.x_obj[0], self.z_obj[0]]))
+        self.xy_robot_episodio.append(np.array([self.x[0], self.z[0]]))
+
+        observacion = self._get_observacion()
+        self._mueve_blobs()
+
+        # autoreset en el mismo paso: la observacion final va en infos
+        infos = {}
+        if terminados.any():
+            final_obs = np.empty(self.num_envs, dtype=object)
+            for i in np.flatnonzero(terminados):
+                final_obs[i] = {clave: valor[i].copy() for clave, valor in observacion.items()}
+            infos["final_obs"] = final_obs
+            infos["_final_obs"] = terminados.copy()
+
+            self._reinicia(terminados)
+            for clave, valor in self._get_observacion().items():
+                observacion[clave][terminados] = valor[terminados]
+
+        return observacion, recompensa, terminados, truncados, infos
+
+
+class VecEnvSB3(VecEnv):
+    """
+    Adapta un gymnasium.vector.VectorEnv con autoreset en el mismo paso a la
+    interfaz VecEnv de stable_baselines3, para entrenar SAC con N robots.
+    """
+
+    def __init__(self, entorno):
+        self.entorno = entorno
+        self._acciones = None
+        super().__init__(entorno.num_envs, entorno.single_observation_space, entorno.single_action_space)
+
+    def reset(self):
+        observacion, _ = self.entorno.reset(seed=self._seeds[0])
+        self._reset_seeds()
+        return observacion
+
+    def step_async(self, actions):
+        self._acciones = actions
+
+    def step_wait(self):
+        observacion, recompensa, terminados, truncados, infos = self.entorno.step(self._acciones)
+        dones = terminados | truncados
+        lista_infos = [{} for _ in range(self.num_envs)]
+        for i in np.flatnonzero(dones):
+            lista_infos[i]["terminal_observation"] = infos["final_obs"][i]
+            lista_infos[i]["TimeLimit.truncated"] = bool(truncados[i] and not terminados[i])
+        return observacion, recompensa.astype(np.float32), dones, lista_infos
+
+    def close(self):
+        self.entorno.close()
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self.entorno, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self.entorno, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        metodo = getattr(self.entorno, method_name)
+        return [metodo(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
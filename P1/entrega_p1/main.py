@@ -3,6 +3,8 @@ import os
 from stable_baselines3 import SAC
 from stable_baselines3.common.env_checker import check_env
 from Entorno import Entorno
+from EntornoVectorial import EntornoVectorial, VecEnvSB3
+from ActorAprendiz import ActorAprendiz
 import Plots
 
 # Load configuration
@@ -24,30 +26,62 @@ learn = config['learn']
 check = config['check']
 weights_load_path = config['weights_load_path']
 weights_save_base_path = config.get('weights_save_base_path', "model_weights")
+backend = config.get('backend', 'robobosim')
+opciones_backend = config.get('cinematico')
+num_entornos = config.get('num_entornos', 1)
+frecuencia_control = config.get('frecuencia_control', 1.0)
+asincrono = config.get('asincrono', False)
+
+# N robots en un solo entorno vectorizado, solo para entrenar con el backend cinematico
+vectorial = learn and backend == 'cinematico' and num_entornos > 1
 
 # Setup environment
-entorno = Entorno(
-    pasos_por_episodio=pasos_por_episodio,
-    alpha1=alpha1,
-    alpha2=alpha2,
-    alpha3=alpha3,
-    sigma=sigma
-)
+if vectorial:
+    entorno = EntornoVectorial(
+        num_entornos=num_entornos,
+        pasos_por_episodio=pasos_por_episodio,
+        alpha1=alpha1,
+        alpha2=alpha2,
+        alpha3=alpha3,
+        sigma=sigma,
+        periodo=1.0 / frecuencia_control,
+        opciones_backend=opciones_backend
+    )
+    entorno_modelo = VecEnvSB3(entorno)
+else:
+    entorno = Entorno(
+        pasos_por_episodio=pasos_por_episodio,
+        alpha1=alpha1,
+        alpha2=alpha2,
+        alpha3=alpha3,
+        sigma=sigma,
+        backend=backend,
+        opciones_backend=opciones_backend,
+        frecuencia_control=frecuencia_control
+    )
+    entorno_modelo = entorno
 
-if check: check_env(entorno)
+    if check: check_env(entorno)
 
 
 # Setup model
 if load_weights:
-    modelo = SAC.load(weights_load_path, env=entorno)
+    modelo = SAC.load(weights_load_path, env=entorno_modelo)
     print(f"Loaded model from {weights_load_path}")
 else:
     print('No se cargo modelo')
-    modelo = SAC(politica, entorno)
+    modelo = SAC(politica, entorno_modelo)
 
 # Train model
 if learn:
-    modelo.learn(total_timesteps=pasos_por_episodio * numero_episodios)
+    if asincrono and not vectorial:
+        # un hilo mueve el robot y otro entrena mientras tanto
+        ActorAprendiz(modelo, entorno,
+                      publica_cada=config.get('publica_cada', 50),
+                      max_gradientes_por_paso=config.get('max_gradientes_por_paso', 20)
+                      ).entrena(pasos_por_episodio * numero_episodios)
+    else:
+        modelo.learn(total_timesteps=pasos_por_episodio * numero_episodios)
 
 # Save model with hyperparameter-based path
     save_name = f"sac_alpha1_{alpha1}_alpha2_{alpha2}_alpha3_{alpha3}_sigma_{sigma}_numeps{numero_episodios}.zip"
@@ -65,6 +99,8 @@ else:
 
 print(entorno.historial_xy_objeto)
 print(entorno.historial_xy_robot)
+if not vectorial:
+    print(f'Periodo de control: {entorno.planificador.resumen()}')
 # Plot results
 #Plots.plot_recompensas(entorno.recompensas, pasos_por_episodio)
 #Plots.plot_trayectorias(entorno.xy_objeto, entorno.xy_robot)
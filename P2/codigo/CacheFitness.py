@@ -0,0 +1,54 @@
+import hashlib
+
+# Con elitismo la mitad de cada generacion son copias exactas de genomas ya
+# evaluados. La cache guarda su fitness por una huella canonica del genoma
+# (solo lo que cambia la red: conexiones activas con su peso y nodos con
+# bias, response, activacion y agregacion) para no repetir episodios.
+
+
+class CacheFitness:
+
+    def __init__(self, politica = 'reutiliza', max_muestras = 1):
+        """
+        politica 'reutiliza': el primer fitness medido se usa siempre.
+        politica 'promedia': se vuelve a evaluar hasta tener max_muestras
+        episodios y se usa la media; a partir de ahi se reutiliza.
+        """
+        if politica not in ('reutiliza', 'promedia'):
+            raise ValueError(f"Politica de cache desconocida: {politica}")
+        self.politica = politica
+        self.max_muestras = 1 if politica == 'reutiliza' else max(1, max_muestras)
+        self._muestras = {}   # huella -> (suma, numero de muestras)
+        self.aciertos = 0
+        self.evaluaciones = 0
+
+    @staticmethod
+    def huella(genoma):
+        conexiones = sorted((clave, conexion.weight)
+                            for clave, conexion in genoma.connections.items() if conexion.enabled)
+        nodos = sorted((clave, nodo.bias, nodo.response, nodo.activation, nodo.aggregation)
+                       for clave, nodo in genoma.nodes.items())
+        return hashlib.sha1(repr((conexiones, nodos)).encode()).hexdigest()
+
+    def consulta(self, genoma):
+        """Fitness guardado si ya no hacen falta mas muestras, si no None"""
+        suma, n = self._muestras.get(self.huella(genoma), (0.0, 0))
+        if n >= self.max_muestras:
+            self.aciertos += 1
+            return suma / n
+        return None
+
+    def registra(self, genoma, fitness):
+        """Anade una muestra y devuelve el fitness a asignar (la media de las muestras)"""
+        huella = self.huella(genoma)
+        suma, n = self._muestras.get(huella, (0.0, 0))
+        suma, n = suma + float(fitness), n + 1
+        self._muestras[huella] = (suma, n)
+        self.evaluaciones += 1
+        return suma / n
+
+    def resumen(self):
+        return {'politica': self.politica,
+                'genomas': len(self._muestras),
+                'evaluaciones': self.evaluaciones,
+                'aciertos': self.aciertos}
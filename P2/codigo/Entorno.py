@@ -21,7 +21,12 @@ class Entorno(gym.Env):
                 sigma = 15,
                 verboso = False,
                 velocidad_blob = 20,
-                posicion_inicial = None):
+                posicion_inicial = None,
+                backend = 'robobosim',
+                opciones_backend = None,
+                frecuencia_control = 1.0,
+                ip = 'localhost',
+                robot_id = 0):
 
         self.pasos_por_episodio =  pasos_por_episodio
         self.alpha1 = alpha1
@@ -35,11 +40,26 @@ class Entorno(gym.Env):
         self._velocidad_blob = velocidad_blob
         self._posicion_inicial = posicion_inicial
 
-        self.robocop = RoboboAPI.init_Robobo()
+        if backend == 'cinematico':
+            # un unico mundo en proceso hace de robot y de simulador
+            self.robocop = self.sim = RoboboAPI.init_SimuladorCinematico(**(opciones_backend or {}))
+        else:
+            # robot_id elige el puerto de robobopy (40404 + 10*robot_id), RoboboSim siempre usa el 50505:
+            # varios Entorno en la misma ip comparten simulacion (EvaluadorParalelo lo impide)
+            self.robocop = RoboboAPI.init_Robobo(ip, robot_id)
+            self.sim = RoboboAPI.init_RoboboSim(ip)
         self.robocop.connect()
-        self.sim = RoboboAPI.init_RoboboSim()
         self.sim.connect()
         self.sim.wait(1)
+        # poses reales del robot y del objeto, cacheadas por paso
+        self.poses = RoboboAPI.init_ServicioPoses(self.sim)
+        # periodo de control con plazos fijos (en el cinematico con su tiempo simulado)
+        if backend == 'cinematico':
+            self.planificador = RoboboAPI.init_PlanificadorControl(frecuencia_control,
+                                                                   reloj=lambda: self.robocop.tiempo,
+                                                                   espera=self.robocop.wait)
+        else:
+            self.planificador = RoboboAPI.init_PlanificadorControl(frecuencia_control)
         self.velocidad_min = -30
         self.velocidad_max = 30
 
@@ -47,16 +67,17 @@ class Entorno(gym.Env):
         self.historial_recompensas = []  # Lista de listas
         self.historial_xy_objeto = []    # Lista de listas
         self.historial_xy_robot = []     # Lista de listas
+        self.historial_sensores = []     # Lista de listas de SensorSnapshot
         
         # Variables para el episodio actual
         self.recompensas_episodio = []
         self.xy_objeto_episodio = []
         self.xy_robot_episodio = []
+        self.sensores_episodio = []
 
         # inicializacion de las variables 
-        self._blob_xy = np.array([-1, -1], dtype=np.int32)
-        self._IR = np.array([0, 0, 0, 0, 0, 0], dtype=np.int32)  # 6 sensores IR
-        self._tamano_blob = np.array([-1], dtype=np.int32)
+        # blob_xy, IR (6 sensores) y tamano_blob salen de una unica lectura por paso
+        self._sensores = RoboboAPI.SensorSnapshot.vacio(num_IR=6)
         self._velocidad = np.array([0, 0], dtype=np.float32)
         self.tamano_blob_max = 1000
         self.IR_max = 10000
@@ -74,13 +95,18 @@ class Entorno(gym.Env):
         self.action_space = gym.spaces.Box(self.velocidad_min, self.velocidad_max, shape=(2,), dtype=float)
 
     
+    def desconecta(self):
+        self.robocop.disconnect()
+        if self.sim is not self.robocop:
+            self.sim.disconnect()
+
     def _get_observacion(self):
         """Convierte estado interno a observación"""
         
         return {
-            "blob_xy": self._blob_xy, 
-            "IR": self._IR,
-            "tamano_blob": self._tamano_blob
+            "blob_xy": self._sensores.blob_xy, 
+            "IR": self._sensores.IR,
+            "tamano_blob": self._sensores.tamano_blob
         }
 
 
@@ -98,23 +124,26 @@ class Entorno(gym.Env):
             self.historial_recompensas.append(self.recompensas_episodio)
             self.historial_xy_objeto.append(self.xy_objeto_episodio)
             self.historial_xy_robot.append(self.xy_robot_episodio)
+            self.historial_sensores.append(self.sensores_episodio)
 
         # Limpiar listas del episodio actual
         self.recompensas_episodio = []
         self.xy_objeto_episodio = []
         self.xy_robot_episodio = []
+        self.sensores_episodio = []
 
         RoboboAPI.reset(self)
+        self.poses.nuevo_episodio()
+        self.planificador.reinicia()
 
         self.numero_de_pasos = 1
 
         # Resetear velocidades a 0
         self._velocidad = np.array([0, 0], dtype=np.float32)
 
-        # los metodos hablan con robocop y lo meten en las variables
-        self._blob_xy = RoboboAPI._get_xy(self)
-        self._IR = RoboboAPI._get_IR(self)
-        self._tamano_blob = RoboboAPI._get_tamano_blob(self)
+        # una sola lectura de robocop para todos los sensores
+        self._sensores = RoboboAPI.lee_sensores(self)
+        self.sensores_episodio.append(self._sensores)
 
         # Guardar posición inicial del objeto
         self.xy_objeto_episodio.append(RoboboAPI._get_object_xz(self))
@@ -137,19 +166,20 @@ class Entorno(gym.Env):
         Recompensa enfocada en: centrar blob + acercarse usando IR + distancia + evitar paredes
         Lógica: Si ve el blob, ignora paredes (para perseguirlo). Si no lo ve, evita paredes (para buscarlo).
         """
-        x = self._blob_xy[0]
-        tamano = float(self._tamano_blob)
-        atras = self._IR[1]
-        delante = self._IR[0]
+        IR = self._sensores.IR
+        x = self._sensores.blob_xy[0]
+        tamano = float(self._sensores.tamano_blob[0])
+        atras = IR[1]
+        delante = IR[0]
         d = RoboboAPI._distancia_a_blob(self)
         
         # Distancia (gaussiana)
         recompensa_distancia = 500 * math.exp(-(d / self.sigma) ** 2)
         
-        ll = self._IR[2]  # Lateral izquierda exterior
-        l = self._IR[3]   # Lateral izquierda interior
-        rr = self._IR[4]  # Lateral derecha exterior
-        r = self._IR[5]   # Lateral derecha interior
+        ll = IR[2]  # Lateral izquierda exterior
+        l = IR[3]   # Lateral izquierda interior
+        rr = IR[4]  # Lateral derecha exterior
+        r = IR[5]   # Lateral derecha interior
         
         # Detectar si ve el blob
         ve_blob = (x >0)
@@ -246,7 +276,10 @@ class Entorno(gym.Env):
         
         # Mueve el robot
         self.robocop.moveWheels(vel_izq, vel_der)
-        time.sleep(1)
+        # duerme solo lo que queda del periodo de control
+        self.planificador.espera_plazo()
+        # una sola consulta de poses al simulador por paso
+        self.poses.actualiza()
 
         if self.verboso: print(f"VELOCIDAD [izq, der]: {self._velocidad}")
 
@@ -263,10 +296,9 @@ class Entorno(gym.Env):
         if self.verboso: print(f'Recompensa: {recompensa}')
         self.recompensas_episodio.append(recompensa)
         
-        # Actualiza sensores
-        self._blob_xy = RoboboAPI._get_xy(self)
-        self._IR = RoboboAPI._get_IR(self)
-        self._tamano_blob = RoboboAPI._get_tamano_blob(self)
+        # Actualiza sensores (una sola lectura por paso)
+        self._sensores = RoboboAPI.lee_sensores(self)
+        self.sensores_episodio.append(self._sensores)
 
         # Guardar posiciones en el historial del episodio
         self.xy_objeto_episodio.append(RoboboAPI._get_object_xz(self))
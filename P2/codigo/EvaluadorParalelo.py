@@ -0,0 +1,248 @@
+import queue
+import socket
+import threading
+import time
+
+from Entorno import Entorno
+from utils import evalua_genoma
+
+# Evaluacion de la poblacion de NEAT repartida entre varios simuladores. Cada
+# trabajador es un hilo con su propio Entorno conectado a su propio servidor
+# (una ip por simulador); el tiempo se va en esperar al simulador, asi que con hilos
+# basta y el rendimiento crece con el numero de simuladores. Los genomas salen
+# de una cola compartida (el que acaba antes coge el siguiente) y los
+# resultados se devuelven en el orden de entrada.
+
+FITNESS_FALLO = -1000
+
+
+def _comprueba_servidores(servidores):
+    """
+    Un simulador por trabajador. RoboboSim escucha siempre en el 50505, asi
+    que dos trabajadores en la misma ip compartirian la simulacion: el
+    resetSimulation de uno reiniciaria el episodio del otro y ServicioPoses
+    solo lee el robot 0.
+    """
+    direcciones = {}
+    for servidor in servidores:
+        ip = servidor.get('ip', 'localhost')
+        try:
+            direccion = socket.gethostbyname(ip)
+        except OSError:
+            direccion = ip
+        direcciones.setdefault(direccion, []).append(ip)
+    repetidas = [ips for ips in direcciones.values() if len(ips) > 1]
+    if repetidas:
+        raise ValueError(f"Varios trabajadores en el mismo simulador: {repetidas}. "
+                         f"Cada servidor necesita su propia ip (127.0.0.2, 127.0.0.3...)")
+
+
+class EvaluadorParalelo:
+
+    def __init__(self, config, opciones_entorno, servidores,
+                 timeout = None,
+                 reintentos = 2,
+                 espera_reconexion = 2.0):
+        """
+        servidores: lista de dicts con 'ip', uno por trabajador y cada uno con su simulador.
+        timeout: segundos maximos por genoma antes de dar el trabajador por colgado;
+        por defecto tres veces la duracion del episodio mas un margen para el reset.
+        reintentos: veces que se vuelve a mandar un genoma que falla o se cuelga.
+        """
+        self.config = config
+        self.opciones_entorno = opciones_entorno
+        self.servidores = servidores
+        if opciones_entorno.get('backend', 'robobosim') != 'cinematico':
+            _comprueba_servidores(servidores)
+        self.reintentos = reintentos
+        self.espera_reconexion = espera_reconexion
+        if timeout is None:
+            duracion = opciones_entorno.get('pasos_por_episodio', 10) / opciones_entorno.get('frecuencia_control', 1.0)
+            timeout = 3 * duracion + 30
+        self.timeout = timeout
+
+        self._tareas = queue.Queue()
+        self._resultados = queue.Queue()
+        self._activos = {}        # trabajador -> token del hilo vivo
+        self._hilos = {}          # trabajador -> su ultimo hilo
+        self._por_relanzar = {}   # trabajador -> instante en que se retiro su hilo
+        self._fallos_trabajador = [0] * len(servidores)
+        self._siguiente_token = 0
+        self._generaciones = 0
+        self._generacion = None   # la que se esta evaluando (None entre generaciones)
+        for trabajador in range(len(servidores)):
+            self._lanza(trabajador)
+
+    # ---- trabajadores
+
+    def _lanza(self, trabajador):
+        self._siguiente_token += 1
+        token = self._siguiente_token
+        self._activos[trabajador] = token
+        self._hilos[trabajador] = threading.Thread(target=self._trabaja, args=(trabajador, token), daemon=True)
+        self._hilos[trabajador].start()
+
+    def _retira(self, trabajador):
+        """El hilo viejo termina (o se abandona si esta colgado) y no se aceptan sus mensajes"""
+        self._activos.pop(trabajador, None)
+
+    def _trabaja(self, trabajador, token):
+        servidor = self.servidores[trabajador]
+        try:
+            entorno = Entorno(**self.opciones_entorno, ip=servidor.get('ip', 'localhost'))
+        except Exception as e:
+            self._resultados.put(('caido', trabajador, token, None, None, repr(e)))
+            return
+        self._resultados.put(('listo', trabajador, token, None, None, None))
+
+        try:
+            while self._activos.get(trabajador) == token:
+                tarea = self._tareas.get()
+                if tarea is None:
+                    break
+                if self._activos.get(trabajador) != token:
+                    self._tareas.put(tarea)
+                    break
+                generacion, indice, genoma = tarea
+                if generacion != self._generacion:
+                    continue   # de una generacion ya cerrada
+                self._resultados.put(('inicio', trabajador, token, generacion, indice, time.perf_counter()))
+                try:
+                    fitness = evalua_genoma(genoma, self.config, entorno)
+                    self._resultados.put(('ok', trabajador, token, generacion, indice, fitness))
+                except Exception as e:
+                    self._resultados.put(('error', trabajador, token, generacion, indice, repr(e)))
+                    break
+        finally:
+            # el simulador queda libre para el trabajador que lo sustituya
+            try:
+                entorno.desconecta()
+            except Exception as e:
+                print(f"\n[Evaluador] trabajador {trabajador}: error al desconectar: {e!r}")
+
+    def _descarta(self, trabajador, motivo):
+        print(f"\n[Evaluador] trabajador {trabajador} ({self.servidores[trabajador]}) descartado: {motivo}")
+        if not self._activos and not self._por_relanzar:
+            raise RuntimeError("No queda ningun simulador disponible para evaluar")
+
+    def _relanza_pendientes(self):
+        """
+        Un trabajador retirado vuelve a arrancar cuando su hilo viejo ha
+        terminado: nunca hay dos clientes moviendo el mismo robot. Si el hilo
+        sigue colgado pasado otro timeout, el servidor se descarta.
+        """
+        ahora = time.perf_counter()
+        for trabajador, desde in list(self._por_relanzar.items()):
+            if not self._hilos[trabajador].is_alive():
+                if ahora - desde >= self.espera_reconexion:
+                    del self._por_relanzar[trabajador]
+                    self._lanza(trabajador)
+            elif ahora - desde > self.timeout:
+                del self._por_relanzar[trabajador]
+                self._descarta(trabajador, "el hilo anterior sigue colgado")
+
+    # ---- evaluacion de una generacion
+
+    def evalua(self, genomas, al_terminar=None):
+        """
+        Evalua [(genoma_id, genoma)] y devuelve los fitness en el mismo orden.
+        al_terminar(indice, fitness) se llama cada vez que llega un resultado.
+        """
+        self._generaciones += 1
+        generacion = self._generacion = self._generaciones
+        fitness = [None] * len(genomas)
+        intentos = [0] * len(genomas)
+        en_curso = {}   # trabajador -> (indice, inicio)
+        restantes = len(genomas)
+
+        def reintenta(indice, motivo):
+            nonlocal restantes
+            if fitness[indice] is not None:
+                return
+            intentos[indice] += 1
+            if intentos[indice] <= self.reintentos:
+                print(f"\n[Evaluador] genoma {genomas[indice][0]}: {motivo}, reintento {intentos[indice]}")
+                self._tareas.put((generacion, indice, genomas[indice][1]))
+            else:
+                print(f"\n[Evaluador] genoma {genomas[indice][0]}: {motivo}, sin reintentos, fitness {FITNESS_FALLO}")
+                fitness[indice] = FITNESS_FALLO
+                restantes -= 1
+                if al_terminar: al_terminar(indice, FITNESS_FALLO)
+
+        def relanza(trabajador, motivo):
+            self._retira(trabajador)
+            self._fallos_trabajador[trabajador] += 1
+            if self._fallos_trabajador[trabajador] > self.reintentos:
+                self._descarta(trabajador, motivo)
+                return
+            self._por_relanzar[trabajador] = time.perf_counter()
+
+        def procesa(mensaje):
+            nonlocal restantes
+            tipo, trabajador, token, generacion_mensaje, indice, dato = mensaje
+            vigente = self._activos.get(trabajador) == token
+            if tipo == 'listo':
+                if vigente:
+                    self._fallos_trabajador[trabajador] = 0
+                return
+            if tipo == 'caido':
+                if vigente:
+                    relanza(trabajador, dato)
+                return
+            if generacion_mensaje != generacion:
+                return   # resultado tardio de otra generacion: el indice ya es de otro genoma
+
+            # un resultado valido se acepta aunque venga de un trabajador ya retirado
+            if tipo == 'ok' and fitness[indice] is None:
+                fitness[indice] = dato
+                restantes -= 1
+                if al_terminar: al_terminar(indice, dato)
+
+            if vigente and tipo == 'inicio':
+                en_curso[trabajador] = (indice, dato)
+            elif vigente and tipo == 'ok':
+                en_curso.pop(trabajador, None)
+            elif vigente and tipo == 'error':
+                en_curso.pop(trabajador, None)
+                reintenta(indice, dato)
+                relanza(trabajador, dato)
+
+        for indice, (_, genoma) in enumerate(genomas):
+            self._tareas.put((generacion, indice, genoma))
+
+        while restantes > 0:
+            try:
+                procesa(self._resultados.get(timeout=0.5))
+            except queue.Empty:
+                pass
+
+            ahora = time.perf_counter()
+            for trabajador, (indice, inicio) in list(en_curso.items()):
+                if ahora - inicio > self.timeout:
+                    del en_curso[trabajador]
+                    reintenta(indice, f"sin respuesta en {self.timeout:.0f} s")
+                    relanza(trabajador, "timeout")
+            self._relanza_pendientes()
+
+        # generacion cerrada: reintentos sin coger y resultados que ya no hacen
+        # falta no pasan a la siguiente (los que lleguen despues llevan esta generacion)
+        self._generacion = None
+        while True:
+            try:
+                self._tareas.get_nowait()
+            except queue.Empty:
+                break
+        while True:
+            try:
+                procesa(self._resultados.get_nowait())
+            except queue.Empty:
+                break
+
+        for (_, genoma), valor in zip(genomas, fitness):
+            genoma.fitness = valor
+        return fitness
+
+    def cierra(self):
+        for trabajador in list(self._activos):
+            self._retira(trabajador)
+            self._tareas.put(None)
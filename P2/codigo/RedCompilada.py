@@ -0,0 +1,167 @@
+import numpy as np
+import neat
+
+# Compila genomas de NEAT (DefaultGenome) a matrices de numpy por capas.
+# Cada genoma ocupa una fila: huecos para las entradas y despues los nodos
+# que hacen falta para las salidas en orden topologico (los que no se usan
+# se podan, como draw_net con prune_unused). Una capa se evalua de una vez
+# para todos los genomas y todas las observaciones, sin el bucle por nodo y
+# por diccionario de FeedForwardNetwork.activate.
+
+ACTIVACIONES = ('sigmoid', 'tanh', 'relu')
+AGREGACIONES = ('sum', 'min', 'max')
+
+
+def _capas(genoma, config):
+    """Capas de nodos que se evaluan (las mismas que usa neat) y conexiones activas"""
+    conexiones = [conexion.key for conexion in genoma.connections.values() if conexion.enabled]
+    capas = neat.graphs.feed_forward_layers(config.genome_config.input_keys,
+                                            config.genome_config.output_keys, conexiones)
+    # las versiones nuevas de neat-python devuelven tambien los nodos requeridos
+    if isinstance(capas, tuple):
+        capas = capas[0]
+    return [sorted(capa) for capa in capas], conexiones
+
+
+class RedCompilada:
+
+    def __init__(self, genomas, config):
+        entradas = list(config.genome_config.input_keys)
+        salidas = list(config.genome_config.output_keys)
+        self.num_entradas = len(entradas)
+
+        compilados = []
+        for genoma in genomas:
+            capas, conexiones = _capas(genoma, config)
+            compilados.append((genoma, capas, conexiones))
+
+        P = len(genomas)
+        S = self.num_entradas + max((sum(len(capa) for capa in capas) for _, capas, _ in compilados), default=0)
+        self.num_capas = max((len(capas) for _, capas, _ in compilados), default=0)
+
+        self.pesos = np.zeros((P, S, S))              # [genoma, destino, origen]
+        self.conectado = np.zeros((P, S, S), dtype=bool)
+        self.bias = np.zeros((P, S))
+        self.response = np.ones((P, S))
+        self.activacion = np.zeros((P, S), dtype=int)
+        self.agregacion = np.zeros((P, S), dtype=int)
+        self.capa = np.full((P, S), -1)                # -1: entrada o hueco vacio
+        self.salidas = np.zeros((P, len(salidas)), dtype=int)
+        self.salida_valida = np.zeros((P, len(salidas)), dtype=bool)
+
+        for p, (genoma, capas, conexiones) in enumerate(compilados):
+            hueco = {clave: i for i, clave in enumerate(entradas)}
+            for l, capa in enumerate(capas):
+                for clave in capa:
+                    i = hueco[clave] = len(hueco)
+                    nodo = genoma.nodes[clave]
+                    if nodo.activation not in ACTIVACIONES or nodo.aggregation not in AGREGACIONES:
+                        raise ValueError(f"Nodo {clave}: {nodo.activation}/{nodo.aggregation} no soportado, "
+                                         f"solo {ACTIVACIONES} y {AGREGACIONES}")
+                    self.capa[p, i] = l
+                    self.bias[p, i] = nodo.bias
+                    self.response[p, i] = nodo.response
+                    self.activacion[p, i] = ACTIVACIONES.index(nodo.activation)
+                    self.agregacion[p, i] = AGREGACIONES.index(nodo.aggregation)
+
+            for origen, destino in conexiones:
+                if origen in hueco and destino in hueco and self.capa[p, hueco[destino]] >= 0:
+                    self.pesos[p, hueco[destino], hueco[origen]] = genoma.connections[(origen, destino)].weight
+                    self.conectado[p, hueco[destino], hueco[origen]] = True
+
+            # una salida que no se calcula se queda a 0, como en FeedForwardNetwork
+            for o, clave in enumerate(salidas):
+                if clave in hueco:
+                    self.salidas[p, o] = hueco[clave]
+                    self.salida_valida[p, o] = True
+
+        # por capa: los huecos que se calculan (genoma, nodo) y sus filas de pesos
+        self.capas = []
+        for l in range(self.num_capas):
+            p_capa, d_capa = np.nonzero(self.capa == l)
+            agregacion = self.agregacion[p_capa, d_capa]
+            self.capas.append({
+                'genoma': p_capa,
+                'nodo': d_capa,
+                'pesos': self.pesos[p_capa, d_capa],
+                'conectado': self.conectado[p_capa, d_capa],
+                'bias': self.bias[p_capa, d_capa][:, None],
+                'response': self.response[p_capa, d_capa][:, None],
+                'sigmoid': np.flatnonzero(self.activacion[p_capa, d_capa] == 0),
+                'tanh': np.flatnonzero(self.activacion[p_capa, d_capa] == 1),
+                'relu': np.flatnonzero(self.activacion[p_capa, d_capa] == 2),
+                'min': np.flatnonzero(agregacion == 1),
+                'max': np.flatnonzero(agregacion == 2),
+            })
+
+    @staticmethod
+    def crea(genoma, config):
+        """Equivalente a neat.nn.FeedForwardNetwork.create para un genoma"""
+        return RedCompilada([genoma], config)
+
+    @staticmethod
+    def crea_poblacion(genomas, config):
+        return RedCompilada(genomas, config)
+
+    @staticmethod
+    def _agrega(capa, entradas):
+        """entradas (K, B, S) de los K nodos de la capa; devuelve (K, B)"""
+        agregado = np.einsum('kbs,ks->kb', entradas, capa['pesos'])
+        for clave, funcion, neutro in (('min', np.min, np.inf), ('max', np.max, -np.inf)):
+            k = capa[clave]
+            if len(k):
+                conectado = capa['conectado'][k][:, None, :]
+                productos = np.where(conectado, entradas[k] * capa['pesos'][k][:, None, :], neutro)
+                # min y max de una lista vacia valen 0 en neat
+                agregado[k] = np.where(conectado.any(axis=-1), funcion(productos, axis=-1), 0.0)
+        return agregado
+
+    @staticmethod
+    def _activa(capa, z):
+        """Mismas funciones que neat.activations, aplicadas a cada grupo de nodos de la capa"""
+        if len(capa['sigmoid']):
+            k = capa['sigmoid']
+            z[k] = 1.0 / (1.0 + np.exp(-np.clip(5.0 * z[k], -60.0, 60.0)))
+        if len(capa['tanh']):
+            k = capa['tanh']
+            z[k] = np.tanh(np.clip(2.5 * z[k], -60.0, 60.0))
+        if len(capa['relu']):
+            k = capa['relu']
+            z[k] = np.maximum(z[k], 0.0)
+        return z
+
+    def activa(self, observaciones):
+        """
+        observaciones (B, entradas), las mismas para todos los genomas, o
+        (P, B, entradas), unas por genoma. Devuelve (P, B, salidas).
+        """
+        observaciones = np.asarray(observaciones, dtype=float)
+        P, S = self.bias.shape
+        if observaciones.ndim == 2:
+            observaciones = np.broadcast_to(observaciones, (P,) + observaciones.shape)
+        B = observaciones.shape[1]
+
+        valores = np.zeros((P, B, S))
+        valores[:, :, :self.num_entradas] = observaciones
+        for capa in self.capas:
+            z = capa['bias'] + capa['response'] * self._agrega(capa, valores[capa['genoma']])
+            valores[capa['genoma'], :, capa['nodo']] = self._activa(capa, z)
+
+        indices = np.broadcast_to(self.salidas[:, None, :], (P, B, self.salidas.shape[1]))
+        resultado = np.take_along_axis(valores, indices, axis=-1)
+        return np.where(self.salida_valida[:, None, :], resultado, 0.0)
+
+    def activate(self, entradas):
+        """Misma interfaz que FeedForwardNetwork.activate (un genoma, una observacion)"""
+        if len(entradas) != self.num_entradas:
+            raise RuntimeError(f"Se esperaban {self.num_entradas} entradas, llegaron {len(entradas)}")
+        return self.activa(np.asarray(entradas, dtype=float)[None])[0, 0].tolist()
+
+
+def compara_con_neat(genomas, config, observaciones):
+    """Maxima diferencia entre RedCompilada y FeedForwardNetwork.activate sobre las observaciones"""
+    observaciones = np.asarray(observaciones, dtype=float)
+    compilada = RedCompilada.crea_poblacion(genomas, config).activa(observaciones)
+    referencia = np.array([[neat.nn.FeedForwardNetwork.create(genoma, config).activate(list(obs))
+                            for obs in observaciones] for genoma in genomas])
+    return float(np.abs(compilada - referencia).max()) if referencia.size else 0.0
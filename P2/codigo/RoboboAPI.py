@@ -1,20 +1,62 @@
 from robobopy.Robobo import Robobo
 from robobosim.RoboboSim import RoboboSim
+from SimuladorCinematico import SimuladorCinematico
+from dataclasses import dataclass
 import random
 import numpy as np
 import math
+import time
 
-def init_Robobo(ip='localhost'):
-    return Robobo(ip) 
+def init_Robobo(ip='localhost', robot_id=0):
+    return Robobo(ip, robot_id)
 
 def init_RoboboSim(ip='localhost'):
     return RoboboSim(ip)
 
-def _get_xy(Entorno):
+def init_SimuladorCinematico(**opciones):
+    return SimuladorCinematico(**opciones)
+
+@dataclass(frozen=True)
+class SensorSnapshot:
+    """
+    Lectura de los sensores del robot en un mismo instante de control.
+    Se lee una sola vez por paso y la comparten observacion, recompensa e historial.
+    """
+    blob_xy: np.ndarray
+    tamano_blob: np.ndarray
+    IR: np.ndarray
+    instante: float
+
+    def __post_init__(self):
+        # los arrays se comparten entre consumidores, asi que no se pueden modificar
+        for valor in (self.blob_xy, self.tamano_blob, self.IR):
+            valor.setflags(write=False)
+
+    @classmethod
+    def vacio(cls, num_IR=6):
+        return cls(blob_xy=np.array([-1, -1], dtype=np.int32),
+                   tamano_blob=np.array([-1], dtype=np.int32),
+                   IR=np.zeros(num_IR, dtype=np.int32),
+                   instante=time.time())
+
+
+def lee_sensores(Entorno):
     """
-    Metodo auxiliar, interfaz con robocop
+    Lee blobs e IR una sola vez (una llamada a robocop por sensor) y lo
+    devuelve como un SensorSnapshot inmutable
     """
     blobs = Entorno.robocop.readAllColorBlobs()
+    irs = Entorno.robocop.readAllIRSensor()
+    return SensorSnapshot(blob_xy=_get_xy(blobs),
+                          tamano_blob=_get_tamano_blob(blobs),
+                          IR=_get_IR(irs, Entorno.verboso),
+                          instante=time.time())
+
+
+def _get_xy(blobs):
+    """
+    Metodo auxiliar, posicion del blob a partir de la lectura de robocop
+    """
     if blobs:
         for key in blobs:
             blob = blobs[key]
@@ -22,34 +64,119 @@ def _get_xy(Entorno):
     return np.array([-1,-1])
 
 
-def _get_object_xz(Entorno):
+class ServicioPoses:
     """
-    Metodo auxiliar, interfaz con robocop
+    Poses reales del robot y del objeto en RoboboSim con cache por paso.
+    La lista de objetos se descubre una vez por episodio y cada paso se piden
+    solo dos poses (robot y objeto); recompensa, historial y movimiento del
+    blob leen de la cache.
     """
-    objetos = Entorno.sim.getObjects()
-    if objetos != None and len(objetos) > 0:
-        for objeto in objetos:
-            posicion = Entorno.sim.getObjectLocation(objeto)['position']
-            x_obj, z_obj = posicion['x'], posicion['z']
-    
-    return np.array([x_obj,z_obj])
+    def __init__(self, sim, id_robot=0):
+        self.sim = sim
+        self.id_robot = id_robot
+        self.objeto = None
+        self.posicion_robot = None
+        self.posicion_objeto = None
+
+    def nuevo_episodio(self):
+        """Descubre el objeto del escenario (se usa el ultimo, como antes) y lee las poses"""
+        objetos = self.sim.getObjects()
+        self.objeto = list(objetos)[-1] if objetos else None
+        self.actualiza()
 
-        
+    def actualiza(self):
+        """Unica consulta de poses al simulador en cada paso"""
+        self.posicion_robot = self.sim.getRobotLocation(self.id_robot)['position']
+        if self.objeto is not None:
+            self.posicion_objeto = self.sim.getObjectLocation(self.objeto)['position']
 
+    def mueve_objeto(self, posicion):
+        self.sim.setObjectLocation(self.objeto, position=posicion)
+        self.posicion_objeto = posicion
+
+
+def init_ServicioPoses(sim):
+    return ServicioPoses(sim)
+
+
+class PlanificadorControl:
+    """
+    Periodo de control con plazos absolutos: el plazo del paso k es el del
+    paso k-1 mas un periodo, asi la latencia de las RPC y de la politica se
+    descuenta del periodo en vez de sumarse y no hay deriva. Solo se duerme
+    lo que falta hasta el plazo; si ya ha pasado se cuenta como fallo, se
+    acumula el retraso y se vuelve a enganchar al reloj sin recuperar periodos.
+    reloj y espera son los del backend (tiempo simulado en el cinematico).
+    """
+    def __init__(self, frecuencia=1.0, reloj=time.perf_counter, espera=time.sleep):
+        self.frecuencia = frecuencia
+        self.periodo = 1.0 / frecuencia
+        self.reloj = reloj
+        self.espera = espera
+        self.plazo = None
+        self.pasos = 0
+        self.fallos = 0
+        self.retraso_total = 0.0
+        self.retraso_max = 0.0
+        self.holgura_total = 0.0
+
+    def reinicia(self):
+        """Tras un reset el siguiente paso empieza un reloj nuevo"""
+        self.plazo = None
+
+    def espera_plazo(self):
+        """Duerme hasta el final del periodo actual, devuelve la holgura (negativa si se incumple)"""
+        ahora = self.reloj()
+        if self.plazo is None:
+            self.plazo = ahora
+        self.plazo += self.periodo
+        holgura = self.plazo - ahora
+        self.pasos += 1
+
+        if holgura > 0:
+            self.espera(holgura)
+            self.holgura_total += holgura
+        else:
+            self.fallos += 1
+            self.retraso_total -= holgura
+            self.retraso_max = max(self.retraso_max, -holgura)
+            self.plazo = ahora
+        return holgura
+
+    def resumen(self):
+        pasos = max(self.pasos, 1)
+        return {'frecuencia': self.frecuencia,
+                'pasos': self.pasos,
+                'fallos': self.fallos,
+                'tasa_fallos': self.fallos / pasos,
+                'retraso_medio': self.retraso_total / max(self.fallos, 1),
+                'retraso_max': self.retraso_max,
+                'holgura_media': self.holgura_total / pasos}
+
+
+def init_PlanificadorControl(frecuencia=1.0, **opciones):
+    return PlanificadorControl(frecuencia, **opciones)
+
+
+def _get_object_xz(Entorno):
+    """
+    Metodo auxiliar, posicion del objeto desde la cache de poses
+    """
+    posicion = Entorno.poses.posicion_objeto
+    if posicion is None:
+        return np.array([0.0, 0.0])
+    return np.array([posicion['x'], posicion['z']])
 
 
 def _get_robot_xz(Entorno):
-    x_rob, y_rob = 0, 0
-    posicion_robobo = Entorno.sim.getRobotLocation(0)['position']
-    x_rob, z_rob = posicion_robobo['x'], posicion_robobo['z']
-    return np.array([x_rob,z_rob])
+    posicion_robobo = Entorno.poses.posicion_robot
+    return np.array([posicion_robobo['x'], posicion_robobo['z']])
 
 
-def _get_IR(Entorno):
+def _get_IR(irs, verboso=False):
     """
-    Metodo auxiliar, interfaz con robocop
+    Metodo auxiliar, los 6 IR usados a partir de la lectura de robocop
     """
-    irs = Entorno.robocop.readAllIRSensor()
     if irs != []:
         delante = irs["Front-C"]
         atras = irs["Back-C"]
@@ -57,17 +184,16 @@ def _get_IR(Entorno):
         rr = irs["Front-RR"]
         l = irs["Front-L"]
         ll = irs["Front-LL"]
-        if Entorno.verboso: print(f'delante {delante} atras {atras}')
+        if verboso: print(f'delante {delante} atras {atras}')
 
         return np.array([delante, atras, ll, l , r , rr])
     else:
         return np.array([0, 0,0,0,0,0])
 
-def _get_tamano_blob(Entorno):
+def _get_tamano_blob(blobs):
     """
-    Metodo auxiliar, interfaz con robocop
+    Metodo auxiliar, tamano del blob a partir de la lectura de robocop
     """
-    blobs = Entorno.robocop.readAllColorBlobs()
     if blobs:
         for key in blobs:
             blob = blobs[key]
@@ -77,14 +203,12 @@ def _get_tamano_blob(Entorno):
 
 def _distancia_a_blob(Entorno):
     x_obj, y_obj = 0, 0
-    posicion_robobo = Entorno.sim.getRobotLocation(0)['position']
+    posicion_robobo = Entorno.poses.posicion_robot
     x_rob, y_rob = posicion_robobo['x'], posicion_robobo['y']
 
-    objetos = Entorno.sim.getObjects()
-    if objetos != None and len(objetos) > 0:
-        for objeto in objetos:
-            posicion = Entorno.sim.getObjectLocation(objeto)['position']
-            x_obj, y_obj = posicion['x'], posicion['y']
+    posicion = Entorno.poses.posicion_objeto
+    if posicion is not None:
+        x_obj, y_obj = posicion['x'], posicion['y']
 
     #print(f'-> robobo ({x_rob},{y_rob}) -> objeto ({x_obj},{y_obj})')
     return math.sqrt((x_obj - x_rob)**2 + (y_obj - y_rob)**2)
@@ -103,17 +227,16 @@ def mover_blob_random_walk(entorno, dx, dz):
         entorno: El entorno de simulación de Robobo
         paso: Tamaño del paso en cada dirección (en metros)
     """
-    # Obtener los objetos disponibles
-    objetos = entorno.sim.getObjects()
-    
-    if objetos is None or len(objetos) == 0:
+    # El objeto y su posicion actual salen de la cache de poses
+    if entorno.poses.objeto is None:
         print("No hay objetos en la simulación")
         return None
-    
-    # Usar el primer objeto
-    if objetos != None and len(objetos) > 0:
-        for objeto in objetos:
-            posicion_actual = entorno.sim.getObjectLocation(objeto)['position']
+
+    # Sin velocidad no hace falta hablar con el simulador
+    if dx == 0 and dz == 0:
+        return None
+
+    posicion_actual = entorno.poses.posicion_objeto
     
     # Obtener posición actual del objeto
     x_actual = posicion_actual['x']
@@ -135,10 +258,7 @@ def mover_blob_random_walk(entorno, dx, dz):
     z_nueva = z_actual + dz
     
     # Mover el objeto a la nueva posición
-    entorno.sim.setObjectLocation(
-        objeto, 
-        position={'x': x_nueva, 'y': y_actual, 'z': z_nueva}
-    )
+    entorno.poses.mueve_objeto({'x': x_nueva, 'y': y_actual, 'z': z_nueva})
     
     return None
 
@@ -0,0 +1,270 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Backend en proceso que sustituye a Robobo + RoboboSim para entrenar mas
+# rapido que en tiempo real. Las unidades imitan a RoboboSim (mm y grados,
+# x/z en el suelo, y hacia arriba). Las funciones de modulo trabajan con
+# escalares o con arrays de numpy (broadcasting), asi se pueden usar tanto
+# para un robot como para N robots a la vez.
+#
+# El mismo fichero esta en P1/entrega_p1 y en P2/codigo: cada practica se
+# ejecuta sola desde su carpeta, como Entorno y RoboboAPI. Cualquier cambio
+# en la fisica se hace en las dos copias (diff entre ambas debe salir vacio).
+
+# mismos atributos que robobopy.utils.Blob
+Blob = namedtuple('Blob', ['color', 'posx', 'posy', 'size', 'frame_timestamp', 'status_timestamp'])
+
+# angulo de cada sensor IR respecto al frente del robot (grados, positivo a la derecha)
+ANGULOS_IR = {
+    "Front-C": 0.0,
+    "Front-L": -20.0,
+    "Front-LL": -45.0,
+    "Front-R": 20.0,
+    "Front-RR": 45.0,
+    "Back-C": 180.0,
+    "Back-L": -160.0,
+    "Back-R": 160.0,
+}
+
+
+def avanza_diferencial(x, z, yaw, v_der, v_izq, dt, mm_por_unidad, eje):
+    """
+    Integra exactamente la cinematica diferencial con velocidades de rueda
+    constantes durante dt. yaw en radianes con el convenio de Unity: 0 mira
+    hacia +z y crece girando hacia +x (sentido horario visto desde arriba).
+    """
+    v = mm_por_unidad * (v_der + v_izq) / 2
+    w = mm_por_unidad * (v_izq - v_der) / eje
+
+    recto = np.abs(w) < 1e-9
+    w_seguro = np.where(recto, 1.0, w)
+    yaw_nuevo = yaw + w * dt
+
+    x_nuevo = np.where(recto,
+                       x + v * dt * np.sin(yaw),
+                       x + v / w_seguro * (np.cos(yaw) - np.cos(yaw_nuevo)))
+    z_nuevo = np.where(recto,
+                       z + v * dt * np.cos(yaw),
+                       z + v / w_seguro * (np.sin(yaw_nuevo) - np.sin(yaw)))
+    return x_nuevo, z_nuevo, yaw_nuevo
+
+
+def resuelve_colisiones(x, z, x_obj, z_obj, limite, radio_robot, radio_objeto):
+    """Mantiene el robot dentro de la arena y fuera del objeto"""
+    x = np.clip(x, -limite + radio_robot, limite - radio_robot)
+    z = np.clip(z, -limite + radio_robot, limite - radio_robot)
+
+    dx, dz = x - x_obj, z - z_obj
+    d = np.hypot(dx, dz)
+    minimo = radio_robot + radio_objeto
+    dentro = d < minimo
+    d_segura = np.where(d > 1e-9, d, 1.0)
+    x = np.where(dentro, x_obj + dx / d_segura * minimo, x)
+    z = np.where(dentro, z_obj + dz / d_segura * minimo, z)
+    return x, z
+
+
+def proyecta_blob(x, z, yaw, x_obj, z_obj, inclinacion, fov_h, fov_v,
+                  focal, radio_objeto, altura_camara, rango_vision):
+    """
+    Proyeccion analitica del objeto en la camara del robot. Devuelve
+    (visible, posx, posy, size) con posx/posy en [0..100] como Robobo.
+    inclinacion es el cabeceo de la camara en radianes (positivo hacia abajo)
+    y altura_camara la altura de la camara sobre el centro del objeto.
+    """
+    dx, dz = x_obj - x, z_obj - z
+    adelante = dx * np.sin(yaw) + dz * np.cos(yaw)
+    lateral = dx * np.cos(yaw) - dz * np.sin(yaw)
+    distancia = np.hypot(dx, dz)
+
+    rumbo = np.arctan2(lateral, adelante)
+    elevacion = np.arctan2(-altura_camara, np.maximum(adelante, 1e-9)) + inclinacion
+
+    visible = (adelante > 0) & (np.abs(rumbo) < fov_h / 2) & \
+              (np.abs(elevacion) < fov_v / 2) & (distancia < rango_vision)
+
+    posx = np.clip(50 + 50 * rumbo / (fov_h / 2), 0, 100)
+    posy = np.clip(50 - 50 * elevacion / (fov_v / 2), 0, 100)
+    radio_px = focal * radio_objeto / np.maximum(distancia, radio_objeto)
+    size = np.pi * radio_px ** 2
+    return visible, posx.astype(int), posy.astype(int), size.astype(int)
+
+
+def distancia_rayo(x, z, yaw, angulo, x_obj, z_obj, limite, radio_robot, radio_objeto):
+    """
+    Distancia desde el borde del robot hasta el primer obstaculo (paredes de la
+    arena u objeto) en la direccion yaw + angulo.
+    """
+    direccion = yaw + angulo
+    ux, uz = np.sin(direccion), np.cos(direccion)
+
+    # paredes: interseccion del rayo con la caja [-limite, limite]^2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tx = np.where(ux > 0, (limite - x) / ux, np.where(ux < 0, (-limite - x) / ux, np.inf))
+        tz = np.where(uz > 0, (limite - z) / uz, np.where(uz < 0, (-limite - z) / uz, np.inf))
+    t = np.minimum(tx, tz)
+
+    # objeto: interseccion del rayo con el circulo del cilindro
+    mx, mz = x_obj - x, z_obj - z
+    b = mx * ux + mz * uz
+    c = mx * mx + mz * mz - radio_objeto ** 2
+    disc = b * b - c
+    t_obj = np.where(disc >= 0, b - np.sqrt(np.maximum(disc, 0)), np.inf)
+    t_obj = np.where(t_obj >= 0, t_obj, np.where(c < 0, 0.0, np.inf))
+
+    return np.maximum(np.minimum(t, t_obj) - radio_robot, 0.0)
+
+
+def valor_IR(distancia, ir_max, decaimiento, rango_ir):
+    """Modelo de IR: decae exponencialmente con la distancia al obstaculo"""
+    valor = ir_max * np.exp(-distancia / decaimiento)
+    return np.where(distancia < rango_ir, valor, 0.0).astype(int)
+
+
+class SimuladorCinematico:
+    """
+    Sustituto en proceso de Robobo y RoboboSim. Implementa las llamadas que
+    usa el codigo (moveWheels, readAllColorBlobs, readAllIRSensor,
+    getRobotLocation, getObjectLocation, setObjectLocation, resetSimulation,
+    moveTiltTo...) y el tiempo solo avanza con wait(), sin dormir.
+    """
+
+    def __init__(self,
+                 limite=1000.0,
+                 posicion_robot=(0.0, -500.0),
+                 orientacion_robot=0.0,
+                 posicion_objeto=(0.0, 300.0),
+                 altura_robot=0.0,
+                 altura_objeto=0.0,
+                 nombre_objeto='CYLINDERMID',
+                 color_blob='green',
+                 radio_robot=80.0,
+                 radio_objeto=50.0,
+                 eje=110.0,
+                 mm_por_unidad=5.0,
+                 fov_h=60.0,
+                 fov_v=45.0,
+                 focal=250.0,
+                 altura_camara=50.0,
+                 rango_vision=3000.0,
+                 ir_max=1500.0,
+                 decaimiento_ir=60.0,
+                 rango_ir=400.0,
+                 paso_integracion=0.1):
+        self.limite = limite
+        self.radio_robot = radio_robot
+        self.radio_objeto = radio_objeto
+        self.eje = eje
+        self.mm_por_unidad = mm_por_unidad
+        self.fov_h = math.radians(fov_h)
+        self.fov_v = math.radians(fov_v)
+        self.focal = focal
+        self.altura_camara = altura_camara
+        self.rango_vision = rango_vision
+        self.ir_max = ir_max
+        self.decaimiento_ir = decaimiento_ir
+        self.rango_ir = rango_ir
+        self.paso_integracion = paso_integracion
+        self.nombre_objeto = nombre_objeto
+        self.color_blob = color_blob
+
+        self._inicial = {
+            'robot': (float(posicion_robot[0]), float(posicion_robot[1]), math.radians(orientacion_robot)),
+            'objeto': (float(posicion_objeto[0]), float(posicion_objeto[1])),
+        }
+        self.altura_robot = altura_robot
+        self.altura_objeto = altura_objeto
+        self.resetSimulation()
+
+    # ---- ciclo de vida (compatibilidad con robobopy / robobosim)
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def resetSimulation(self):
+        self.x, self.z, self.yaw = self._inicial['robot']
+        self.x_obj, self.z_obj = self._inicial['objeto']
+        self.v_der, self.v_izq = 0.0, 0.0
+        self.tilt = 105.0
+        self.tiempo = 0.0
+
+    def wait(self, seconds):
+        """Avanza el mundo seconds segundos de tiempo simulado"""
+        restante = float(seconds)
+        while restante > 1e-12:
+            dt = min(self.paso_integracion, restante)
+            x, z, yaw = avanza_diferencial(self.x, self.z, self.yaw, self.v_der, self.v_izq,
+                                           dt, self.mm_por_unidad, self.eje)
+            x, z = resuelve_colisiones(x, z, self.x_obj, self.z_obj, self.limite,
+                                       self.radio_robot, self.radio_objeto)
+            self.x, self.z, self.yaw = float(x), float(z), float(yaw)
+            self.tiempo += dt
+            restante -= dt
+
+    # ---- actuadores
+
+    def moveWheels(self, rSpeed, lSpeed):
+        self.v_der, self.v_izq = float(rSpeed), float(lSpeed)
+
+    def moveWheelsByTime(self, rSpeed, lSpeed, duration, wait=True):
+        self.moveWheels(rSpeed, lSpeed)
+        self.wait(duration)
+        self.stopMotors()
+
+    def stopMotors(self):
+        self.v_der, self.v_izq = 0.0, 0.0
+
+    def moveTiltTo(self, degrees, speed, wait=True):
+        self.tilt = float(np.clip(degrees, 5, 105))
+
+    # ---- sensores
+
+    def readAllColorBlobs(self):
+        visible, posx, posy, size = proyecta_blob(
+            self.x, self.z, self.yaw, self.x_obj, self.z_obj,
+            math.radians(105.0 - self.tilt), self.fov_h, self.fov_v, self.focal,
+            self.radio_objeto, self.altura_camara, self.rango_vision)
+        # tilt 105 (el maximo) deja la camara horizontal
+        if not visible:
+            return {}
+        marca = int(self.tiempo * 1000)
+        return {self.color_blob: Blob(self.color_blob, int(posx), int(posy), int(size), marca, marca)}
+
+    def readAllIRSensor(self):
+        angulos = np.radians(np.fromiter(ANGULOS_IR.values(), dtype=float))
+        distancias = distancia_rayo(self.x, self.z, self.yaw, angulos, self.x_obj, self.z_obj,
+                                    self.limite, self.radio_robot, self.radio_objeto)
+        valores = valor_IR(distancias, self.ir_max, self.decaimiento_ir, self.rango_ir)
+        return dict(zip(ANGULOS_IR.keys(), valores.tolist()))
+
+    # ---- poses (interfaz de RoboboSim)
+
+    def getRobots(self):
+        return [0]
+
+    def getRobotLocation(self, robot_id):
+        return {'position': {'x': self.x, 'y': self.altura_robot, 'z': self.z},
+                'rotation': {'x': 0.0, 'y': math.degrees(self.yaw) % 360, 'z': 0.0}}
+
+    def setRobotLocation(self, robot_id, position=None, rotation=None):
+        if position is not None:
+            self.x, self.z = float(position['x']), float(position['z'])
+        if rotation is not None:
+            self.yaw = math.radians(rotation['y'])
+
+    def getObjects(self):
+        return [self.nombre_objeto]
+
+    def getObjectLocation(self, object_id):
+        return {'position': {'x': self.x_obj, 'y': self.altura_objeto, 'z': self.z_obj},
+                'rotation': {'x': 0.0, 'y': 0.0, 'z': 0.0}}
+
+    def setObjectLocation(self, object_id, position=None, rotation=None):
+        if position is not None:
+            self.x_obj = float(np.clip(position['x'], -self.limite, self.limite))
+            self.z_obj = float(np.clip(position['z'], -self.limite, self.limite))
@@ -8,22 +8,45 @@ import matplotlib.pyplot as plt
 from Entorno import Entorno
 import Plots
 from utils import evalua_genoma, guarda_genoma
+from EvaluadorParalelo import EvaluadorParalelo, FITNESS_FALLO
+from CacheFitness import CacheFitness
 
 with open("P2/configs/config.yaml", "r") as file: 
     config_global = yaml.safe_load(file)
 
-entorno = Entorno(pasos_por_episodio=config_global['pasos_por_episodio'], 
-                  alpha1=config_global['alpha1'],
-                  alpha2=config_global['alpha2'], 
-                  alpha3=config_global['alpha3'], 
-                  verboso=config_global['verboso'],
-                  sigma=config_global['sigma'],
-                  velocidad_blob=config_global['velocidad_blob'],
-                  posicion_inicial=config_global['posicion_inicial'])
+opciones_entorno = dict(pasos_por_episodio=config_global['pasos_por_episodio'], 
+                        alpha1=config_global['alpha1'],
+                        alpha2=config_global['alpha2'], 
+                        alpha3=config_global['alpha3'], 
+                        verboso=config_global['verboso'],
+                        sigma=config_global['sigma'],
+                        velocidad_blob=config_global['velocidad_blob'],
+                        posicion_inicial=config_global['posicion_inicial'],
+                        backend=config_global.get('backend', 'robobosim'),
+                        opciones_backend=config_global.get('cinematico'),
+                        frecuencia_control=config_global.get('frecuencia_control', 1.0))
 
 config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, 
                      neat.DefaultStagnation, 'P2/configs/config.ini')
 
+# con varios simuladores en la config se evalua la poblacion en paralelo
+config_paralela = config_global.get('evaluacion_paralela') or {}
+if config_paralela.get('servidores'):
+    entorno = None
+    evaluador = EvaluadorParalelo(config, opciones_entorno, config_paralela['servidores'],
+                                  timeout=config_paralela.get('timeout'),
+                                  reintentos=config_paralela.get('reintentos', 2))
+else:
+    entorno = Entorno(**opciones_entorno)
+    evaluador = None
+
+# fitness de genomas ya evaluados (elites copiadas sin cambios)
+config_cache = config_global.get('cache_fitness') or {}
+if config_cache.get('politica'):
+    cache = CacheFitness(config_cache['politica'], config_cache.get('max_muestras', 1))
+else:
+    cache = None
+
 historial_fitness = []
 generaciones = []
 mejor_fitness_por_generacion = []
@@ -31,27 +54,54 @@ fitness_promedio_por_generacion = []
 
 def evalua_genomas(genomes, config):
     total_fitness = 0
-    generacion_fitness = []
+    generacion_fitness = [None] * len(genomes)
+    terminados = []
     
     with tqdm(total=len(genomes), desc=f"Generacion {len(generaciones)+1}", leave=True) as pbar:
-        for i, (genoma_id, genoma) in enumerate(genomes, start=1):
-            try:
-                genoma.fitness = evalua_genoma(genoma, config, entorno)
-            except Exception as e:
-                print(f"\nError evaluando genoma {genoma_id}: {e}")
-                genoma.fitness = -1000
-            
-            historial_fitness.append(genoma.fitness)
-            generacion_fitness.append(genoma.fitness)
-            total_fitness += genoma.fitness
-            
+        def al_terminar(indice, fitness):
+            nonlocal total_fitness
+            terminados.append(fitness)
+            total_fitness += fitness
             pbar.set_postfix(
-                fitness=f"{genoma.fitness:.1f}", 
-                avg=f"{total_fitness / i:.1f}", 
-                best=f"{max(generacion_fitness):.1f}",
-                worst=f"{min(generacion_fitness):.1f}"
+                fitness=f"{fitness:.1f}", 
+                avg=f"{total_fitness / len(terminados):.1f}", 
+                best=f"{max(terminados):.1f}",
+                worst=f"{min(terminados):.1f}"
             )
             pbar.update(1)
+
+        def registra(indice, fitness):
+            # con 'promedia' se guarda, y se muestra, la media de las muestras, no el ultimo episodio
+            genoma = genomes[indice][1]
+            if cache is not None and fitness != FITNESS_FALLO:
+                fitness = cache.registra(genoma, fitness)
+            genoma.fitness = generacion_fitness[indice] = fitness
+            al_terminar(indice, fitness)
+
+        # los genomas repetidos (elites) salen de la cache sin jugar el episodio
+        pendientes = []
+        for indice, (genoma_id, genoma) in enumerate(genomes):
+            fitness = cache.consulta(genoma) if cache is not None else None
+            if fitness is None:
+                pendientes.append(indice)
+            else:
+                genoma.fitness = generacion_fitness[indice] = fitness
+                al_terminar(indice, fitness)
+
+        a_evaluar = [genomes[indice] for indice in pendientes]
+        if evaluador is not None:
+            # los resultados llegan segun terminan; registra los coloca en su indice
+            evaluador.evalua(a_evaluar, lambda j, fitness: registra(pendientes[j], fitness))
+        else:
+            for indice, (genoma_id, genoma) in zip(pendientes, a_evaluar):
+                try:
+                    fitness = evalua_genoma(genoma, config, entorno)
+                except Exception as e:
+                    print(f"\nError evaluando genoma {genoma_id}: {e}")
+                    fitness = FITNESS_FALLO
+                registra(indice, fitness)
+
+    historial_fitness.extend(generacion_fitness)
     
     generaciones.append(generacion_fitness)
     mejor_fitness_por_generacion.append(max(generacion_fitness))
@@ -131,4 +181,12 @@ plt.close()
 print(f"\nEntrenamiento completado:")
 print(f"  Total generaciones: {len(generaciones)}")
 print(f"  Mejor fitness: {max(mejor_fitness_por_generacion):.2f}")
-print(f"  Genoma guardado: {nombre_archivo}")
\ No newline at end of file
+print(f"  Genoma guardado: {nombre_archivo}")
+if entorno is not None:
+    resumen = entorno.planificador.resumen()
+    print(f"  Periodo de control: {resumen['frecuencia']} Hz, {resumen['fallos']}/{resumen['pasos']} plazos incumplidos, "
+          f"retraso max {1000 * resumen['retraso_max']:.1f} ms")
+else:
+    evaluador.cierra()
+if cache is not None:
+    print(f"  Cache de fitness: {cache.resumen()}")
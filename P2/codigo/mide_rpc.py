@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+import yaml
+from robobopy.Robobo import Robobo
+from robobosim.RoboboSim import RoboboSim
+
+# Mide la latencia en el cliente de cada llamada que hace un paso de Entorno
+# contra el servidor (RoboboSim o P2/codigo/servidor_robobo.py), con varios
+# clientes a la vez para ver como escala bajo carga.
+#
+#   python P2/codigo/mide_rpc.py
+
+with open("P2/configs/config.yaml", "r") as file:
+    config_global = yaml.safe_load(file)
+
+
+def mide_cliente(ip, repeticiones, tiempos):
+    robocop = Robobo(ip)
+    robocop.connect()
+    sim = RoboboSim(ip)
+    sim.connect()
+    objeto = list(sim.getObjects())[-1]
+
+    llamadas = {
+        'moveWheels': lambda: robocop.moveWheels(5, 5),
+        'readAllColorBlobs': robocop.readAllColorBlobs,
+        'readAllIRSensor': robocop.readAllIRSensor,
+        'getRobotLocation': lambda: sim.getRobotLocation(0),
+        'getObjectLocation': lambda: sim.getObjectLocation(objeto),
+        'setObjectLocation': lambda: sim.setObjectLocation(objeto, sim.getObjectLocation(objeto)['position']),
+        # ida y vuelta completa: espera al UNLOCK-TILT del servidor
+        'moveTiltTo(wait)': lambda: robocop.moveTiltTo(100, 100, wait=True),
+    }
+    for _ in range(repeticiones):
+        for nombre, llamada in llamadas.items():
+            t0 = time.perf_counter()
+            llamada()
+            tiempos.setdefault(nombre, []).append(time.perf_counter() - t0)
+
+    robocop.stopMotors()
+    robocop.disconnect()
+    sim.disconnect()
+
+
+if __name__ == '__main__':
+    config_medida = config_global.get('mide_rpc', {})
+    ip = config_medida.get('ip', 'localhost')
+    repeticiones = config_medida.get('repeticiones', 50)
+
+    for clientes in config_medida.get('clientes', [1, 4]):
+        tiempos = [{} for _ in range(clientes)]
+        hilos = [threading.Thread(target=mide_cliente, args=(ip, repeticiones, tiempos[i]))
+                 for i in range(clientes)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        print(f"\n[RPC] {clientes} cliente(s), {repeticiones} repeticiones (ms)")
+        print(f"{'llamada':<20}{'media':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+        for nombre in tiempos[0]:
+            muestras = 1000 * np.concatenate([t[nombre] for t in tiempos])
+            print(f"{nombre:<20}{muestras.mean():>10.3f}{np.percentile(muestras, 50):>10.3f}"
+                  f"{np.percentile(muestras, 95):>10.3f}{muestras.max():>10.3f}")
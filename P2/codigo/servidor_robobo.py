@@ -0,0 +1,221 @@
+import ast
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+
+import yaml
+from websockets.asyncio.server import serve, broadcast
+from websockets.exceptions import ConnectionClosed
+
+from SimuladorCinematico import SimuladorCinematico
+
+# Sustituto local de RoboboSim para maquinas sin Unity (CI): habla el mismo
+# protocolo remoto que robobopy (puerto 40404) y robobosim (puerto 50505) y
+# por detras mueve un SimuladorCinematico a paso fijo. Con escala_tiempo > 1
+# el mundo va mas rapido que el reloj.
+#
+#   python P2/codigo/servidor_robobo.py [host]
+#
+# y en otra terminal Entorno / test.py sin cambios contra localhost. Varios
+# servidores en la misma maquina escuchan en distintas direcciones de
+# loopback (127.0.0.2, 127.0.0.3...), porque robobosim siempre usa el 50505.
+
+PUERTO_ROBOBO = 40404
+PUERTO_SIM = 50505
+
+with open("P2/configs/config.yaml", "r") as file:
+    config_global = yaml.safe_load(file)
+
+
+def _dict_parametro(texto):
+    """robobosim manda los dict como repr de python dentro de un string"""
+    valor = ast.literal_eval(texto) if isinstance(texto, str) else texto
+    return valor or None
+
+
+class ServidorRobobo:
+
+    def __init__(self, mundo,
+                 escala_tiempo = 1.0,
+                 paso_fisica = 0.05,
+                 frecuencia_estado = 20,
+                 verboso = False):
+        self.mundo = mundo
+        self.escala_tiempo = escala_tiempo
+        self.paso_fisica = paso_fisica
+        self.ticks_por_estado = max(1, round(1 / (frecuencia_estado * paso_fisica)))
+        self.verboso = verboso
+
+        self.clientes_robobo = set()
+        self.clientes_sim = set()
+        self.fin_ruedas = None
+        self.desbloqueos = []      # (instante simulado, nombre, blockid)
+        self.ordenes = Counter()   # ordenes recibidas por tipo
+        self.estados_enviados = 0
+
+    # ---- conexiones
+
+    async def atiende_robobo(self, conexion):
+        await self._atiende(conexion, self.clientes_robobo)
+
+    async def atiende_sim(self, conexion):
+        await self._atiende(conexion, self.clientes_sim)
+
+    async def _atiende(self, conexion, clientes):
+        clientes.add(conexion)
+        try:
+            async for mensaje in conexion:
+                self._procesa(mensaje)
+        except ConnectionClosed:
+            # el cliente se fue sin cerrar bien (p. ej. un trabajador matado a mitad
+            # de episodio): se olvida la sesion sin volcar la traza
+            if self.verboso:
+                print(f"[Servidor] cliente {conexion.remote_address} desconectado sin cerrar")
+        finally:
+            clientes.discard(conexion)
+
+    # ---- ordenes de los clientes
+
+    def _procesa(self, mensaje):
+        if mensaje.startswith("PASSWORD"):
+            return
+
+        orden = json.loads(mensaje)
+        nombre, p = orden["name"], orden["parameters"]
+        self.ordenes[nombre] += 1
+
+        if nombre in ("MOVE", "MOVE-BLOCKING"):
+            self.mundo.moveWheels(float(p["rspeed"]), float(p["lspeed"]))
+            self.fin_ruedas = self.mundo.tiempo + float(p["time"])
+            if nombre == "MOVE-BLOCKING":
+                self.desbloqueos.append((self.fin_ruedas, "UNLOCK-MOVE", p["blockid"]))
+
+        elif nombre in ("MOVETILT", "MOVETILT-BLOCKING"):
+            self.mundo.moveTiltTo(int(p["pos"]), int(p["speed"]))
+            if nombre == "MOVETILT-BLOCKING":
+                self.desbloqueos.append((self.mundo.tiempo, "UNLOCK-TILT", p["blockid"]))
+
+        elif nombre == "RESET-SIM":
+            self.mundo.resetSimulation()
+            self.fin_ruedas = None
+
+        elif nombre == "SIM-LOCATION-SET":
+            self.mundo.setRobotLocation(int(p["id"]), _dict_parametro(p["position"]),
+                                        _dict_parametro(p["rotation"]))
+
+        elif nombre == "SIM-OBJECT-LOCATION-SET":
+            self.mundo.setObjectLocation(p["object-id"], _dict_parametro(p["position"]),
+                                         _dict_parametro(p["rotation"]))
+
+        elif self.verboso and self.ordenes[nombre] == 1:
+            print(f"[Servidor] orden ignorada: {nombre}")
+
+    # ---- estado que se empuja a los clientes
+
+    def _mensajes_robobo(self):
+        marca = int(self.mundo.tiempo * 1000)
+        irs = {clave: str(valor) for clave, valor in self.mundo.readAllIRSensor().items()}
+        mensajes = [{"name": "IRS", "value": irs, "id": -1},
+                    {"name": "TILT", "value": {"tiltPos": int(self.mundo.tilt), "timestamp": marca}, "id": -1},
+                    {"name": "WHEELS", "value": {"wheelPosR": 0, "wheelPosL": 0,
+                                                 "wheelSpeedR": int(self.mundo.v_der),
+                                                 "wheelSpeedL": int(self.mundo.v_izq),
+                                                 "timestamp": marca}, "id": -1}]
+
+        # si no se ve el blob se manda con tamano 0, como hace Robobo
+        blob = self.mundo.readAllColorBlobs().get(self.mundo.color_blob)
+        posx, posy, size = (blob.posx, blob.posy, blob.size) if blob else (0, 0, 0)
+        mensajes.append({"name": "BLOB", "value": {"color": self.mundo.color_blob, "posx": posx,
+                                                   "posy": posy, "size": size,
+                                                   "frame_timestamp": marca, "timestamp": marca},
+                         "id": -1})
+        return mensajes
+
+    def _mensajes_sim(self):
+        mensajes = []
+        robot = self.mundo.getRobotLocation(0)
+        mensajes.append({"name": "SIM-LOCATION", "value": {"id": 0, **_aplana(robot)}, "id": -1})
+        for objeto in self.mundo.getObjects():
+            ubicacion = self.mundo.getObjectLocation(objeto)
+            mensajes.append({"name": "SIM-OBJECT-LOCATION",
+                             "value": {"object-id": objeto, **_aplana(ubicacion)}, "id": -1})
+        return mensajes
+
+    def _publica_estado(self):
+        for mensaje in self._mensajes_robobo():
+            broadcast(self.clientes_robobo, json.dumps(mensaje))
+        for mensaje in self._mensajes_sim():
+            broadcast(self.clientes_sim, json.dumps(mensaje))
+        self.estados_enviados += 1
+
+    # ---- bucle de fisica determinista a paso fijo
+
+    async def bucle_fisica(self):
+        paso_real = self.paso_fisica / self.escala_tiempo
+        siguiente = time.perf_counter()
+        tick = 0
+        ultimo_informe = time.perf_counter()
+
+        while True:
+            self.mundo.wait(self.paso_fisica)
+            if self.fin_ruedas is not None and self.mundo.tiempo >= self.fin_ruedas:
+                self.mundo.stopMotors()
+                self.fin_ruedas = None
+
+            pendientes = [d for d in self.desbloqueos if d[0] <= self.mundo.tiempo]
+            for desbloqueo in pendientes:
+                self.desbloqueos.remove(desbloqueo)
+                _, nombre, blockid = desbloqueo
+                broadcast(self.clientes_robobo, json.dumps({"name": nombre, "value": {"blockid": blockid}, "id": -1}))
+
+            tick += 1
+            if tick % self.ticks_por_estado == 0:
+                self._publica_estado()
+
+            if self.verboso and time.perf_counter() - ultimo_informe >= 5:
+                ultimo_informe = time.perf_counter()
+                print(f"[Servidor] t_sim={self.mundo.tiempo:.1f}s clientes={len(self.clientes_robobo)}+"
+                      f"{len(self.clientes_sim)} estados={self.estados_enviados} ordenes={dict(self.ordenes)}")
+
+            siguiente += paso_real
+            espera = siguiente - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            else:
+                # vamos tarde: se cede el bucle para atender ordenes y se sigue sin acumular retraso
+                siguiente = time.perf_counter()
+                await asyncio.sleep(0)
+
+
+def _aplana(ubicacion):
+    posicion, rotacion = ubicacion['position'], ubicacion['rotation']
+    return {"tx": posicion['x'], "ty": posicion['y'], "tz": posicion['z'],
+            "rx": rotacion['x'], "ry": rotacion['y'], "rz": rotacion['z']}
+
+
+async def main():
+    config_servidor = config_global.get('servidor', {})
+    opciones_mundo = dict(config_global.get('cinematico') or {})
+    opciones_mundo.setdefault('color_blob', config_servidor.get('color_blob', 'red'))
+
+    servidor = ServidorRobobo(SimuladorCinematico(**opciones_mundo),
+                              escala_tiempo=config_servidor.get('escala_tiempo', 1.0),
+                              paso_fisica=config_servidor.get('paso_fisica', 0.05),
+                              frecuencia_estado=config_servidor.get('frecuencia_estado', 20),
+                              verboso=config_servidor.get('verboso', True))
+    host = sys.argv[1] if len(sys.argv) > 1 else config_servidor.get('host', 'localhost')
+
+    async with serve(servidor.atiende_robobo, host, PUERTO_ROBOBO), \
+               serve(servidor.atiende_sim, host, PUERTO_SIM):
+        print(f"[Servidor] escuchando en {host}:{PUERTO_ROBOBO} (robobo) y {host}:{PUERTO_SIM} (sim), "
+              f"escala de tiempo x{servidor.escala_tiempo}")
+        await servidor.bucle_fisica()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n[Servidor] detenido")
@@ -4,6 +4,7 @@ import numpy as np
 
 from Entorno import Entorno
 from utils import vectoriza_observacion, carga_genoma 
+from RedCompilada import compara_con_neat
 
 with open("P2/configs/config.yaml", "r") as file: 
     config_global = yaml.safe_load(file)
@@ -19,15 +20,20 @@ entorno = Entorno(pasos_por_episodio=config_global['pasos_por_episodio'],
                   verboso=config_global['verboso'],
                   sigma=config_global['sigma'],
                   velocidad_blob=config_global['velocidad_blob'],
-                  posicion_inicial=config_global['posicion_inicial'])
+                  posicion_inicial=config_global['posicion_inicial'],
+                  backend=config_global.get('backend', 'robobosim'),
+                  opciones_backend=config_global.get('cinematico'),
+                  frecuencia_control=config_global.get('frecuencia_control', 1.0))
 
 # Cargar el genoma ganador
 genoma, _ = carga_genoma(config_global['genoma_archivo'], config)
+# paso a paso con una sola observacion la red de neat es mas rapida que la compilada
 net = neat.nn.FeedForwardNetwork.create(genoma, config)
 
 # Resetear el entorno
 obs, _ = entorno.reset()
 obs_vector = vectoriza_observacion(obs)
+observaciones = [obs_vector]
 
 fitness = 0.0
 done = False
@@ -51,8 +57,13 @@ while not done and paso < entorno.pasos_por_episodio:
     # Ejecutar acción
     obs, recompensa, terminated, truncated, _ = entorno.step(action)
     obs_vector = vectoriza_observacion(obs)
+    observaciones.append(obs_vector)
     fitness += recompensa
     done = terminated or truncated
     paso += 1
 
-print(f'\nEl fitness en prueba, tras {paso} pasos es de: {fitness}')
\ No newline at end of file
+print(f'\nEl fitness en prueba, tras {paso} pasos es de: {fitness}')
+
+# la red compilada (la de evaluar por lotes) tiene que dar lo mismo que neat
+# sobre todas las observaciones del episodio, en una sola llamada
+print(f'Diferencia maxima con FeedForwardNetwork: {compara_con_neat([genoma], config, observaciones):.2e}')
@@ -0,0 +1,95 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Arranque de main.py en paralelo. Abrir las cámaras, conectar con el robot y
+# con el vídeo, cargar los dos YOLO y la política son esperas de red, de
+# dispositivo o de disco/torch que no dependen unas de otras; cada paso
+# declara de qué pasos depende y empieza en cuanto esos han terminado. Lo que
+# mueve motores o abre ventanas (cv2.imshow) no va en esos hilos: se hace
+# después en el hilo principal con en_principal, que también lo cronometra.
+# Al final se imprime la cronología desde que se lanzó el programa.
+
+
+class Arranque:
+
+    def __init__(self, inicio=None):
+        # inicio: time.perf_counter() del lanzamiento (antes de los imports de main.py)
+        self.inicio = time.perf_counter() if inicio is None else inicio
+        self.pasos = {}         # nombre -> (funcion, depende)
+        self.resultados = {}
+        self.cronologia = {}    # nombre -> (empieza, termina) en segundos desde inicio
+        self.marcas = {}        # nombre -> segundos desde inicio
+        self._lock = threading.Lock()
+        self.marca('imports')
+
+    def _ahora(self):
+        return time.perf_counter() - self.inicio
+
+    def paso(self, nombre, funcion, depende=()):
+        """funcion recibe los resultados de los pasos de depende, en ese orden"""
+        for dependencia in depende:
+            if dependencia not in self.pasos:
+                raise ValueError(f"El paso '{nombre}' depende de '{dependencia}', que no está declarado antes")
+        self.pasos[nombre] = (funcion, tuple(depende))
+
+    def marca(self, nombre):
+        """Apunta un instante suelto en la cronología (p. ej. el primer moveWheels)"""
+        with self._lock:
+            self.marcas[nombre] = self._ahora()
+
+    def _ejecuta_paso(self, nombre, futuros):
+        funcion, depende = self.pasos[nombre]
+        argumentos = [futuros[dependencia].result() for dependencia in depende]
+        empieza = self._ahora()
+        try:
+            return funcion(*argumentos)
+        finally:
+            with self._lock:
+                self.cronologia[nombre] = (empieza, self._ahora())
+
+    def en_principal(self, nombre, funcion, *argumentos):
+        """Ejecuta funcion aquí mismo (hilo principal) y la apunta en la cronología"""
+        empieza = self._ahora()
+        try:
+            return funcion(*argumentos)
+        finally:
+            with self._lock:
+                self.cronologia[nombre] = (empieza, self._ahora())
+
+    def ejecuta(self):
+        """
+        Lanza todos los pasos (un hilo por paso, como mucho esperan a sus
+        dependencias) y devuelve {nombre: resultado}. Si alguno falla se
+        espera a los demás y se relanza el error del primero que falló.
+        """
+        futuros = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.pasos)), thread_name_prefix='arranque') as ejecutor:
+            # los pasos están declarados después de sus dependencias
+            for nombre in self.pasos:
+                futuros[nombre] = ejecutor.submit(self._ejecuta_paso, nombre, futuros)
+
+        errores = [(nombre, futuro.exception()) for nombre, futuro in futuros.items() if futuro.exception()]
+        if errores:
+            nombre, error = errores[0]
+            print(f"[Arranque] Falló '{nombre}': {type(error).__name__}: {error}")
+            raise error
+        self.resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+        return self.resultados
+
+    def imprime_cronologia(self, ancho=40):
+        total = max([fin for _, fin in self.cronologia.values()] + list(self.marcas.values()) + [1e-9])
+        escala = ancho / total
+        print(f"[Arranque] Cronología desde el lanzamiento ({total:.2f} s)")
+        print(f"[Arranque]   {'imports':<20} {0:6.2f} {self.marcas['imports']:6.2f} s "
+              f"|{'#' * round(self.marcas['imports'] * escala):<{ancho}}|")
+        for nombre, (empieza, termina) in sorted(self.cronologia.items(), key=lambda p: p[1][0]):
+            barra = ' ' * round(empieza * escala) + '#' * max(1, round((termina - empieza) * escala))
+            print(f"[Arranque]   {nombre:<20} {empieza:6.2f} {termina:6.2f} s |{barra[:ancho]:<{ancho}}|")
+        for nombre, instante in self.marcas.items():
+            if nombre != 'imports':
+                print(f"[Arranque]   {nombre:<20} {instante:6.2f} s")
+        if self.cronologia:
+            en_serie = self.marcas['imports'] + sum(termina - empieza for empieza, termina in self.cronologia.values())
+            listo = max(termina for _, termina in self.cronologia.values())
+            print(f"[Arranque] Pasos listos a los {listo:.2f} s (uno detrás de otro serían {en_serie:.2f} s)")
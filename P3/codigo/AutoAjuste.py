@@ -0,0 +1,165 @@
+import os
+import time
+import platform
+
+import numpy as np
+import yaml
+
+# Elige modelo e imgsz de YOLO para llegar a target_fps en la CPU en la que
+# se está ejecutando. Los candidatos se dan en config.yaml del más preciso al
+# más rápido; al arrancar se mide la latencia de cada uno y se queda el
+# primero que cabe en el presupuesto (frame_skip / target_fps, porque YOLO
+# solo corre uno de cada frame_skip frames). Durante la ejecución se vigila la
+# latencia real y se baja o sube un escalón si hace falta. La elección se
+# guarda en autoajuste.yaml para verla y, si se quiere, reutilizarla.
+
+RUTA_GUARDADO = "P3/configs/autoajuste.yaml"
+
+
+class AutoAjuste:
+
+    def __init__(self, nombre, candidatos, target_fps, frame_skip=1,
+                 repeticiones=10, revisa_cada=30.0, reutiliza_guardado=False,
+                 forma_frame=(400, 600, 3), ruta=RUTA_GUARDADO):
+        self.nombre = nombre                     # 'deteccion' o 'telecontrol'
+        self.candidatos = [dict(c) for c in candidatos]
+        self.presupuesto = max(1, frame_skip) / target_fps
+        self.repeticiones = repeticiones
+        self.revisa_cada = revisa_cada
+        self.reutiliza_guardado = reutiliza_guardado
+        self.forma_frame = tuple(forma_frame)
+        self.ruta = ruta
+
+        self._modelos = {}      # pesos -> modelo ya cargado
+        self.latencias = {}     # indice de candidato -> latencia medida (s)
+        self.elegido = None
+        self._observadas = []
+        self._ultima_revision = time.perf_counter()
+
+    # ---- medida al arrancar
+
+    def _modelo(self, pesos, carga):
+        if pesos not in self._modelos:
+            self._modelos[pesos] = carga(pesos)
+        return self._modelos[pesos]
+
+    def _mide(self, modelo, imgsz, opciones):
+        frame = np.zeros(self.forma_frame, dtype=np.uint8)
+        for _ in range(2):   # calentamiento
+            modelo(frame, imgsz=imgsz, **opciones)
+        tiempos = []
+        for _ in range(self.repeticiones):
+            inicio = time.perf_counter()
+            modelo(frame, imgsz=imgsz, **opciones)
+            tiempos.append(time.perf_counter() - inicio)
+        return float(np.median(tiempos))
+
+    def ajusta(self, carga, opciones):
+        """
+        carga(pesos) devuelve un modelo YOLO; opciones son los kwargs de cada
+        llamada (verbose, device). Devuelve (modelo, imgsz) elegidos.
+        """
+        guardado = self._lee_guardado() if self.reutiliza_guardado else None
+        if guardado is not None:
+            self.elegido = guardado
+            print(f"[AutoAjuste] {self.nombre}: reutilizando {self.candidatos[guardado]} de {self.ruta}")
+        else:
+            for i, candidato in enumerate(self.candidatos):
+                modelo = self._modelo(candidato['modelo'], carga)
+                self.latencias[i] = self._mide(modelo, candidato['imgsz'], opciones)
+            validos = [i for i in self.latencias if self.latencias[i] <= self.presupuesto]
+            # el más preciso que cabe; si ninguno cabe, el más rápido
+            self.elegido = validos[0] if validos else min(self.latencias, key=self.latencias.get)
+            self.informa()
+            self.guarda()
+
+        candidato = self.candidatos[self.elegido]
+        return self._modelo(candidato['modelo'], carga), candidato['imgsz']
+
+    # ---- vigilancia durante la ejecución
+
+    def observa(self, latencia, carga):
+        """
+        Latencia de una inferencia real. Cada revisa_cada segundos compara la
+        media con el presupuesto y, si cambia de candidato, devuelve el nuevo
+        (modelo, imgsz); si no, None.
+        """
+        self._observadas.append(latencia)
+        if time.perf_counter() - self._ultima_revision < self.revisa_cada:
+            return None
+        self._ultima_revision = time.perf_counter()
+        media = float(np.mean(self._observadas))
+        self._observadas = []
+        self.latencias[self.elegido] = media
+
+        nuevo = self.elegido
+        if media > self.presupuesto and self.elegido + 1 < len(self.candidatos):
+            nuevo = self.elegido + 1
+        elif (self.elegido > 0 and self.elegido - 1 in self.latencias
+              and self.latencias[self.elegido - 1] <= 0.8 * self.presupuesto):
+            # sube un escalón solo si el más preciso ya se midió holgado
+            nuevo = self.elegido - 1
+        if nuevo == self.elegido:
+            return None
+
+        print(f"[AutoAjuste] {self.nombre}: {media * 1000:.1f} ms de media con presupuesto "
+              f"{self.presupuesto * 1000:.1f} ms -> {self.candidatos[nuevo]}")
+        self.elegido = nuevo
+        self.guarda()
+        candidato = self.candidatos[nuevo]
+        return self._modelo(candidato['modelo'], carga), candidato['imgsz']
+
+    # ---- informe y guardado
+
+    def informa(self):
+        print(f"[AutoAjuste] {self.nombre}: presupuesto {self.presupuesto * 1000:.1f} ms por inferencia")
+        for i, candidato in enumerate(self.candidatos):
+            marca = '->' if i == self.elegido else '  '
+            latencia = self.latencias.get(i)
+            texto = f"{latencia * 1000:7.1f} ms" if latencia is not None else "   sin medir"
+            print(f"[AutoAjuste] {marca} {candidato['modelo']:<20} imgsz={candidato['imgsz']:<4} {texto}")
+
+    def _huella(self):
+        return {'cpu': platform.processor() or platform.machine(),
+                'presupuesto_ms': round(self.presupuesto * 1000, 2),
+                'candidatos': self.candidatos}
+
+    def _lee_guardado(self):
+        if not os.path.exists(self.ruta):
+            return None
+        with open(self.ruta, "r") as file:
+            guardado = (yaml.safe_load(file) or {}).get(self.nombre)
+        # solo vale si se midió en esta CPU y con los mismos candidatos y presupuesto
+        if not guardado or any(guardado.get(k) != v for k, v in self._huella().items()):
+            return None
+        return guardado['elegido']
+
+    def guarda(self):
+        todo = {}
+        if os.path.exists(self.ruta):
+            with open(self.ruta, "r") as file:
+                todo = yaml.safe_load(file) or {}
+        candidato = self.candidatos[self.elegido]
+        todo[self.nombre] = {**self._huella(),
+                             'elegido': self.elegido,
+                             'modelo': candidato['modelo'],
+                             'imgsz': candidato['imgsz'],
+                             'latencias_ms': {i: round(l * 1000, 2) for i, l in self.latencias.items()},
+                             'fecha': time.strftime('%Y-%m-%d %H:%M:%S')}
+        with open(self.ruta, "w") as file:
+            yaml.safe_dump(todo, file, sort_keys=False, allow_unicode=True)
+
+
+def carga_autoajuste(nombre, config, frame_skip):
+    """AutoAjuste del modelo nombre según la sección autoajuste de config.yaml, o None si está apagado"""
+    config_ajuste = config.get('autoajuste', {})
+    candidatos = config_ajuste.get('candidatos', {}).get(nombre)
+    if not config_ajuste.get('activo', False) or not candidatos:
+        return None
+    return AutoAjuste(nombre, candidatos,
+                      target_fps=config.get('target_fps', 30),
+                      frame_skip=frame_skip,
+                      repeticiones=config_ajuste.get('repeticiones', 10),
+                      revisa_cada=config_ajuste.get('revisa_cada', 30.0),
+                      reutiliza_guardado=config_ajuste.get('reutiliza_guardado', False),
+                      forma_frame=(config['frame_y'], config['frame_x'], 3))
@@ -0,0 +1,79 @@
+import importlib.util
+from pathlib import Path
+
+# Backends de inferencia para CPU. En máquinas sin MPS ni CUDA los .pt de
+# YOLO se exportan una vez a ONNX (ONNX Runtime) u OpenVINO y se guardan al
+# lado de los pesos; ultralytics carga la exportación con la misma clase YOLO,
+# así que SensorObjeto y ModeloTelecontrol reciben los mismos Results (boxes,
+# keypoints, names) que con PyTorch.
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+
+def _disponible(modulo):
+    return importlib.util.find_spec(modulo) is not None
+
+
+def elige_backend(backend, device):
+    """'auto': OpenVINO u ONNX Runtime si están instalados y no hay GPU; si no, torch"""
+    if backend == 'auto':
+        if device != 'cpu':
+            return 'torch'
+        if _disponible('openvino'):
+            return 'openvino'
+        if _disponible('onnxruntime'):
+            return 'onnx'
+        return 'torch'
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de inferencia desconocido: {backend}, opciones {BACKENDS} o 'auto'")
+    return backend
+
+
+def ruta_exportada(pesos, backend):
+    origen = Path(pesos)
+    if backend == 'onnx':
+        return origen.with_suffix('.onnx')
+    return origen.with_name(f"{origen.stem}_openvino_model")
+
+
+def exporta(pesos, backend, YOLO):
+    """Ruta de la exportación de pesos a backend; solo exporta si no está o si el .pt es más nuevo"""
+    if Path(pesos).suffix != '.pt':
+        return pesos   # ya es una exportación
+    destino = ruta_exportada(pesos, backend)
+    origen = Path(pesos)
+    if destino.exists() and not (origen.exists() and origen.stat().st_mtime > destino.stat().st_mtime):
+        return str(destino)
+
+    print(f"[YOLO] Exportando {pesos} a {backend} (solo la primera vez)...")
+    # dynamic: el autoajuste puede cambiar imgsz sin volver a exportar
+    return str(YOLO(pesos).export(format=backend, dynamic=True))
+
+
+def ajusta_hilos(modelo, backend, ruta, hilos):
+    """
+    Rehace la sesión de ONNX Runtime u OpenVINO con hilos de intra-op. ultralytics
+    la crea en la primera predicción, así que el modelo tiene que estar ya calentado.
+    """
+    if hilos is None or backend == 'torch':
+        return
+    try:
+        nucleo = modelo.predictor.model   # AutoBackend de ultralytics
+        if backend == 'onnx':
+            import onnxruntime as ort
+            opciones = ort.SessionOptions()
+            opciones.intra_op_num_threads = hilos
+            opciones.inter_op_num_threads = 1
+            opciones.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            nucleo.session = ort.InferenceSession(ruta, opciones, providers=nucleo.session.get_providers())
+        else:
+            import openvino as ov
+            core = ov.Core()
+            xml = next(Path(ruta).glob('*.xml'))
+            nucleo.ov_compiled_model = core.compile_model(
+                core.read_model(xml), 'CPU',
+                {'INFERENCE_NUM_THREADS': hilos, 'PERFORMANCE_HINT': 'LATENCY'})
+        print(f"[YOLO] {backend} con {hilos} hilos")
+    except (AttributeError, ImportError, StopIteration) as e:
+        # otra versión de ultralytics/openvino: se queda con los hilos por defecto
+        print(f"[YOLO] No se pudieron fijar {hilos} hilos en {backend}: {e}")
@@ -0,0 +1,190 @@
+import hashlib
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Versiones int8 de los modelos YOLO para los portátiles sin GPU. Se parte de
+# la exportación ONNX (BackendYOLO.exporta) y se cuantiza con ONNX Runtime
+# usando frames grabados como calibración. Al construir el modelo int8 se
+# compara con el float sobre esos frames (IoU de las cajas, error de los
+# keypoints) y el resultado se guarda a su lado; si se aleja demasiado se
+# sigue con el float. El nombre del int8 lleva una huella de los frames y de
+# los parámetros de calibración: si cambian se vuelve a cuantizar.
+
+EXTENSIONES = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# parámetros de quantize_static; forman parte de la huella del modelo int8
+PARAMETROS_CUANTIZACION = {'formato': 'QDQ', 'por_canal': True, 'activaciones': 'QUInt8', 'pesos': 'QInt8'}
+
+
+def rutas_calibracion(carpeta, nombre, max_frames):
+    """Imágenes de carpeta/nombre si existe (deteccion, telecontrol), si no de carpeta"""
+    carpeta = Path(carpeta)
+    if (carpeta / nombre).is_dir():
+        carpeta = carpeta / nombre
+    return sorted(r for r in carpeta.glob('*') if r.suffix.lower() in EXTENSIONES)[:max_frames]
+
+
+def frames_calibracion(rutas):
+    return [frame for frame in (cv2.imread(str(r)) for r in rutas) if frame is not None]
+
+
+def huella_calibracion(rutas, imgsz):
+    """Huella corta del contenido de las imágenes, imgsz y los parámetros de cuantización"""
+    huella = hashlib.sha256(json.dumps({'imgsz': imgsz, **PARAMETROS_CUANTIZACION}, sort_keys=True).encode())
+    for ruta in rutas:
+        huella.update(ruta.name.encode())
+        huella.update(ruta.read_bytes())
+    return huella.hexdigest()[:12]
+
+
+def preprocesa(frame, imgsz):
+    """Letterbox como ultralytics: BGR -> RGB, escala sin deformar, relleno 114, NCHW en [0, 1]"""
+    alto, ancho = frame.shape[:2]
+    escala = min(imgsz / alto, imgsz / ancho)
+    nuevo_alto, nuevo_ancho = round(alto * escala), round(ancho * escala)
+    lienzo = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    arriba, izquierda = (imgsz - nuevo_alto) // 2, (imgsz - nuevo_ancho) // 2
+    lienzo[arriba:arriba + nuevo_alto, izquierda:izquierda + nuevo_ancho] = cv2.resize(frame, (nuevo_ancho, nuevo_alto))
+    return np.ascontiguousarray(lienzo[..., ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def ruta_int8(ruta_onnx, huella):
+    origen = Path(ruta_onnx)
+    return origen.with_name(f"{origen.stem}.int8-{huella}.onnx")
+
+
+def al_dia(ruta_onnx, destino):
+    """Si el int8 (y su comparación con el float) se hizo a partir de esta exportación float"""
+    informe = destino.with_suffix('.json')
+    return (destino.exists() and informe.exists()
+            and destino.stat().st_mtime >= Path(ruta_onnx).stat().st_mtime)
+
+
+def cuantiza(ruta_onnx, destino, frames, imgsz):
+    """Escribe en destino la versión int8 de ruta_onnx calibrada con frames"""
+    from onnxruntime import InferenceSession
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    origen = Path(ruta_onnx)
+    nombre_entrada = InferenceSession(str(origen), providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class LectorCalibracion(CalibrationDataReader):
+        def __init__(self):
+            self._entradas = iter([{nombre_entrada: preprocesa(frame, imgsz)} for frame in frames])
+
+        def get_next(self):
+            return next(self._entradas, None)
+
+    print(f"[Cuantizacion] Calibrando {origen.name} con {len(frames)} frames...")
+    quantize_static(str(origen), str(destino), LectorCalibracion(),
+                    quant_format=getattr(QuantFormat, PARAMETROS_CUANTIZACION['formato']),
+                    per_channel=PARAMETROS_CUANTIZACION['por_canal'],
+                    activation_type=getattr(QuantType, PARAMETROS_CUANTIZACION['activaciones']),
+                    weight_type=getattr(QuantType, PARAMETROS_CUANTIZACION['pesos']))
+    return str(destino)
+
+
+def _iou(a, b):
+    """IoU entre las cajas a (N, 4) y b (M, 4) en xyxy, (N, M)"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    interseccion = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return interseccion / np.maximum(area_a[:, None] + area_b[None, :] - interseccion, 1e-9)
+
+
+def compara(modelo_float, modelo_int8, frames, tarea, imgsz):
+    """
+    Detección: IoU media de cada caja del float con la mejor de la misma clase
+    del int8 (0 si no la hay). Pose: error medio en pixels de los keypoints de
+    la primera persona. Devuelve {'iou': ...} o {'error_keypoints': ...}.
+    """
+    ious, errores = [], []
+    for frame in frames:
+        r_float = modelo_float(frame, imgsz=imgsz, verbose=False, device='cpu')[0]
+        r_int8 = modelo_int8(frame, imgsz=imgsz, verbose=False, device='cpu')[0]
+        if tarea == 'pose':
+            if len(r_float.keypoints) == 0:
+                continue
+            if len(r_int8.keypoints) == 0:
+                errores.append(np.inf)
+                continue
+            kp_float = r_float.keypoints.xy.cpu().numpy()[0]
+            kp_int8 = r_int8.keypoints.xy.cpu().numpy()[0]
+            errores.append(float(np.linalg.norm(kp_float - kp_int8, axis=-1).mean()))
+        else:
+            cajas_float, clases_float = r_float.boxes.xyxy.cpu().numpy(), r_float.boxes.cls.cpu().numpy()
+            cajas_int8, clases_int8 = r_int8.boxes.xyxy.cpu().numpy(), r_int8.boxes.cls.cpu().numpy()
+            if len(cajas_float) == 0:
+                continue
+            if len(cajas_int8) == 0:
+                ious.extend([0.0] * len(cajas_float))
+                continue
+            iou = np.where(clases_float[:, None] == clases_int8[None, :], _iou(cajas_float, cajas_int8), 0.0)
+            ious.extend(iou.max(axis=1).tolist())
+
+    if tarea == 'pose':
+        return {'error_keypoints': float(np.mean(errores)) if errores else None, 'frames': len(errores)}
+    return {'iou': float(np.mean(ious)) if ious else None, 'cajas': len(ious)}
+
+
+def carga_cuantizado(pesos, tarea, YOLO, config_cuantizacion):
+    """
+    Modelo int8 listo para usar, o None si no se puede o no pasa la
+    comprobación (y entonces se carga el float de siempre). La cuantización
+    y la comparación con el float solo se hacen cuando cambian los pesos o
+    la calibración (o con compara_siempre); si no, se lee el resultado guardado.
+    """
+    import importlib.util
+    from BackendYOLO import exporta
+
+    if importlib.util.find_spec('onnxruntime') is None:
+        print("[Cuantizacion] onnxruntime no está instalado: se usa el modelo float")
+        return None
+
+    nombre = 'telecontrol' if tarea == 'pose' else 'deteccion'
+    imgsz = config_cuantizacion.get('imgsz', 640)
+    rutas = rutas_calibracion(config_cuantizacion.get('carpeta_calibracion', 'P3/calibracion'),
+                              nombre, config_cuantizacion.get('max_frames', 100))
+    if not rutas:
+        print(f"[Cuantizacion] No hay frames de calibración para {nombre}: se usa el modelo float")
+        return None
+
+    ruta_float = exporta(pesos, 'onnx', YOLO)
+    destino = ruta_int8(ruta_float, huella_calibracion(rutas, imgsz))
+    informe = destino.with_suffix('.json')
+
+    if not al_dia(ruta_float, destino) or config_cuantizacion.get('compara_siempre', False):
+        frames = frames_calibracion(rutas)
+        if not frames:
+            print(f"[Cuantizacion] Ningún frame de calibración de {nombre} se puede leer: se usa el modelo float")
+            return None
+        if not al_dia(ruta_float, destino):
+            cuantiza(ruta_float, destino, frames, imgsz)
+        resultado = compara(YOLO(ruta_float, task=tarea), YOLO(str(destino), task=tarea), frames, tarea, imgsz)
+        informe.write_text(json.dumps(resultado))
+    else:
+        resultado = json.loads(informe.read_text())
+
+    # los umbrales se aplican al cargar: cambiarlos no obliga a volver a comparar
+    if tarea == 'pose':
+        error, maximo = resultado['error_keypoints'], config_cuantizacion.get('error_keypoints_maximo', 8.0)
+        valido = error is not None and error <= maximo
+        texto = f"error medio de keypoints {error} px (máximo {maximo}) en {resultado['frames']} frames"
+    else:
+        iou, minima = resultado['iou'], config_cuantizacion.get('iou_minima', 0.85)
+        valido = iou is not None and iou >= minima
+        texto = f"IoU media {iou} (mínimo {minima}) en {resultado['cajas']} cajas"
+
+    if not valido:
+        print(f"[Cuantizacion] {destino.name}: {texto} -> se usa el modelo float")
+        return None
+    print(f"[Cuantizacion] {destino.name}: {texto} -> int8")
+    return YOLO(str(destino), task=tarea)
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from RoboboAPI import Percepcion
+
+
+class DetectorAsincrono:
+    """
+    Pasa YOLO en su propio hilo para que Entorno.step y moveWheels no esperen
+    a la inferencia. Siempre coge el frame mas reciente de la fuente (Camara o
+    RoboboVideo guardan solo el ultimo, asi que los viejos se descartan y no se
+    encolan) y publica la ultima Percepcion con la hora del frame; el bucle de
+    control la lee sin bloquear y va a su ritmo. Si la fuente es una Camara
+    se duerme hasta que hay un frame nuevo en vez de repetir el mismo.
+    """
+
+    def __init__(self, sensor_objeto, fuente, espera_sin_frame=0.005):
+        self.sensor_objeto = sensor_objeto
+        self.fuente = fuente
+        self.espera_sin_frame = espera_sin_frame
+
+        self.lock = threading.Lock()
+        self._percepcion = Percepcion.vacia()
+        self._frame = None
+        self._seq_frame = 0
+        self.detecciones = 0
+        self.latencia = 0.0    # desde que se cogio el frame hasta publicar el resultado
+
+        self.running = True
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+        print("[DetectorAsincrono] Hilo de detección iniciado")
+
+    def _siguiente_frame(self, seq):
+        """(frame, seq, instante) del siguiente frame de la fuente"""
+        if hasattr(self.fuente, 'espera_frame'):
+            return self.fuente.espera_frame(seq, timeout=0.1, espejo=False)
+        frame = self.fuente()
+        if frame is None:
+            time.sleep(self.espera_sin_frame)
+        return frame, seq, time.time()
+
+    def update(self):
+        seq = 0
+        while self.running:
+            frame, seq, instante_frame = self._siguiente_frame(seq)
+            if frame is None:
+                if not getattr(self.fuente, 'running', True):
+                    # la cámara se ha parado (p. ej. se perdió el vídeo del robot)
+                    print("[DetectorAsincrono] La fuente de frames se ha parado")
+                    break
+                continue
+
+            # la fuente da vistas sin voltear ni copiar: se comprueba al acabar que no se han pisado
+            vigente = (lambda: self.fuente.frame_vigente(seq)) if hasattr(self.fuente, 'frame_vigente') else None
+            x, y, tamano, confianza = self.sensor_objeto.detecta(frame, espejo=True, vigente=vigente)
+            if vigente is not None and not vigente():
+                continue
+            percepcion = Percepcion(x=x, y=y, tamano=tamano, confianza=confianza,
+                                    instante_frame=instante_frame)
+            with self.lock:
+                self._percepcion = percepcion
+                self._frame = frame
+                self._seq_frame = seq
+                self.detecciones += 1
+                self.latencia = time.time() - instante_frame
+
+    def ultima(self):
+        """Última percepción publicada, sin esperar a la inferencia en curso"""
+        with self.lock:
+            return self._percepcion
+
+    def ultimo_frame(self):
+        """
+        Copia del frame de la última percepción (para visualizar desde el
+        hilo principal), o None si la captura ya ha reutilizado su buffer.
+        """
+        with self.lock:
+            frame, seq = self._frame, self._seq_frame
+        if frame is None:
+            return None
+        frame = frame.copy()
+        if hasattr(self.fuente, 'frame_vigente') and not self.fuente.frame_vigente(seq):
+            return None
+        return frame
+
+    def stop(self):
+        print("[DetectorAsincrono] Deteniendo...")
+        self.running = False
+        self.thread.join(timeout=1)
+
+
+class DetectorRemoto:
+    """
+    Misma interfaz que DetectorAsincrono, pero la detección se hace en otro
+    proceso (pipeline.py) y llega por una ColaUltimos. No hay frame que
+    visualizar aquí: lo muestra el propio proceso de detección.
+    """
+
+    def __init__(self, cola):
+        self.cola = cola
+        self._percepcion = Percepcion.vacia()
+        self.detecciones = 0
+
+    def ultima(self):
+        mensaje = self.cola.ultimo()
+        if mensaje is not None:
+            self._percepcion = Percepcion(**mensaje)
+            self.detecciones += 1
+        return self._percepcion
+
+    def ultimo_frame(self):
+        return None
+
+    def stop(self):
+        pass
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Ejecutor de inferencia compartido por SensorObjeto y ModeloTelecontrol.
+# Cada modelo tiene su propio hilo de trabajo con su presupuesto de hilos de
+# torch (con OpenMP torch.set_num_threads vale para el hilo que lo llama),
+# así YOLO de objetos y YOLO de pose no intentan usar cada uno todos los
+# núcleos a la vez ni se los quitan a los hilos de captura de las cámaras.
+# Cuando en un tick hacen falta los dos, en_paralelo los lanza a la vez.
+
+
+class EjecutorInferencia:
+
+    def __init__(self, hilos=None, hilos_interop=1):
+        self.hilos = dict(hilos or {})          # nombre -> hilos intra-op de torch
+        self.modelos = {}
+        self._ejecutores = {}
+        self._tareas = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tarea')
+        self._lock = threading.Lock()
+        self._en_curso = 0
+        self._latencias = {}                    # nombre -> [(latencia, solapada)]
+        self._cpu_inicio = (time.perf_counter(), self._cpu_proceso())
+
+        try:
+            import torch
+            # solo se puede fijar una vez y antes de cualquier trabajo en paralelo
+            torch.set_num_interop_threads(hilos_interop)
+        except (ImportError, RuntimeError):
+            pass
+
+    @staticmethod
+    def _cpu_proceso():
+        tiempos = os.times()
+        return tiempos.user + tiempos.system
+
+    def registra(self, nombre, modelo):
+        """Da de alta (o sustituye, p. ej. tras el autoajuste) el modelo nombre"""
+        self.modelos[nombre] = modelo
+        if nombre not in self._ejecutores:
+            hilos = self.hilos.get(nombre)
+            self._ejecutores[nombre] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f'inferencia-{nombre}',
+                initializer=self._inicia_hilo, initargs=(hilos,))
+            self._latencias[nombre] = []
+
+    @staticmethod
+    def _inicia_hilo(hilos):
+        if hilos is not None:
+            import torch
+            torch.set_num_threads(hilos)
+
+    def _ejecuta(self, nombre, imagen, opciones):
+        with self._lock:
+            solapada = self._en_curso > 0
+            self._en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            return self.modelos[nombre](imagen, **opciones)
+        finally:
+            latencia = time.perf_counter() - inicio
+            with self._lock:
+                self._en_curso -= 1
+                self._latencias[nombre].append((latencia, solapada or self._en_curso > 0))
+
+    def lanza(self, nombre, imagen, **opciones):
+        """Inferencia del modelo nombre en su hilo; devuelve un Future"""
+        return self._ejecutores[nombre].submit(self._ejecuta, nombre, imagen, opciones)
+
+    def infiere(self, nombre, imagen, **opciones):
+        """Como llamar al modelo, pero en su hilo con su presupuesto de hilos"""
+        return self.lanza(nombre, imagen, **opciones).result()
+
+    def en_paralelo(self, tareas):
+        """
+        tareas: {nombre: funcion sin argumentos} que hacen sus inferencias con
+        infiere. Se ejecutan a la vez y se devuelve {nombre: resultado}.
+        """
+        nombres = list(tareas)
+        futuros = {nombre: self._tareas.submit(tareas[nombre]) for nombre in nombres[1:]}
+        resultados = {nombres[0]: tareas[nombres[0]]()} if nombres else {}
+        resultados.update({nombre: futuro.result() for nombre, futuro in futuros.items()})
+        return resultados
+
+    def informe(self):
+        """Latencia por modelo, sola y solapada con otra inferencia, y uso de CPU del proceso"""
+        instante, cpu = time.perf_counter(), self._cpu_proceso()
+        nucleos = os.cpu_count() or 1
+        uso_cpu = (cpu - self._cpu_inicio[1]) / max(1e-9, (instante - self._cpu_inicio[0]) * nucleos)
+
+        informe = {'uso_cpu': uso_cpu, 'nucleos': nucleos,
+                   'hilos_pedidos': sum(h for h in self.hilos.values() if h), 'modelos': {}}
+        for nombre, muestras in self._latencias.items():
+            if not muestras:
+                continue
+            latencias = np.array([m[0] for m in muestras])
+            solapadas = np.array([m[1] for m in muestras])
+            sola = latencias[~solapadas].mean() if (~solapadas).any() else None
+            solapada = latencias[solapadas].mean() if solapadas.any() else None
+            informe['modelos'][nombre] = {
+                'inferencias': len(muestras),
+                'media_ms': 1000 * latencias.mean(),
+                'p95_ms': 1000 * np.percentile(latencias, 95),
+                'sola_ms': None if sola is None else 1000 * sola,
+                'solapada_ms': None if solapada is None else 1000 * solapada,
+                # cuánto más lenta va cuando compite con otra inferencia
+                'contencion': None if sola is None or solapada is None else solapada / sola,
+            }
+        return informe
+
+    def imprime_informe(self):
+        informe = self.informe()
+        print(f"[Ejecutor] CPU del proceso {100 * informe['uso_cpu']:.0f}% de {informe['nucleos']} núcleos, "
+              f"{informe['hilos_pedidos']} hilos de inferencia pedidos")
+        for nombre, datos in informe['modelos'].items():
+            texto = f"[Ejecutor] {nombre:<12} {datos['inferencias']:5d} inferencias, media {datos['media_ms']:6.1f} ms, " \
+                    f"p95 {datos['p95_ms']:6.1f} ms"
+            if datos['contencion'] is not None:
+                texto += f", sola {datos['sola_ms']:.1f} ms / solapada {datos['solapada_ms']:.1f} ms " \
+                         f"(x{datos['contencion']:.2f})"
+            print(texto)
+
+    def cierra(self):
+        for ejecutor in self._ejecutores.values():
+            ejecutor.shutdown(wait=True)
+        self._tareas.shutdown(wait=True)
+
+
+_ejecutor = None
+_lock_ejecutor = threading.Lock()
+
+
+def ejecutor_inferencia():
+    """El EjecutorInferencia del proceso según la sección ejecutor de config.yaml, o None si está apagado"""
+    global _ejecutor
+    from configuracion import config
+    config_ejecutor = config.get('ejecutor', {})
+    if not config_ejecutor.get('activo', False):
+        return None
+    # SensorObjeto y ModeloTelecontrol pueden pedirlo a la vez desde los hilos de Arranque
+    with _lock_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = EjecutorInferencia(hilos=config_ejecutor.get('hilos'),
+                                           hilos_interop=config_ejecutor.get('hilos_interop', 1))
+    return _ejecutor
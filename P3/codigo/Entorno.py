@@ -8,6 +8,15 @@ import RoboboAPI
 
 from ui import ui
 
+def carga_sensor_objeto(clase_objeto):
+    """SensorObjeto con su YOLO; torch y ultralytics se importan aquí"""
+    from SensorObjeto import SensorObjeto
+    return SensorObjeto(
+        modelo_yolo='yolov8n.pt',  # o el modelo que prefieras
+        clase_objetivo=clase_objeto
+    )
+
+
 class Entorno(gym.Env):
 
     def __init__(self, 
@@ -22,7 +31,10 @@ class Entorno(gym.Env):
                 mundo_real = False,
                 camara = None,  # Nueva: referencia a la cámara
                 clase_objeto = 'bottle',  # Nueva: qué objeto detectar
-                visualizar_detecciones = True):  # Nueva: mostrar detecciones
+                visualizar_detecciones = True,  # Nueva: mostrar detecciones
+                deteccion_asincrona = False,  # YOLO en un hilo aparte del bucle de control
+                detector = None,  # detección que llega de otro proceso (pipeline.py)
+                conecta = True):  # False: las conexiones se hacen después (Arranque en main.py)
 
         self.pasos_por_episodio = pasos_por_episodio
         self.alpha1 = alpha1
@@ -33,45 +45,22 @@ class Entorno(gym.Env):
         self._velocidad_blob = velocidad_blob
         self.mundo_real = mundo_real
         self.visualizar_detecciones = visualizar_detecciones
+        self.percepcion_anticipada = None
+
+        self.ip = ip
+        self.camara = camara
+        self.clase_objeto = clase_objeto
+        self.deteccion_asincrona = deteccion_asincrona
+        self.robocop = None
+        self.sim = None
+        self.poses = None
+        self.video = None
+        self.camara_robobo = None   # CamaraRobobo sobre self.video, si no hay camara
+        self.sensor_objeto = None
+        self.detector = detector
+        # se llama una vez tras el primer moveWheels (main.py cierra ahí la cronología de arranque)
+        self.al_primer_movimiento = None
 
-        print(ip)
-        self.robocop = RoboboAPI.init_Robobo(ip)
-        self.robocop.connect()
-        print('conectado!')
-
-        if not self.mundo_real:
-            self.sim = RoboboAPI.init_RoboboSim(ip)
-            self.sim.connect()
-            self.video = None
-            self.camara = None
-            self.sensor_objeto = None
-            print("[Entorno] Modo SIMULACIÓN: usando sensores de blob")
-
-        else:
-            self.sim = None
-            print('antes de video')
-            self.video = RoboboAPI.init_RoboboVideo(ip)
-            print('despues de video')
-            self.video.connect()
-            self.robocop.startStream()
-
-            if camara is None:
-                #raise ValueError("Se requiere una cámara para mundo_real=True")
-                self.get_frame = RoboboAPI._get_robobo_frame(self.video)
-            else:
-                self.get_frame = camara.get_frame
-
-            print('-')
-
-            # Inicializar el sensor de objeto basado en cámara
-            from SensorObjeto import SensorObjeto
-            self.sensor_objeto = SensorObjeto(
-                modelo_yolo='yolov8n.pt',  # o el modelo que prefieras
-                clase_objetivo=clase_objeto
-            )
-            print(f"[Entorno] Modo MUNDO REAL: usando cámara para detectar '{clase_objeto}'")
-
-        
         self.velocidad_min = -2
         self.velocidad_max = 2
 
@@ -79,16 +68,17 @@ class Entorno(gym.Env):
         self.historial_recompensas = []
         self.historial_xy_objeto = []
         self.historial_xy_robot = []
+        self.historial_sensores = []
         
         # Variables para el episodio actual
         self.recompensas_episodio = []
         self.xy_objeto_episodio = []
         self.xy_robot_episodio = []
+        self.sensores_episodio = []
 
         # Inicialización de las variables 
-        self._blob_xy = np.array([-1, -1], dtype=np.int32)
-        self._IR = np.array([0, 0], dtype=np.int32)
-        self._tamano_blob = np.array([-1], dtype=np.int32)
+        # blob_xy, IR y tamano_blob salen de una única lectura por paso
+        self._sensores = RoboboAPI.SensorSnapshot.vacio(num_IR=2)
         self._velocidad = np.array([0, 0], dtype=np.float32)
         self.tamano_blob_max = 1000
         self.IR_max = 10000
@@ -104,21 +94,101 @@ class Entorno(gym.Env):
 
         self.action_space = gym.spaces.Box(self.velocidad_min, self.velocidad_max, shape=(2,), dtype=float)
         self.ui_origen = "?"
+
+        if conecta:
+            self.conecta()
+
+    def conecta(self):
+        """Conexiones en serie; main.py las reparte entre los hilos de Arranque"""
+        self.conecta_robot()
+        if self.mundo_real:
+            if self.detector is None:
+                self.conecta_video()
+            self.inicia_stream()
+            if self.detector is None:
+                self.prepara_deteccion()
+
+    def conecta_robot(self):
+        """Robobo y, en simulación, RoboboSim y el servicio de poses"""
+        print(self.ip)
+        self.robocop = RoboboAPI.init_Robobo(self.ip)
+        self.robocop.connect()
+        print('conectado!')
+
+        if not self.mundo_real:
+            self.sim = RoboboAPI.init_RoboboSim(self.ip)
+            self.sim.connect()
+            # poses reales del robot y de los objetos, cacheadas por paso
+            self.poses = RoboboAPI.init_ServicioPoses(self.sim)
+            print("[Entorno] Modo SIMULACIÓN: usando sensores de blob")
+
+    def conecta_video(self):
+        """Cliente del vídeo del smartphone (mundo real con la detección en este proceso)"""
+        print('antes de video')
+        self.video = RoboboAPI.init_RoboboVideo(self.ip)
+        print('despues de video')
+        self.video.connect()
+
+    def inicia_stream(self):
+        """Pide al robot que emita vídeo; necesita conecta_robot"""
+        self.robocop.startStream()
+        if self.detector is not None:
+            # captura y YOLO van en sus propios procesos: aquí solo se pide el stream
+            print("[Entorno] Modo MUNDO REAL: detección en otro proceso")
+
+    def prepara_deteccion(self, sensor_objeto=None, camara=None):
+        """
+        Fuente de frames, SensorObjeto y detector asíncrono del mundo real.
+        sensor_objeto: uno ya cargado (carga_sensor_objeto), si no se carga aquí.
+        camara: la que se haya abierto después de crear el entorno.
+        """
+        if camara is not None:
+            self.camara = camara
+        if self.camara is None:
+            #raise ValueError("Se requiere una cámara para mundo_real=True")
+            # un hilo recibe y decodifica el vídeo del robot; aquí solo se coge el último frame
+            from camara import CamaraRobobo
+            self.camara_robobo = CamaraRobobo(self.video)
+            self.camara = self.camara_robobo
+
+        # Inicializar el sensor de objeto basado en cámara
+        if sensor_objeto is None:
+            sensor_objeto = carga_sensor_objeto(self.clase_objeto)
+        self.sensor_objeto = sensor_objeto
+        print(f"[Entorno] Modo MUNDO REAL: usando cámara para detectar '{self.clase_objeto}'")
+
+        if self.deteccion_asincrona:
+            from DetectorAsincrono import DetectorAsincrono
+            # con una Camara el hilo espera a cada frame nuevo
+            self.detector = DetectorAsincrono(self.sensor_objeto, self.camara)
     
     def _get_observacion(self):
         """Convierte estado interno a observación"""
         #print(f'xy {self._blob_xy}     tamano {self._tamano_blob}')
         return {
-            "blob_xy": self._blob_xy, 
-            "IR": self._IR,
-            "tamano_blob": self._tamano_blob, 
+            "blob_xy": self._sensores.blob_xy, 
+            "IR": self._sensores.IR,
+            "tamano_blob": self._sensores.tamano_blob, 
             "velocidad": self._velocidad
         }
 
     def _get_info(self):
         return {'supu':'tamadre'}
 
+    def anticipa_percepcion(self):
+        """
+        Detecta ya sobre el frame actual para que el siguiente lee_sensores no
+        espere a YOLO; main.py lo lanza en paralelo con la pose. Solo hace algo
+        en mundo real sin detector en otro hilo o proceso.
+        """
+        if self.mundo_real and self.detector is None:
+            self.percepcion_anticipada = RoboboAPI._detecta(self)
+
     def desconecta(self):
+        if self.detector is not None:
+            self.detector.stop()
+        if self.camara_robobo is not None:
+            self.camara_robobo.stop()
         self.robocop.disconnect()
 
     def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
@@ -128,6 +198,8 @@ class Entorno(gym.Env):
 
         super().reset(seed=seed)
         RoboboAPI.reset(self)
+        if self.poses is not None:
+            self.poses.nuevo_episodio()
         self.numero_de_pasos = 1
 
         # Guardar el episodio anterior en el historial total
@@ -135,17 +207,18 @@ class Entorno(gym.Env):
             self.historial_recompensas.append(self.recompensas_episodio)
             self.historial_xy_objeto.append(self.xy_objeto_episodio)
             self.historial_xy_robot.append(self.xy_robot_episodio)
+            self.historial_sensores.append(self.sensores_episodio)
 
         # Limpiar listas del episodio actual
         self.recompensas_episodio = []
         self.xy_objeto_episodio = []
         self.xy_robot_episodio = []
+        self.sensores_episodio = []
 
 
-        # Los métodos hablan con robocop/cámara y lo meten en las variables
-        self._blob_xy = RoboboAPI._get_xy(self)
-        self._IR = RoboboAPI._get_IR(self)
-        self._tamano_blob = RoboboAPI._get_tamano_blob(self)
+        # Una sola lectura de robocop/cámara para todos los sensores
+        self._sensores = RoboboAPI.lee_sensores(self)
+        self.sensores_episodio.append(self._sensores)
 
         # Guardar posición inicial del objeto
         self.xy_objeto_episodio.append(RoboboAPI._get_object_xz(self))
@@ -161,13 +234,13 @@ class Entorno(gym.Env):
 
     def _get_recompensa(self):
         """Método auxiliar para devolver la recompensa"""
-        x = self._blob_xy[0]
+        x = self._sensores.blob_xy[0]
         d = RoboboAPI._distancia_a_blob(self)
-        atras = self._IR[1]
+        atras = self._sensores.IR[1]
         return (self.alpha1 * math.exp(-(x-50)**2) + 
                 self.alpha2 * math.exp(-(d/self.sigma)**2) - 
                 self.alpha3 * max(0, atras-58) + 
-                self.alpha4 * float(self._tamano_blob))
+                self.alpha4 * float(self._sensores.tamano_blob[0]))
     
     def step(self, accion):
         """Ejecuta un instante"""
@@ -178,8 +251,8 @@ class Entorno(gym.Env):
                 accion=accion,
                 origen=self.ui_origen,
                 recompensa=0,
-                tamano=self._tamano_blob,
-                xy=self._blob_xy
+                tamano=self._sensores.tamano_blob,
+                xy=self._sensores.blob_xy
             )
 
             avance_recto, gire_derecha = accion[0], accion[1]
@@ -187,7 +260,13 @@ class Entorno(gym.Env):
             dy = avance_recto - gire_derecha
 
             self.robocop.moveWheels(self._velocidad[0] + dx, self._velocidad[1] + dy)
+            if self.al_primer_movimiento is not None:
+                self.al_primer_movimiento()
+                self.al_primer_movimiento = None
             time.sleep(0.001)
+            # una sola consulta de poses al simulador por paso
+            if self.poses is not None:
+                self.poses.actualiza()
             self._velocidad[0] = np.clip(self._velocidad[0] + dx, self.velocidad_min, self.velocidad_max)
             self._velocidad[1] = np.clip(self._velocidad[1] + dy, self.velocidad_min, self.velocidad_max)
 
@@ -202,9 +281,8 @@ class Entorno(gym.Env):
 
             self.numero_de_pasos += 1
 
-            self._blob_xy = RoboboAPI._get_xy(self)
-            self._IR = RoboboAPI._get_IR(self)
-            self._tamano_blob = RoboboAPI._get_tamano_blob(self)
+            self._sensores = RoboboAPI.lee_sensores(self)
+            self.sensores_episodio.append(self._sensores)
 
             # UI update after computing reward
             ui.update(
@@ -212,8 +290,8 @@ class Entorno(gym.Env):
                 accion=accion,
                 origen=self.ui_origen,
                 recompensa=recompensa,
-                tamano=self._tamano_blob,
-                xy=self._blob_xy
+                tamano=self._sensores.tamano_blob,
+                xy=self._sensores.blob_xy
             )
 
             self.xy_objeto_episodio.append(RoboboAPI._get_object_xz(self))
@@ -0,0 +1,158 @@
+import queue
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Piezas para pasar datos entre los procesos del pipeline (pipeline.py): los
+# frames van por memoria compartida, sin serializarlos, y los resultados
+# pequeños (detecciones, acciones) por colas que descartan lo viejo.
+
+
+class AnilloFrames:
+    """
+    Buffer circular de frames en multiprocessing.shared_memory. Un único
+    escritor (el proceso de captura) va llenando las ranuras y los lectores
+    copian siempre el frame más reciente. Cada ranura lleva su número de
+    secuencia e instante de captura; si el escritor la pisa mientras se copia
+    la lectura se repite (seqlock), así nunca se devuelve un frame a medias.
+    """
+
+    def __init__(self, nombre, forma, ranuras=3, crea=False):
+        self.nombre = nombre
+        self.forma = tuple(forma)
+        self.ranuras = ranuras
+        bytes_frame = int(np.prod(self.forma))
+        # cabecera: [ultimo, seq por ranura..., instante por ranura...] en float64
+        bytes_cabecera = 8 * (1 + 2 * ranuras)
+
+        if crea:
+            self.shm = shared_memory.SharedMemory(name=nombre, create=True,
+                                                  size=bytes_cabecera + ranuras * bytes_frame)
+        else:
+            self.shm = shared_memory.SharedMemory(name=nombre)
+        self._creador = crea
+
+        self.cabecera = np.ndarray((1 + 2 * ranuras,), dtype=np.float64, buffer=self.shm.buf)
+        self.frames = np.ndarray((ranuras,) + self.forma, dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=bytes_cabecera)
+        if crea:
+            self.cabecera[:] = -1
+
+    @property
+    def ultimo(self):
+        """Secuencia del último frame escrito (-1 si todavía no hay ninguno)"""
+        return int(self.cabecera[0])
+
+    def escribe(self, frame, instante=None):
+        siguiente = self.ultimo + 1
+        ranura = siguiente % self.ranuras
+        self.cabecera[1 + ranura] = -1              # ranura en escritura
+        self.frames[ranura] = frame
+        self.cabecera[1 + self.ranuras + ranura] = time.time() if instante is None else instante
+        self.cabecera[1 + ranura] = siguiente
+        self.cabecera[0] = siguiente
+        return siguiente
+
+    def lee(self, desde=-1):
+        """
+        Copia del frame más reciente si es posterior a desde:
+        (frame, seq, instante) o (None, desde, None) si no hay nada nuevo.
+        """
+        while True:
+            seq = self.ultimo
+            if seq < 0 or seq <= desde:
+                return None, desde, None
+            ranura = seq % self.ranuras
+            frame = self.frames[ranura].copy()
+            instante = float(self.cabecera[1 + self.ranuras + ranura])
+            if int(self.cabecera[1 + ranura]) == seq:
+                return frame, seq, instante
+
+    def vista(self, desde=-1):
+        """
+        Como lee pero sin copiar: vista de solo lectura de la ranura. El
+        escritor la pisa al dar la vuelta al anillo, así que después de usarla
+        hay que comprobar vigente(seq) antes de fiarse del resultado.
+        """
+        seq = self.ultimo
+        if seq < 0 or seq <= desde:
+            return None, desde, None
+        ranura = seq % self.ranuras
+        vista = self.frames[ranura].view()
+        vista.flags.writeable = False
+        return vista, seq, float(self.cabecera[1 + self.ranuras + ranura])
+
+    def vigente(self, seq):
+        """Si la ranura del frame seq sigue teniendo ese frame"""
+        return int(self.cabecera[1 + seq % self.ranuras]) == seq
+
+    def cierra(self):
+        # las vistas numpy deben soltarse antes de cerrar el segmento
+        del self.cabecera, self.frames
+        self.shm.close()
+        if self._creador:
+            self.shm.unlink()
+
+
+class ColaUltimos:
+    """
+    Cola entre procesos para resultados pequeños. Si el consumidor va lento
+    se descarta lo más viejo en vez de acumular, y se cuentan los mensajes
+    puestos, sacados y descartados para poder ver la profundidad (qsize no
+    existe en macOS).
+    """
+
+    def __init__(self, maximo=2):
+        self.cola = mp.Queue(maxsize=maximo)
+        self.puestos = mp.Value('q', 0)
+        self.sacados = mp.Value('q', 0)
+        self.descartados = mp.Value('q', 0)
+
+    def pon(self, mensaje):
+        while True:
+            try:
+                self.cola.put_nowait(mensaje)
+                break
+            except queue.Full:
+                try:
+                    self.cola.get_nowait()
+                    with self.descartados.get_lock():
+                        self.descartados.value += 1
+                    with self.sacados.get_lock():
+                        self.sacados.value += 1
+                except queue.Empty:
+                    pass
+        with self.puestos.get_lock():
+            self.puestos.value += 1
+
+    def ultimo(self):
+        """Vacía la cola y devuelve el mensaje más reciente (None si no hay)"""
+        mensaje = None
+        while True:
+            try:
+                mensaje = self.cola.get_nowait()
+            except queue.Empty:
+                return mensaje
+            with self.sacados.get_lock():
+                self.sacados.value += 1
+
+    @property
+    def profundidad(self):
+        return self.puestos.value - self.sacados.value
+
+
+class Contador:
+    """Elementos procesados por una etapa, para medir su ritmo desde otro proceso"""
+
+    def __init__(self):
+        self.valor = mp.Value('q', 0)
+
+    def suma(self, n=1):
+        with self.valor.get_lock():
+            self.valor.value += n
+
+    @property
+    def total(self):
+        return self.valor.value
@@ -1,10 +1,15 @@
 from utils import carga_politica, esta_viendo
-from ModeloTelecontrol import carga_modelo_telecontrol
 
 class Modelo:
-    def __init__(self, ruta_politica, entorno, camara_telecontrol=None):
-        self.modelo_telecontrol = carga_modelo_telecontrol()
-        self.politica = carga_politica(ruta_politica, entorno)
+    def __init__(self, ruta_politica, entorno, camara_telecontrol=None,
+                 modelo_telecontrol=None, politica=None):
+        # modelo_telecontrol y politica: ya cargados, p. ej. en paralelo por Arranque
+        if modelo_telecontrol is None:
+            # torch y ultralytics se importan al crear el modelo, no al importar Modelo
+            from ModeloTelecontrol import carga_modelo_telecontrol
+            modelo_telecontrol = carga_modelo_telecontrol()
+        self.modelo_telecontrol = modelo_telecontrol
+        self.politica = politica if politica is not None else carga_politica(ruta_politica, entorno)
         self.entorno = entorno
         self.camara_telecontrol = camara_telecontrol
         
@@ -1,13 +1,14 @@
-import yaml 
 import numpy as np
 import cv2
 from pathlib import Path
 import torch
 
-from utils import carga_modelo_YOLO, muestra
+import time
 
-with open("P3/configs/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+from utils import carga_modelo_YOLO, muestra
+from AutoAjuste import carga_autoajuste
+from EjecutorInferencia import ejecutor_inferencia
+from configuracion import config
 
 
 class ModeloTelecontrol:
@@ -35,20 +36,34 @@ class ModeloTelecontrol:
         self.ratio_adelante = config_movimiento.get('ratio_adelante', 1.0)
         self.ratio_atras = config_movimiento.get('ratio_atras', 1.0) 
 
-        # Modelo YOLO - load only when needed
-        self.YOLO = carga_modelo_YOLO() 
         self.last_prediction_time = 0
         self.prediction_cache = None
         self.cache_duration = 0.1
         
         # Performance optimization
-        self.frame_skip = 2
+        self.frame_skip = max(1, config.get('performance', {}).get('frame_skip_telecontrol', 2))
         self.frame_counter = 0
         
         # Device info
         self.device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
         print(f"[Telecontrol] Usando dispositivo: {self.device}")
 
+        # Modelo YOLO: fijo, o el modelo e imgsz que elija el autoajuste
+        self._opciones_yolo = {'verbose': False, 'device': self.device}
+        self.ajuste = carga_autoajuste('telecontrol', config, self.frame_skip)
+        if self.ajuste is None:
+            self.YOLO = carga_modelo_YOLO()
+        else:
+            self.YOLO, self._opciones_yolo['imgsz'] = self.ajuste.ajusta(self._carga, self._opciones_yolo)
+
+        self.ejecutor = ejecutor_inferencia()
+        if self.ejecutor is not None:
+            self.ejecutor.registra('telecontrol', self.YOLO)
+
+    @staticmethod
+    def _carga(pesos):
+        return carga_modelo_YOLO(pose=True, pesos=pesos)
+
     def _normalizar_velocidad(self, vel):
         """Convierte velocidad del rango [0, 20] al rango [-2, 2]"""
         return vel * self.factor_normalizacion
@@ -181,7 +196,17 @@ class ModeloTelecontrol:
             return self.prediction_cache if self.prediction_cache is not None else self.quieto() 
 
         # Run inference on MPS device
-        resultados = self.YOLO(frame, verbose=False, device=self.device)
+        inicio = time.perf_counter()
+        if self.ejecutor is not None:
+            resultados = self.ejecutor.infiere('telecontrol', frame, **self._opciones_yolo)
+        else:
+            resultados = self.YOLO(frame, **self._opciones_yolo)
+        if self.ajuste is not None:
+            cambio = self.ajuste.observa(time.perf_counter() - inicio, self._carga)
+            if cambio is not None:
+                self.YOLO, self._opciones_yolo['imgsz'] = cambio
+                if self.ejecutor is not None:
+                    self.ejecutor.registra('telecontrol', self.YOLO)
         
         if len(resultados) == 0 or len(resultados[0].keypoints) == 0:
             print('YOLO no vio nada. solucionado usando cache')
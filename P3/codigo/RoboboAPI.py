@@ -1,11 +1,11 @@
 from robobopy.Robobo import Robobo
 from robobosim.RoboboSim import RoboboSim
-from robobopy_videostream.RoboboVideo import RoboboVideo
 from utils import muestra
+from dataclasses import dataclass
+from typing import Optional
 import random
 import numpy as np
 import math
-import cv2
 import time
 
 def init_Robobo(ip='localhost'):
@@ -15,56 +15,198 @@ def init_RoboboSim(ip='localhost'):
     return RoboboSim(ip)
 
 def init_RoboboVideo(ip='localhost'):
+    # solo hace falta en el mundo real: en simulación no se importa
+    from robobopy_videostream.RoboboVideo import RoboboVideo
     return RoboboVideo(ip) 
 
-def _get_xy(Entorno):
+@dataclass(frozen=True)
+class Percepcion:
+    """
+    Resultado de la cámara en un tick de control: una sola captura y una sola
+    pasada del detector, compartidas por observación, recompensa y UI.
+    """
+    x: int
+    y: int
+    tamano: float
+    confianza: float
+    instante_frame: float
 
-    if Entorno.mundo_real:
+    @classmethod
+    def vacia(cls, instante_frame=0.0):
+        return cls(x=-1, y=-1, tamano=-1, confianza=0.0, instante_frame=instante_frame)
 
-        frame = _get_robobo_frame(Entorno.video)
-        if frame is None:
-            return np.array([-1, -1])
-        
-        x, y, tamano = Entorno.sensor_objeto.detectar_objeto(frame)
-        
-        # Opcional: visualizar la detección para debugging
-        if Entorno.visualizar_detecciones:
-            frame = Entorno.sensor_objeto.visualizar_deteccion(frame, x, y, tamano)
-            muestra(frame, 'Deteccion Objeto')
-        
-        return np.array([x, y])
-    else:
-        # Usar sensores del Robobo (simulación)
-        blobs = Entorno.robocop.readAllColorBlobs()
-        if blobs:
-            for key in blobs:
-                blob = blobs[key]
-                return np.array([blob.posx, blob.posy])
-        return np.array([-1, -1])
+    @property
+    def detectado(self):
+        return self.x != -1
+
+
+@dataclass(frozen=True)
+class SensorSnapshot:
+    """
+    Lectura de los sensores del robot en un mismo instante de control.
+    Se lee una sola vez por paso y la comparten observacion, recompensa e historial.
+    """
+    blob_xy: np.ndarray
+    tamano_blob: np.ndarray
+    IR: np.ndarray
+    instante: float
+    percepcion: Optional[Percepcion] = None
 
+    def __post_init__(self):
+        # los arrays se comparten entre consumidores, asi que no se pueden modificar
+        for valor in (self.blob_xy, self.tamano_blob, self.IR):
+            valor.setflags(write=False)
 
+    @classmethod
+    def vacio(cls, num_IR=2):
+        return cls(blob_xy=np.array([-1, -1], dtype=np.int32),
+                   tamano_blob=np.array([-1], dtype=np.int32),
+                   IR=np.zeros(num_IR, dtype=np.int32),
+                   instante=time.time())
 
-def _get_tamano_blob(Entorno):
 
+def lee_sensores(Entorno):
+    """
+    Lee blob (o detección de cámara) e IR una sola vez y lo devuelve como un
+    SensorSnapshot inmutable, así x y tamaño salen siempre del mismo frame
+    """
+    percepcion = None
     if Entorno.mundo_real:
-        # Usar cámara
-        frame = _get_robobo_frame(Entorno.video)
-        if frame is None:
-            return np.array([-1])
-        
-        _, _, tamano = Entorno.sensor_objeto.detectar_objeto(frame)
-        return np.array([tamano])
+        anticipada = getattr(Entorno, 'percepcion_anticipada', None)
+        if anticipada is not None:
+            # ya se detectó este tick, en paralelo con la pose (Entorno.anticipa_percepcion)
+            Entorno.percepcion_anticipada = None
+            percepcion = _muestra_percepcion(Entorno, *anticipada)
+        else:
+            percepcion = _percibe(Entorno)
+        blob_xy = np.array([percepcion.x, percepcion.y])
+        tamano_blob = np.array([percepcion.tamano])
     else:
-        # Usar sensores del Robobo
         blobs = Entorno.robocop.readAllColorBlobs()
-        if blobs:
-            for key in blobs:
-                blob = blobs[key]
-                return np.array([blob.size])
-        return np.array([-1])
+        blob_xy, tamano_blob = _get_xy(blobs), _get_tamano_blob(blobs)
+
+    return SensorSnapshot(blob_xy=blob_xy,
+                          tamano_blob=tamano_blob,
+                          IR=_get_IR(Entorno),
+                          instante=time.time(),
+                          percepcion=percepcion)
+
+
+def _percibe(Entorno):
+    """
+    Una captura y una pasada del detector por tick de control. Los frames
+    llegan sin voltear: se voltea la caja y, si se visualiza, la imagen.
+    """
+    if Entorno.detector is not None:
+        # la deteccion va en su propio hilo: se coge la ultima sin esperar
+        percepcion = Entorno.detector.ultima()
+        if Entorno.visualizar_detecciones:
+            frame = Entorno.detector.ultimo_frame()
+            if frame is not None:
+                frame = Entorno.sensor_objeto.visualizar_deteccion(frame, percepcion.x, percepcion.y,
+                                                                   percepcion.tamano, espejo=True)
+                muestra(frame, 'Deteccion Objeto')
+        return percepcion
+
+    return _muestra_percepcion(Entorno, *_detecta(Entorno))
+
+
+def _detecta(Entorno):
+    """(Percepcion, frame) de una captura; sin ventanas, se puede llamar desde otro hilo"""
+    camara = Entorno.camara
+    instante_frame = time.time()
+    # vista sin copiar del último frame: al acabar se mira si la captura la pisó
+    frame, seq, _ = camara.get_frame_nuevo(0, espejo=False) if camara.running else (None, 0, None)
+    if frame is None:
+        return Percepcion.vacia(instante_frame), None
+
+    x, y, tamano, confianza = Entorno.sensor_objeto.detecta(
+        frame, espejo=True, vigente=lambda: camara.frame_vigente(seq))
+    percepcion = Percepcion(x=x, y=y, tamano=tamano, confianza=confianza, instante_frame=instante_frame)
+    if not Entorno.visualizar_detecciones:
+        return percepcion, None
+    # la ventana se pinta después, en el hilo principal: se copia y se comprueba que la copia está entera
+    frame = frame.copy()
+    return percepcion, frame if camara.frame_vigente(seq) else None
+
+
+def _muestra_percepcion(Entorno, percepcion, frame):
+    # Opcional: visualizar la detección para debugging (desde el hilo principal)
+    if Entorno.visualizar_detecciones and frame is not None:
+        frame = Entorno.sensor_objeto.visualizar_deteccion(frame, percepcion.x, percepcion.y,
+                                                           percepcion.tamano, espejo=True)
+        muestra(frame, 'Deteccion Objeto')
+    return percepcion
+
+
+def _get_xy(blobs):
+    """
+    Posición del blob a partir de la lectura de robocop (simulación)
+    """
+    if blobs:
+        for key in blobs:
+            blob = blobs[key]
+            return np.array([blob.posx, blob.posy])
+    return np.array([-1, -1])
+
+
+def _get_tamano_blob(blobs):
+    """
+    Tamaño del blob a partir de la lectura de robocop (simulación)
+    """
+    if blobs:
+        for key in blobs:
+            blob = blobs[key]
+            return np.array([blob.size])
+    return np.array([-1])
+
+def _get_robobo_frame(video, espejo=True):
+    frame = video.getImage()
+    if frame is None or not espejo:
+        return frame
+    import cv2
+    return cv2.flip(frame, 1)
+
+class ServicioPoses:
+    """
+    Poses reales del robot y de los objetos en RoboboSim con caché por paso.
+    La lista de objetos se descubre una vez por episodio y las poses se piden
+    una sola vez por paso; recompensa, historial y movimiento del blob leen
+    de la caché.
+    """
+    def __init__(self, sim, id_robot=0):
+        self.sim = sim
+        self.id_robot = id_robot
+        self.objetos = []
+        self.posicion_robot = None
+        self.posiciones_objetos = {}
+
+    @property
+    def posicion_objeto(self):
+        """Posición del primer objeto (el que se usa para distancia e historial)"""
+        if not self.objetos:
+            return None
+        return self.posiciones_objetos.get(self.objetos[0])
+
+    def nuevo_episodio(self):
+        """Descubre los objetos del escenario y lee las poses"""
+        self.objetos = list(self.sim.getObjects() or [])
+        self.actualiza()
+
+    def actualiza(self):
+        """Única consulta de poses al simulador en cada paso"""
+        self.posicion_robot = self.sim.getRobotLocation(self.id_robot)['position']
+        self.posiciones_objetos = {objeto: self.sim.getObjectLocation(objeto)['position']
+                                   for objeto in self.objetos}
+
+    def mueve_objeto(self, objeto, posicion):
+        self.sim.setObjectLocation(objeto, position=posicion)
+        self.posiciones_objetos[objeto] = posicion
+
+
+def init_ServicioPoses(sim):
+    return ServicioPoses(sim)
 
-def _get_robobo_frame(video):
-    return cv2.flip(video.getImage(), 1)
 
 def _get_object_xz(Entorno):
     """
@@ -74,12 +216,9 @@ def _get_object_xz(Entorno):
         # En mundo real no tenemos acceso a coordenadas 3D exactas
         return np.array([0.0, 0.0])
     
-    objetos = Entorno.sim.getObjects()
-    if objetos != None and len(objetos) > 0:
-        for objeto in objetos:
-            posicion = Entorno.sim.getObjectLocation(objeto)['position']
-            x_obj, z_obj = posicion['x'], posicion['z']
-            return np.array([x_obj, z_obj])
+    posicion = Entorno.poses.posicion_objeto
+    if posicion is not None:
+        return np.array([posicion['x'], posicion['z']])
     
     return np.array([0.0, 0.0])
 
@@ -92,7 +231,7 @@ def _get_robot_xz(Entorno):
         # En mundo real no tenemos acceso a coordenadas 3D exactas
         return np.array([0.0, 0.0])
     
-    posicion_robobo = Entorno.sim.getRobotLocation(0)['position']
+    posicion_robobo = Entorno.poses.posicion_robot
     x_rob, z_rob = posicion_robobo['x'], posicion_robobo['z']
     return np.array([x_rob, z_rob])
 
@@ -119,7 +258,8 @@ def _distancia_a_blob(Entorno):
     if Entorno.mundo_real:
         # Estimación basada en el tamaño del objeto en la imagen
         # Asumiendo que conocemos el tamaño real del objeto
-        tamano = _get_tamano_blob(Entorno)[0]
+        # (de la percepción ya hecha en este tick, sin volver a pasar YOLO)
+        tamano = Entorno._sensores.tamano_blob[0]
         
         if tamano <= 0:
             return 100.0  # Distancia grande si no se detecta
@@ -132,16 +272,14 @@ def _distancia_a_blob(Entorno):
         distancia_estimada = DISTANCIA_REFERENCIA * np.sqrt(AREA_REFERENCIA / tamano)
         return distancia_estimada
     else:
-        # Usar coordenadas 3D del simulador
-        posicion_robobo = Entorno.sim.getRobotLocation(0)['position']
+        # Usar coordenadas 3D del simulador (caché de poses del paso)
+        posicion_robobo = Entorno.poses.posicion_robot
         x_rob, y_rob = posicion_robobo['x'], posicion_robobo['y']
 
-        objetos = Entorno.sim.getObjects()
-        if objetos != None and len(objetos) > 0:
-            for objeto in objetos:
-                posicion = Entorno.sim.getObjectLocation(objeto)['position']
-                x_obj, y_obj = posicion['x'], posicion['y']
-                return math.sqrt((x_obj - x_rob)**2 + (y_obj - y_rob)**2)
+        posicion = Entorno.poses.posicion_objeto
+        if posicion is not None:
+            x_obj, y_obj = posicion['x'], posicion['y']
+            return math.sqrt((x_obj - x_rob)**2 + (y_obj - y_rob)**2)
         
         return 100.0
 
@@ -167,14 +305,13 @@ def mover_blob_random_walk(entorno, dx, dz):
         # En mundo real el objeto no se mueve automáticamente
         return None
     
-    objetos = entorno.sim.getObjects()
-    
-    if objetos is None or len(objetos) == 0:
+    # Sin velocidad no hace falta hablar con el simulador
+    if dx == 0 and dz == 0:
         return None
     
-    if objetos != None and len(objetos) > 0:
-        for objeto in objetos:
-            posicion_actual = entorno.sim.getObjectLocation(objeto)['position']
+    if entorno.poses.objetos:
+        for objeto in entorno.poses.objetos:
+            posicion_actual = entorno.poses.posiciones_objetos[objeto]
             
             x_actual = posicion_actual['x']
             y_actual = posicion_actual['y']
@@ -192,10 +329,7 @@ def mover_blob_random_walk(entorno, dx, dz):
             x_nueva = x_actual + dx
             z_nueva = z_actual + dz
             
-            entorno.sim.setObjectLocation(
-                objeto, 
-                position={'x': x_nueva, 'y': y_actual, 'z': z_nueva}
-            )
+            entorno.poses.mueve_objeto(objeto, {'x': x_nueva, 'y': y_actual, 'z': z_nueva})
     
     return None
 
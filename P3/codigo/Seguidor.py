@@ -0,0 +1,111 @@
+import numpy as np
+
+# Seguimiento del objeto entre pasadas de YOLO. SensorObjeto solo ejecuta
+# YOLO cada frame_skip frames; en los intermedios el filtro predice x, y y
+# tamaño con velocidad constante en vez de repetir la última detección, y
+# cuando llega una detección se corrige. Opcionalmente el flujo óptico (Lucas-
+# Kanade) sobre la caja da una medida barata de x, y en los frames saltados.
+
+
+class SeguidorKalman:
+    """
+    Filtro de Kalman de velocidad constante sobre (x, y, tamano).
+    Estado [x, y, tamano, vx, vy, vtamano]; las velocidades son por segundo,
+    así el filtro no depende de a qué ritmo lleguen los frames.
+    """
+
+    def __init__(self, ruido_medida=(2.0, 2.0, 500.0), ruido_aceleracion=(60.0, 60.0, 5000.0),
+                 max_prediccion=0.5):
+        self.R = np.diag(np.square(ruido_medida))
+        self.sigma_a = np.asarray(ruido_aceleracion, dtype=float)
+        self.max_prediccion = max_prediccion   # segundos sin medida antes de darlo por perdido
+        self.H = np.hstack([np.eye(3), np.zeros((3, 3))])
+        self.reinicia()
+
+    def reinicia(self):
+        self.estado = None
+        self.P = None
+        self.instante = None
+        self.ultima_medida = None
+
+    @property
+    def activo(self):
+        return self.estado is not None
+
+    def _avanza(self, instante):
+        dt = max(0.0, instante - self.instante)
+        F = np.eye(6)
+        F[:3, 3:] = dt * np.eye(3)
+        # ruido de aceleración blanca discretizado, por dimensión
+        q = self.sigma_a ** 2
+        Q = np.zeros((6, 6))
+        Q[:3, :3] = np.diag(q * dt ** 4 / 4)
+        Q[:3, 3:] = Q[3:, :3] = np.diag(q * dt ** 3 / 2)
+        Q[3:, 3:] = np.diag(q * dt ** 2)
+        self.estado = F @ self.estado
+        self.P = F @ self.P @ F.T + Q
+        self.instante = instante
+
+    def predice(self, instante):
+        """(x, y, tamano) previstos para el instante, o None si hace mucho de la última medida"""
+        if not self.activo:
+            return None
+        if instante - self.ultima_medida > self.max_prediccion:
+            self.reinicia()
+            return None
+        self._avanza(instante)
+        return self.estado[:3].copy()
+
+    def corrige(self, medida, instante, R=None, renueva=True):
+        """
+        Incorpora una medida (x, y, tamano); con R propio para medidas menos
+        fiables. Con renueva=False (flujo óptico) no cuenta como detección para
+        max_prediccion.
+        """
+        medida = np.asarray(medida, dtype=float)
+        if not self.activo:
+            self.estado = np.concatenate([medida, np.zeros(3)])
+            self.P = np.diag(np.concatenate([np.diag(self.R), np.diag(self.R) * 10]))
+            self.instante = instante
+        else:
+            self._avanza(instante)
+            R = self.R if R is None else R
+            S = self.H @ self.P @ self.H.T + R
+            K = self.P @ self.H.T @ np.linalg.inv(S)
+            self.estado = self.estado + K @ (medida - self.H @ self.estado)
+            self.P = (np.eye(6) - K @ self.H) @ self.P
+        if renueva:
+            self.ultima_medida = instante
+        return self.estado[:3].copy()
+
+
+class FlujoCaja:
+    """
+    Desplazamiento de la caja entre dos frames con Lucas-Kanade sobre
+    esquinas dentro de la caja (mediana de los desplazamientos).
+    """
+
+    def __init__(self, max_esquinas=30):
+        self.max_esquinas = max_esquinas
+        self.gris_anterior = None
+
+    def desplazamiento(self, frame, caja):
+        """(dx, dy) en pixels de la caja respecto al frame anterior, o None"""
+        import cv2
+        gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        anterior, self.gris_anterior = self.gris_anterior, gris
+        if anterior is None or caja is None:
+            return None
+
+        x1, y1, x2, y2 = (int(v) for v in caja)
+        mascara = np.zeros_like(anterior)
+        mascara[max(0, y1):max(0, y2), max(0, x1):max(0, x2)] = 255
+        puntos = cv2.goodFeaturesToTrack(anterior, self.max_esquinas, 0.01, 5, mask=mascara)
+        if puntos is None:
+            return None
+        nuevos, estado, _ = cv2.calcOpticalFlowPyrLK(anterior, gris, puntos, None)
+        validos = estado.ravel() == 1
+        if not validos.any():
+            return None
+        dx, dy = np.median((nuevos - puntos).reshape(-1, 2)[validos], axis=0)
+        return float(dx), float(dy)
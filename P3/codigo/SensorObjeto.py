@@ -1,11 +1,30 @@
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import torch
 
-from utils import carga_modelo_YOLO, config
+from utils import carga_modelo_YOLO
+from configuracion import config
+from Seguidor import SeguidorKalman, FlujoCaja
+from AutoAjuste import carga_autoajuste
+from EjecutorInferencia import ejecutor_inferencia
 
 
+# stride maximo de YOLOv8: imgsz tiene que ser multiplo
+STRIDE_YOLO = 32
+
+
+def imgsz_recorte(recorte, forma_frame, imgsz_frame=640):
+    """
+    imgsz para pasar el recorte (alto, ancho) a la misma escala que el frame
+    entero con imgsz_frame: su lado mayor escalado igual y redondeado al
+    multiplo de 32 de encima. Con el imgsz del frame el letterbox de
+    ultralytics volveria a ampliar el recorte y costaria lo mismo que el frame.
+    """
+    escala = min(1.0, imgsz_frame / max(forma_frame[:2]))
+    lado = -(-int(max(recorte) * escala) // STRIDE_YOLO) * STRIDE_YOLO
+    return int(min(max(lado, STRIDE_YOLO), imgsz_frame))
+
 
 class SensorObjeto:
     def __init__(self, modelo_yolo='yolov8n.pt', clase_objetivo='cup'):
@@ -15,53 +34,140 @@ class SensorObjeto:
         self.factor_tamano = config['factor_tamano'] 
         
         # Performance optimizations
-        self.cached_detection = (-1, -1, -1)
-        self.frame_skip = 3
+        # (x, y, tamano, confianza) de la ultima deteccion
+        self.cached_detection = (-1, -1, -1, 0.0)
+        self.frame_skip = max(1, config.get('performance', {}).get('frame_skip_detection', 3))
         self.frame_counter = 0
+        self.descartes_frame = 0   # inferencias tiradas porque la captura pisó el frame
+
+        # en los frames sin YOLO se predice con un Kalman en vez de repetir la cache
+        config_seguimiento = config.get('seguimiento', {})
+        self.seguidor = None
+        self.flujo = None
+        if config_seguimiento.get('activo', True):
+            self.seguidor = SeguidorKalman(
+                ruido_medida=config_seguimiento.get('ruido_medida', (2.0, 2.0, 500.0)),
+                ruido_aceleracion=config_seguimiento.get('ruido_aceleracion', (60.0, 60.0, 5000.0)),
+                max_prediccion=config_seguimiento.get('max_prediccion', 0.5))
+            if config_seguimiento.get('flujo_optico', False):
+                self.flujo = FlujoCaja()
+        self._caja = None   # ultima caja en pixels del frame tal como llega (sin voltear)
+
+        # YOLO sobre un recorte alrededor de la ultima caja en vez del frame entero
+        config_roi = config.get('roi', {})
+        self.roi = config_roi.get('activo', True)
+        self.margen_roi = config_roi.get('margen', 1.0)            # fraccion del lado de la caja por cada lado
+        self.tamano_minimo_roi = config_roi.get('tamano_minimo', 192)
+        self.max_fallos_roi = config_roi.get('max_fallos', 3)     # fallos seguidos antes de volver al frame entero
+        self._fallos_roi = 0
         
         # Device setup
         self.device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
         print(f"[SensorObjeto] Usando dispositivo: {self.device}")
         
-        self.modelo = carga_modelo_YOLO(pose=False)
+        # modelo e imgsz: fijos, o los que elija el autoajuste para llegar a target_fps
+        self.modelo_yolo = modelo_yolo
+        self._opciones_yolo = {'verbose': False, 'device': self.device}
+        self.ajuste = carga_autoajuste('deteccion', config, self.frame_skip)
+        if self.ajuste is None:
+            self.modelo = carga_modelo_YOLO(pose=False, pesos=modelo_yolo)
+        else:
+            self.modelo, self._opciones_yolo['imgsz'] = self.ajuste.ajusta(self._carga, self._opciones_yolo)
+
+        # si hay ejecutor, YOLO corre en su hilo con su presupuesto de hilos de torch
+        self.ejecutor = ejecutor_inferencia()
+        if self.ejecutor is not None:
+            self.ejecutor.registra('deteccion', self.modelo)
+
+    @staticmethod
+    def _carga(pesos):
+        return carga_modelo_YOLO(pose=False, pesos=pesos)
+
+    def _infiere(self, imagen, imgsz=None):
+        """
+        Una pasada de YOLO. imgsz: el de un recorte (imgsz_recorte); sin el
+        se usa el del frame entero y la latencia alimenta al autoajuste, que
+        mide lo que cuesta el frame entero.
+        """
+        opciones = self._opciones_yolo if imgsz is None else dict(self._opciones_yolo, imgsz=imgsz)
+        inicio = time.perf_counter()
+        if self.ejecutor is not None:
+            resultados = self.ejecutor.infiere('deteccion', imagen, **opciones)
+        else:
+            resultados = self.modelo(imagen, **opciones)
+        if self.ajuste is not None and imgsz is None:
+            cambio = self.ajuste.observa(time.perf_counter() - inicio, self._carga)
+            if cambio is not None:
+                self.modelo, self._opciones_yolo['imgsz'] = cambio
+                if self.ejecutor is not None:
+                    self.ejecutor.registra('deteccion', self.modelo)
+        return resultados
 
     def detectar_objeto(self, frame):
+        """(x, y, tamano) del objeto en el frame"""
+        return self.detecta(frame)[:3]
+
+    def detecta(self, frame, espejo=False, vigente=None):
+        """
+        (x, y, tamano, confianza) del objeto en el frame, una sola pasada de YOLO.
+        Con espejo el frame llega sin voltear y solo se voltea la caja, en vez
+        de copiar la imagen entera con cv2.flip. Si el frame es una vista sin
+        copiar, vigente() dice si la captura la ha pisado durante la inferencia:
+        entonces el resultado no vale y no se guarda en la cache ni en el Kalman.
+        """
         self.frame_counter += 1
+        instante = time.perf_counter()
+        # el flujo necesita el frame anterior, asi que se mira en todos los frames
+        desplazamiento = self.flujo.desplazamiento(frame, self._caja) if self.flujo is not None else None
         
         if not self.frame_counter % self.frame_skip == 0 or self.cached_detection is None:
-            return self.cached_detection 
+            return self._entre_detecciones(instante, desplazamiento, frame.shape[1], espejo)
         
-        resultados = self.modelo(frame, verbose=False, device=self.device)
+        recorte = self._region_interes(frame) if self.roi else None
+        if recorte is None:
+            resultados = self._infiere(frame)
+        else:
+            # el recorte es una vista, no una copia; las cajas salen en pixels del recorte
+            x0, y0, x1, y1 = recorte
+            imgsz = imgsz_recorte((y1 - y0, x1 - x0), frame.shape, self._opciones_yolo.get('imgsz', 640))
+            resultados = self._infiere(frame[y0:y1, x0:x1], imgsz)
+        if vigente is not None and not vigente():
+            return self._frame_pisado(instante, desplazamiento, frame.shape[1], espejo)
+
+        # Buscar el objeto objetivo con mayor confianza (una vez, sirve para el recorte y para la caja)
+        mejor_deteccion, mejor_confianza = self._busca_objetivo(resultados)
+        if recorte is not None and mejor_deteccion is None:
+            self._fallos_roi += 1
+            if self._fallos_roi >= self.max_fallos_roi:
+                # se deja de recortar: la proxima pasada busca en todo el frame
+                self._caja = None
+            return self._entre_detecciones(instante, desplazamiento, frame.shape[1], espejo)
+        self._fallos_roi = 0
         
         if len(resultados) == 0 or len(resultados[0].boxes) == 0:
             print('YOLO no vio nada. solucionado usando cache')
             if self.cached_detection:
-                return self.cached_detection
+                return self._entre_detecciones(instante, desplazamiento, frame.shape[1], espejo)
             else:
-                return (-1, -1, -1) 
-        
-        # Buscar el objeto objetivo con mayor confianza
-        mejor_deteccion = None
-        mejor_confianza = 0
-        
-        for box in resultados[0].boxes:
-            clase_id = int(box.cls[0])
-            clase_nombre = self.modelo.names[clase_id]
-            confianza = float(box.conf[0])
-            
-            if clase_nombre == self.clase_objetivo and confianza > mejor_confianza:
-                mejor_confianza = confianza
-                mejor_deteccion = box
+                return (-1, -1, -1, 0.0) 
         
         if mejor_deteccion is None:
-            self.cached_detection = (-1, -1, -1)
+            self.cached_detection = (-1, -1, -1, 0.0)
+            self._caja = None
+            if self.seguidor is not None:
+                self.seguidor.reinicia()
             return self.cached_detection
         
         # Extraer coordenadas del bounding box
         x1, y1, x2, y2 = mejor_deteccion.xyxy[0].cpu().numpy()  # Move to CPU for processing
+        if recorte is not None:
+            x1, y1, x2, y2 = x1 + recorte[0], y1 + recorte[1], x2 + recorte[0], y2 + recorte[1]
+        self._caja = (x1, y1, x2, y2)
         
         # Centros
         centro_x, centro_y  = (x1 + x2) / 2, (y1 + y2) / 2
+        if espejo:
+            centro_x = frame.shape[1] - centro_x
         
         
         # Normalizar y clipear  
@@ -75,12 +181,81 @@ class SensorObjeto:
         
         tamano = tamano * self.factor_tamano
 
-        self.cached_detection = (x_norm, y_norm, tamano)
+        self.cached_detection = (x_norm, y_norm, tamano, mejor_confianza)
+        if self.seguidor is not None:
+            self.seguidor.corrige((x_norm, y_norm, tamano), instante)
         
         return self.cached_detection
+
+    def _busca_objetivo(self, resultados):
+        """(caja, confianza) de la clase objetivo con mayor confianza, o (None, 0)"""
+        mejor_deteccion = None
+        mejor_confianza = 0
+        if len(resultados) == 0:
+            return mejor_deteccion, mejor_confianza
+
+        for box in resultados[0].boxes:
+            clase_id = int(box.cls[0])
+            clase_nombre = self.modelo.names[clase_id]
+            confianza = float(box.conf[0])
+            
+            if clase_nombre == self.clase_objetivo and confianza > mejor_confianza:
+                mejor_confianza = confianza
+                mejor_deteccion = box
+        return mejor_deteccion, mejor_confianza
+
+    def _region_interes(self, frame):
+        """(x0, y0, x1, y1) del recorte alrededor de la ultima caja, o None para usar el frame entero"""
+        if self._caja is None:
+            return None
+        alto, ancho = frame.shape[:2]
+        x1, y1, x2, y2 = self._caja
+        lado_x = max((x2 - x1) * (1 + 2 * self.margen_roi), self.tamano_minimo_roi)
+        lado_y = max((y2 - y1) * (1 + 2 * self.margen_roi), self.tamano_minimo_roi)
+        centro_x, centro_y = (x1 + x2) / 2, (y1 + y2) / 2
+        x0, x1 = int(max(0, centro_x - lado_x / 2)), int(min(ancho, centro_x + lado_x / 2))
+        y0, y1 = int(max(0, centro_y - lado_y / 2)), int(min(alto, centro_y + lado_y / 2))
+        # si el recorte es casi todo el frame no compensa
+        if (x1 - x0) * (y1 - y0) > 0.6 * ancho * alto:
+            return None
+        return x0, y0, x1, y1
+
+    def _frame_pisado(self, instante, desplazamiento, ancho_frame, espejo):
+        """La inferencia leyó un frame a medio sobrescribir: se trata como un frame sin YOLO"""
+        self.descartes_frame += 1
+        if self.descartes_frame in (1, 10, 100) or self.descartes_frame % 1000 == 0:
+            print(f"[SensorObjeto] {self.descartes_frame} detecciones descartadas por frame pisado "
+                  f"(sube camara.buffers en config.yaml)")
+        return self._entre_detecciones(instante, desplazamiento, ancho_frame, espejo)
+
+    def _entre_detecciones(self, instante, desplazamiento, ancho_frame, espejo):
+        """Frame sin YOLO: prediccion del Kalman (corregida con el flujo si lo hay) o la cache"""
+        if self.seguidor is None:
+            return self.cached_detection
+        prediccion = self.seguidor.predice(instante)
+        if prediccion is None:
+            return self.cached_detection
+        x, y, tamano = prediccion
+
+        if desplazamiento is not None and self._caja is not None:
+            dx, dy = desplazamiento
+            x1, y1, x2, y2 = self._caja
+            self._caja = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            centro_x, centro_y = (x1 + x2) / 2 + dx, (y1 + y2) / 2 + dy
+            if espejo:
+                centro_x = ancho_frame - centro_x
+            # el flujo es menos fiable que YOLO y no dice nada del tamano
+            R = self.seguidor.R * np.diag([4.0, 4.0, 1e6])
+            x, y, tamano = self.seguidor.corrige(
+                (centro_x / self.frame_width * 100, centro_y / self.frame_height * 100, tamano),
+                instante, R=R, renueva=False)
+
+        return (int(np.clip(round(x), 0, 100)), int(np.clip(round(y), 0, 100)),
+                max(0.0, float(tamano)), self.cached_detection[3])
      
-    def visualizar_deteccion(self, frame, x, y, tamano):
-        frame_viz = frame.copy()
+    def visualizar_deteccion(self, frame, x, y, tamano, espejo=False):
+        # la única copia del frame, y solo cuando se va a mostrar
+        frame_viz = cv2.flip(frame, 1) if espejo else frame.copy()
         
         if x != -1 and y != -1:
             # Convertir coordenadas normalizadas a pixels
@@ -2,10 +2,8 @@ import cv2
 import threading
 import platform
 import time
-import yaml
 
-with open("P3/configs/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+from configuracion import config
 
 class Camara:
     def __init__(self, src=None, nombre="Camara"):
@@ -14,9 +12,33 @@ class Camara:
         if src is None:
             src = 1 if platform.system() == "Darwin" else 0
 
+        self._abre(src)
+
+        # anillo de buffers: cap.read escribe en el siguiente al publicado, así
+        # una vista repartida no se pisa hasta que llegan buffers - 1 frames
+        # más; con dos (doble buffer) se pisaría en cuanto YOLO tarda más de
+        # un frame, así que el anillo tiene que cubrir lo que dura una inferencia
+        self._buffers = [None] * max(2, config.get('camara', {}).get('buffers', 6))
+        self._publicado = 0
+        self.frame = None
+        self.seq = 0           # número del último frame capturado (0: ninguno)
+        self.instante = None   # time.time() de su captura
+        self.running = True
+
+        # el lock tiene que existir antes de arrancar el hilo que lo usa
+        self.lock = threading.Lock()
+        self.nuevo_frame = threading.Condition(self.lock)
+
+        # Start background capture thread
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+        
+        print(f"[Camara] '{nombre}' inicializada correctamente (src={src})")
+
+    def _abre(self, src):
         self.cap = cv2.VideoCapture(src)
         if not self.cap.isOpened():
-            raise RuntimeError(f"No se pudo abrir la cámara '{nombre}' con src={src}")
+            raise RuntimeError(f"No se pudo abrir la cámara '{self.nombre}' con src={src}")
 
         # Set resolution
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, config['frame_x'])
@@ -24,25 +46,32 @@ class Camara:
 
         self.cap.set(cv2.CAP_PROP_FPS, config['target_fps'])
 
+    def _lee(self, buffer):
+        """(ret, frame) del siguiente frame; buffer: array en el que escribirlo, si lo hay"""
+        # read ya bloquea hasta el siguiente frame de la cámara
+        if buffer is None:
+            return self.cap.read()
+        return self.cap.read(buffer)
 
-        self.frame = None
-        self.running = True
-
-        # Start background capture thread
-        self.thread = threading.Thread(target=self.update, daemon=True)
-        self.thread.start()
-        self.lock = threading.Lock()
-        
-        print(f"[Camara] '{nombre}' inicializada correctamente (src={src})")
+    def _cierra(self):
+        if self.cap.isOpened():
+            self.cap.release()
 
     def update(self):
         """Actualiza el frame en un hilo en segundo plano"""
         while self.running:
-            ret, frame = self.cap.read()
+            libre = (self._publicado + 1) % len(self._buffers)
+            ret, frame = self._lee(self._buffers[libre])
             if ret:
-                with self.lock:
+                with self.nuevo_frame:
+                    self._buffers[libre] = frame
+                    self._publicado = libre
                     self.frame = frame
-            time.sleep(0.001)
+                    self.seq += 1
+                    self.instante = time.time()
+                    self.nuevo_frame.notify_all()
+            else:
+                time.sleep(0.01)
     
     def get_frame(self):
         """Obtiene el frame actual (con flip horizontal y redimensionado)"""
@@ -50,6 +79,54 @@ class Camara:
             if self.frame is None:
                 return None
             return cv2.flip(self.frame, 1)
+
+    def _entrega(self, espejo):
+        """Con espejo, copia volteada; sin espejo, vista de solo lectura sin copiar"""
+        if espejo:
+            return cv2.flip(self.frame, 1)
+        vista = self.frame.view()
+        vista.flags.writeable = False
+        return vista
+
+    def get_frame_vista(self):
+        """
+        Vista de solo lectura del último frame, sin voltear ni copiar. Quien
+        la use tiene que comprobar después con frame_vigente que la captura
+        no la ha pisado mientras tanto, o copiarla.
+        """
+        with self.lock:
+            if self.frame is None:
+                return None
+            return self._entrega(espejo=False)
+
+    def frame_vigente(self, seq):
+        """
+        Si la vista del frame seq todavía no la ha pisado la captura. La
+        lectura que reescribe su buffer empieza al publicarse el frame
+        seq + buffers - 1, así que llamándola después de usar la vista dice
+        si se usó entera sin que nadie escribiera en ella.
+        """
+        return self.seq - seq < len(self._buffers) - 1
+
+    def get_frame_nuevo(self, desde, espejo=True):
+        """
+        (frame, seq, instante) si hay un frame posterior al número desde, si no
+        (None, desde, None). Cada consumidor guarda su último seq para no
+        pasar YOLO dos veces por el mismo frame.
+        """
+        with self.lock:
+            if self.seq <= desde:
+                return None, desde, None
+            return self._entrega(espejo), self.seq, self.instante
+
+    def espera_frame(self, desde, timeout=None, espejo=True):
+        """Como get_frame_nuevo, pero se duerme hasta que llega un frame posterior a desde"""
+        with self.nuevo_frame:
+            if not self.nuevo_frame.wait_for(lambda: self.seq > desde or not self.running, timeout):
+                return None, desde, None
+            if self.seq <= desde:
+                return None, desde, None
+            return self._entrega(espejo), self.seq, self.instante
     
     def get_frame_raw(self):
         """Obtiene el frame sin procesar (sin flip ni redimensionado)"""
@@ -61,10 +138,11 @@ class Camara:
     def stop(self):
         """Detiene la captura y libera recursos"""
         print(f"[Camara] Deteniendo '{self.nombre}'...")
-        self.running = False
+        with self.nuevo_frame:
+            self.running = False
+            self.nuevo_frame.notify_all()
         self.thread.join(timeout=1)
-        if self.cap.isOpened():
-            self.cap.release()
+        self._cierra()
         print(f"[Camara] '{self.nombre}' detenida")
 
 
@@ -80,3 +158,74 @@ class CamaraSmartphone(Camara):
         if src is None:
             src = 0 if platform.system() == "Darwin" else 1
         super().__init__(src=src, nombre="Smartphone Detección")
+
+
+class CamaraRobobo(Camara):
+    """
+    Vídeo del smartphone del Robobo (RoboboVideo ya conectado) con el mismo
+    contrato que Camara. El hilo de robobopy_videostream deja en
+    socket.imageData cada mensaje recibido (una tupla nueva por mensaje, con
+    el JPEG y los metadatos). Aquí se coge esa tupla una vez y, si es nueva,
+    se decodifica esa misma con get_image_aux, así cada frame se decodifica
+    una vez, seq solo cambia con frames nuevos y los que nadie pide se pisan.
+    No se usa getImage: se queda dando vueltas hasta el primer frame y, con
+    la conexión perdida, sigue devolviendo el último.
+    """
+
+    # sin ningún frame en este tiempo se da el stream por perdido
+    ESPERA_PRIMER_FRAME = 5.0
+
+    def __init__(self, video, nombre="Robobo Video"):
+        self.video = video
+        self._socket = getattr(video, 'socket', None)
+        if not hasattr(self._socket, 'imageData') or not hasattr(self._socket, 'lost_conection'):
+            raise TypeError("CamaraRobobo necesita un RoboboVideo de robobopy_videostream "
+                            "(video.socket con imageData y lost_conection)")
+        self._ultimo_mensaje = None
+        self._inicio = time.time()
+        super().__init__(src=getattr(video, 'ip', 'RoboboVideo'), nombre=nombre)
+
+    def _abre(self, src):
+        pass   # la conexión es de RoboboVideo (Entorno.conecta_video)
+
+    def _lee(self, buffer):
+        # cada frame es un array nuevo: el buffer no se usa
+        if self._socket.lost_conection:
+            return self._conexion_perdida("el socket del vídeo se ha cerrado")
+        mensaje = self._socket.imageData   # (bytes recibidos, JPEG + metadatos)
+        if mensaje is None:
+            if time.time() - self._inicio > self.ESPERA_PRIMER_FRAME:
+                return self._conexion_perdida(f"ningún frame en {self.ESPERA_PRIMER_FRAME:g} s")
+            return False, None
+        if mensaje is self._ultimo_mensaje:
+            return False, None   # nada nuevo: update espera un poco
+        self._ultimo_mensaje = mensaje
+
+        try:
+            _, frame, _, _, _ = self._socket.get_image_aux(mensaje[1])
+        except Exception as e:
+            # un JPEG corrupto no tumba el stream: se salta ese mensaje
+            print(f"[Camara] '{self.nombre}': mensaje de vídeo ilegible ({type(e).__name__}: {e})")
+            return False, None
+        return frame is not None, frame
+
+    def _conexion_perdida(self, motivo):
+        """Para el hilo y despierta a quien espere en espera_frame (ven running a False)"""
+        print(f"[Camara] '{self.nombre}': conexión perdida, {motivo}")
+        with self.nuevo_frame:
+            self.running = False
+            self.nuevo_frame.notify_all()
+        return False, None
+
+    def get_frame_vista(self):
+        """Como en Camara, pero sin conexión no se sigue dando el último frame"""
+        if not self.running:
+            return None
+        return super().get_frame_vista()
+
+    def frame_vigente(self, seq):
+        """Cada mensaje se decodifica en un array nuevo: las vistas no caducan"""
+        return True
+
+    def _cierra(self):
+        pass   # RoboboVideo lo desconecta quien lo conectó
@@ -0,0 +1,11 @@
+import yaml
+
+# config.yaml se lee una sola vez por proceso: utils, camara, SensorObjeto,
+# ModeloTelecontrol, pipeline... importan este mismo diccionario en vez de
+# volver a abrir y parsear el fichero cada uno. Aquí no se importa nada
+# pesado (torch, ultralytics, cv2): cada módulo los carga cuando los usa.
+
+RUTA_CONFIG = "P3/configs/config.yaml"
+
+with open(RUTA_CONFIG, "r") as file:
+    config = yaml.safe_load(file)
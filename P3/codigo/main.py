@@ -1,45 +1,103 @@
-import cv2
-import yaml
+import time
+inicio = time.perf_counter()   # lanzamiento: la cronología de arranque cuenta también los imports
+
 from ui import ui
 from camara import CamaraWebcam, CamaraSmartphone
-from utils import limpia_recursos, config
-from Entorno import Entorno 
+from configuracion import config
+from utils import limpia_recursos, registro_modelos, carga_politica
+from Entorno import Entorno, carga_sensor_objeto
 from Modelo import Modelo
+from EjecutorInferencia import ejecutor_inferencia
+from Arranque import Arranque
 import traceback
 
-camara_webcam = CamaraWebcam(1) 
-camara_smartphone = None if config['mundo_real'] else CamaraSmartphone()
-#camara_smartphone = None
 
-entorno = Entorno(
+def carga_pose():
+    # ModeloTelecontrol importa torch: se importa ya en el hilo del paso
+    from ModeloTelecontrol import carga_modelo_telecontrol
+    return carga_modelo_telecontrol()
+
+
+# Arranque en paralelo: cada paso espera solo a los que necesita de verdad
+# (la política a los espacios del entorno, la detección al sensor y al vídeo).
+# El reset mueve el tilt y puede mostrar la detección: va después, en este hilo
+arranque = Arranque(inicio)
+mundo_real = config['mundo_real']
+
+arranque.paso('entorno', lambda: Entorno(
     ip=config['ip'],
-    mundo_real=config['mundo_real'],
-    camara=camara_smartphone,
+    mundo_real=mundo_real,
     clase_objeto=config.get('clase_objeto', 'cup'),
-    visualizar_detecciones=config.get('visualizar_detecciones', False)
-)
+    visualizar_detecciones=config.get('visualizar_detecciones', False),
+    deteccion_asincrona=config.get('deteccion_asincrona', False),
+    conecta=False   # solo los espacios: las conexiones son pasos aparte
+))
+arranque.paso('camara webcam', lambda: CamaraWebcam(1))
+arranque.paso('camara smartphone', lambda: None if mundo_real else CamaraSmartphone())
+#arranque.paso('camara smartphone', lambda: None)
+arranque.paso('robobo', lambda entorno: entorno.conecta_robot(), depende=('entorno',))
+if mundo_real:
+    arranque.paso('video', lambda entorno: entorno.conecta_video(), depende=('entorno',))
+    arranque.paso('stream', lambda entorno, *_: entorno.inicia_stream(), depende=('entorno', 'robobo', 'video'))
+    arranque.paso('yolo objeto', lambda: carga_sensor_objeto(config.get('clase_objeto', 'cup')))
+    arranque.paso('deteccion', lambda entorno, sensor, camara, _: entorno.prepara_deteccion(sensor, camara),
+                  depende=('entorno', 'yolo objeto', 'camara smartphone', 'stream'))
+arranque.paso('yolo pose', carga_pose)
+arranque.paso('politica', lambda entorno: carga_politica(config['ruta_politica'], entorno), depende=('entorno',))
+
+pasos = arranque.ejecuta()
+entorno = pasos['entorno']
+camara_webcam = pasos['camara webcam']
+camara_smartphone = pasos['camara smartphone']
+
+# motores y ventanas solo desde el hilo principal
+observacion, _ = arranque.en_principal('reset', entorno.reset)
 
 modelo = Modelo(
-    config['ruta_politica'], 
+    config['ruta_politica'],
     entorno,
-    camara_telecontrol=camara_webcam  
+    camara_telecontrol=camara_webcam,
+    modelo_telecontrol=pasos['yolo pose'],
+    politica=pasos['politica']
 )
 
-observacion, _ = entorno.reset()
+# los modelos ya están cargados y calentados: el primer paso no espera a torch
+registro_modelos.imprime_informe()
+
+
+def primer_movimiento():
+    # lo que se mide en las demos: del lanzamiento al primer moveWheels
+    arranque.marca('primer moveWheels')
+    arranque.imprime_cronologia()
+
+
+entorno.al_primer_movimiento = primer_movimiento
+
+seq_webcam = 0
+ejecutor = ejecutor_inferencia()
 
 with ui.start():
     try:
         while True:
 
-            frame_webcam = camara_webcam.get_frame() if camara_webcam else None
+            # solo frames nuevos: no se repite la pose sobre el mismo frame
+            frame_webcam = None
+            if camara_webcam:
+                frame_webcam, seq_webcam, _ = camara_webcam.espera_frame(seq_webcam, timeout=0.1)
             if frame_webcam is not None or not config['mundo_real']:
-                accion = modelo.predict(frame_webcam, observacion)
-                observacion, recompensa, terminated, truncated, info = entorno.step(accion) 
+                if ejecutor is not None:
+                    # pose y detección del objeto a la vez, cada una con sus hilos
+                    accion = ejecutor.en_paralelo({
+                        'telecontrol': lambda: modelo.predict(frame_webcam, observacion),
+                        'deteccion': entorno.anticipa_percepcion})['telecontrol']
+                else:
+                    accion = modelo.predict(frame_webcam, observacion)
+                observacion, recompensa, terminated, truncated, info = entorno.step(accion)
 
     except KeyboardInterrupt:
         entorno.desconecta()
         print("\n=== INTERRUPCIÓN POR USUARIO ===")
-    
+
     except Exception as e:
         # This catches ANY error and prints it
         print("\n=== ERROR NO CONTROLADO ===")
@@ -47,4 +105,7 @@ with ui.start():
         traceback.print_exc()
 
     finally:
+        if ejecutor is not None:
+            ejecutor.imprime_informe()
+            ejecutor.cierra()
         limpia_recursos(camara_webcam, camara_smartphone)
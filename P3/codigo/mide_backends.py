@@ -0,0 +1,95 @@
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+from ultralytics.utils import ASSETS
+
+from BackendYOLO import BACKENDS, _disponible, exporta, ajusta_hilos
+from SensorObjeto import imgsz_recorte
+from configuracion import config
+
+# Compara en esta CPU la latencia de YOLO con PyTorch, ONNX Runtime y
+# OpenVINO (los que estén instalados) y comprueba que las salidas coinciden:
+#
+#   python P3/codigo/mide_backends.py
+#
+# Al final mide también lo que ahorra la ROI de SensorObjeto: un recorte con
+# el imgsz del frame (el letterbox lo vuelve a ampliar) y con imgsz_recorte.
+
+REPETICIONES = 30
+MODELOS = {'deteccion': ('yolov8n.pt', 'detect'), 'telecontrol': ('yolov8n-pose.pt', 'pose')}
+MODULO_BACKEND = {'torch': 'torch', 'onnx': 'onnxruntime', 'openvino': 'openvino'}
+
+
+def mide(modelo, imagen, imgsz):
+    for _ in range(3):   # calentamiento (y creación de la sesión)
+        modelo(imagen, imgsz=imgsz, verbose=False, device='cpu')
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultados = modelo(imagen, imgsz=imgsz, verbose=False, device='cpu')
+        tiempos.append(time.perf_counter() - inicio)
+    return float(np.median(tiempos)), resultados
+
+
+def salida(resultados, tarea):
+    """Lo que consumen SensorObjeto (cajas) y ModeloTelecontrol (keypoints)"""
+    if tarea == 'pose':
+        return resultados[0].keypoints.xy.cpu().numpy()
+    return resultados[0].boxes.xyxy.cpu().numpy()
+
+
+def mide_roi(modelo, imagen, imgsz, lados=(192, 256, 320)):
+    """Latencia del frame entero frente a recortes centrados de lado x lado"""
+    alto, ancho = imagen.shape[:2]
+    entero, _ = mide(modelo, imagen, imgsz)
+    print(f"\n[Backends] ROI, frame {ancho}x{alto} con imgsz={imgsz}: {entero * 1000:7.1f} ms")
+    for lado in lados:
+        y0, x0 = (alto - lado) // 2, (ancho - lado) // 2
+        recorte = imagen[y0:y0 + lado, x0:x0 + lado]
+        mismo, _ = mide(modelo, recorte, imgsz)
+        propio = imgsz_recorte(recorte.shape, imagen.shape, imgsz)
+        ajustado, _ = mide(modelo, recorte, propio)
+        print(f"[Backends]   recorte {lado}x{lado}: imgsz={imgsz} {mismo * 1000:7.1f} ms, "
+              f"imgsz={propio} {ajustado * 1000:7.1f} ms (x{entero / ajustado:.2f} frente al frame entero)")
+
+
+def main():
+    imagen = cv2.resize(cv2.imread(str(ASSETS / 'bus.jpg')), (config['frame_x'], config['frame_y']))
+    imgsz = 640
+    hilos = config.get('inferencia', {}).get('hilos')
+
+    for nombre, (pesos, tarea) in MODELOS.items():
+        print(f"\n[Backends] {nombre} ({pesos}), imgsz={imgsz}, {REPETICIONES} repeticiones")
+        referencia = None
+        for backend in BACKENDS:
+            if not _disponible(MODULO_BACKEND[backend]):
+                print(f"[Backends]   {backend:<9} no instalado")
+                continue
+            if backend == 'torch':
+                modelo = YOLO(pesos)
+            else:
+                ruta = exporta(pesos, backend, YOLO)
+                modelo = YOLO(ruta, task=tarea)
+                if hilos is not None:
+                    modelo(imagen, imgsz=imgsz, verbose=False, device='cpu')
+                    ajusta_hilos(modelo, backend, ruta, hilos)
+            latencia, resultados = mide(modelo, imagen, imgsz)
+            valores = salida(resultados, tarea)
+
+            if referencia is None:
+                referencia = (latencia, valores)
+                comparacion = "referencia"
+            elif valores.shape != referencia[1].shape:
+                comparacion = f"salida distinta: {valores.shape} frente a {referencia[1].shape}"
+            else:
+                diferencia = float(np.abs(valores - referencia[1]).max()) if valores.size else 0.0
+                comparacion = f"x{referencia[0] / latencia:.2f}, diferencia máx {diferencia:.2f} px"
+            print(f"[Backends]   {backend:<9} {latencia * 1000:7.1f} ms  {comparacion}")
+
+    mide_roi(YOLO(MODELOS['deteccion'][0]), imagen, imgsz)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Mide cuánto tarda en importarse cada punto de entrada de P3 y qué módulos
+# pesados arrastra. Cada medida es un intérprete nuevo (sin nada en caché de
+# sys.modules). Para comparar con otra versión, se mide también su checkout:
+#
+#   python P3/codigo/mide_importacion.py
+#   git worktree add /tmp/p3_antes <commit> && \
+#       python P3/codigo/mide_importacion.py --codigo /tmp/p3_antes/P3/codigo
+
+PESADOS = ('torch', 'ultralytics', 'cv2', 'stable_baselines3', 'robobopy_videostream', 'rich', 'gymnasium')
+
+# lo que importa cada proceso antes de empezar a trabajar
+ENTRADAS = {
+    'configuracion': ['configuracion'],
+    'utils': ['utils'],
+    'RoboboAPI': ['RoboboAPI'],
+    'Entorno': ['Entorno'],
+    'Modelo': ['Modelo'],
+    'main.py': ['ui', 'camara', 'configuracion', 'utils', 'Entorno', 'Modelo', 'EjecutorInferencia'],
+    'pipeline captura': ['pipeline', 'camara', 'RoboboAPI'],
+    'pipeline control': ['pipeline', 'ui', 'Entorno', 'DetectorAsincrono', 'utils'],
+}
+
+PROGRAMA = """
+import json, sys, time
+sys.path.insert(0, {codigo!r})
+inicio = time.perf_counter()
+error = None
+try:
+    for modulo in {modulos!r}:
+        __import__(modulo)
+except Exception as e:   # dependencias que no están instaladas aquí
+    error = type(e).__name__ + ": " + str(e)
+print(json.dumps({{'segundos': time.perf_counter() - inicio, 'error': error,
+                  'pesados': [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+
+def mide(codigo, modulos, repeticiones):
+    """Mediana de segundos en importar modulos, pesados cargados y el error si no se pudo"""
+    raiz = Path(codigo).resolve().parents[1]   # config.yaml va relativo a la raíz del repo
+    programa = PROGRAMA.format(codigo=str(Path(codigo).resolve()), modulos=modulos, pesados=PESADOS)
+    medidas = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', programa], cwd=raiz,
+                                capture_output=True, text=True, check=True)
+        medidas.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+    return statistics.median(m['segundos'] for m in medidas), medidas[-1]['pesados'], medidas[-1]['error']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de los puntos de entrada de P3")
+    parser.add_argument('--codigo', default=str(Path(__file__).resolve().parent),
+                        help="carpeta P3/codigo a medir (por defecto esta)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"[Importacion] {args.codigo}, mediana de {args.repeticiones} intérpretes nuevos")
+    for nombre, modulos in ENTRADAS.items():
+        segundos, pesados, error = mide(args.codigo, modulos, args.repeticiones)
+        texto = f"[Importacion] {nombre:<17} {segundos * 1000:8.1f} ms  {', '.join(pesados) or '-'}"
+        if error:
+            texto += f"  (error: {error})"
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import os
+import signal
+import time
+import threading
+import multiprocessing as mp
+
+from configuracion import config
+from MemoriaCompartida import AnilloFrames, ColaUltimos, Contador
+
+# Modo pipeline: la misma demo que main.py pero repartida en procesos, cada
+# uno en su núcleo, para que YOLO de objetos, YOLO de pose y el bucle de
+# control no compitan por el GIL ni se esperen entre sí:
+#
+#   captura ──(anillo deteccion)──> deteccion ──(percepciones)──┐
+#           └─(anillo webcam)─────> telecontrol ──(acciones)────┴─> control
+#
+# Los frames van por memoria compartida (AnilloFrames) y los resultados por
+# colas que se quedan con lo último (ColaUltimos). Cada informe_cada segundos
+# se imprime el ritmo de cada etapa y la profundidad de las colas.
+#
+#   python P3/codigo/pipeline.py
+#
+# Los imports pesados (torch, ultralytics, robobopy) van dentro de cada etapa:
+# con spawn (macOS) cada proceso vuelve a importar este fichero.
+
+ETAPAS = ('captura', 'deteccion', 'telecontrol', 'control')
+
+
+def _prepara_etapa(etapa, nucleo, hilos_torch=None):
+    """Deja la etapa en un núcleo (solo Linux) y limita los hilos de torch"""
+    # Ctrl+C lo atiende el supervisor, que para todas las etapas con el evento
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if nucleo is not None:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, {nucleo % os.cpu_count()})
+            print(f"[Pipeline] {etapa} en el núcleo {nucleo % os.cpu_count()}")
+        else:
+            print(f"[Pipeline] {etapa}: este sistema no permite fijar núcleo, lo reparte el SO")
+    if hilos_torch is not None:
+        import torch
+        torch.set_num_threads(hilos_torch)
+
+
+def _redimensiona(frame, forma):
+    """El anillo tiene tamaño fijo: si la cámara no respeta frame_x/frame_y se reescala"""
+    if frame.shape != forma:
+        import cv2
+        frame = cv2.resize(frame, (forma[1], forma[0]))
+    return frame
+
+
+# ---- etapas (cada una es la función principal de un proceso)
+
+def etapa_captura(anillos, contador, parar, nucleo):
+    """Escribe en cada anillo el último frame de su cámara, un hilo por fuente"""
+    _prepara_etapa('captura', nucleo)
+    from camara import CamaraWebcam, CamaraRobobo
+
+    fuentes = {'webcam': CamaraWebcam(1)}
+    if 'deteccion' in anillos:
+        import RoboboAPI
+        video = RoboboAPI.init_RoboboVideo(config['ip'])
+        video.connect()
+        fuentes['deteccion'] = CamaraRobobo(video)
+
+    def captura(nombre):
+        fuente = fuentes[nombre]
+        anillo = AnilloFrames(*anillos[nombre])
+        # la webcam volteada como en main.py; el robot sin voltear: deteccion voltea solo la caja
+        espejo = nombre == 'webcam'
+        seq = 0
+        while not parar.is_set():
+            # las dos avisan de cada frame nuevo: se escribe tal cual llega
+            frame, seq, instante = fuente.espera_frame(seq, timeout=0.1, espejo=espejo)
+            if frame is None and not fuente.running:
+                # se perdió el vídeo del robot: se para todo el pipeline
+                parar.set()
+                break
+            if frame is not None:
+                anillo.escribe(_redimensiona(frame, anillo.forma), instante)
+                contador.suma()
+        anillo.cierra()
+
+    hilos = [threading.Thread(target=captura, args=(nombre,), daemon=True) for nombre in fuentes]
+    for hilo in hilos:
+        hilo.start()
+    parar.wait()
+    for hilo in hilos:
+        hilo.join(timeout=1)
+    for fuente in fuentes.values():
+        fuente.stop()
+
+
+def etapa_deteccion(anillo, cola, contador, parar, nucleo, hilos_torch):
+    """YOLO de objetos sobre el frame más reciente del robot"""
+    _prepara_etapa('deteccion', nucleo, hilos_torch)
+    from SensorObjeto import SensorObjeto
+    from utils import muestra
+
+    sensor_objeto = SensorObjeto(modelo_yolo='yolov8n.pt',
+                                 clase_objetivo=config.get('clase_objeto', 'cup'))
+    anillo = AnilloFrames(*anillo)
+    visualizar = config.get('visualizar_detecciones', False)
+
+    ultimo = -1
+    frame = None
+    try:
+        while not parar.is_set():
+            frame, ultimo, instante_frame = anillo.vista(ultimo)
+            if frame is None:
+                time.sleep(0.002)
+                continue
+
+            x, y, tamano, confianza = sensor_objeto.detecta(frame, espejo=True,
+                                                            vigente=lambda: anillo.vigente(ultimo))
+            if not anillo.vigente(ultimo):
+                # la captura dio la vuelta al anillo mientras YOLO leía la ranura
+                continue
+            cola.pon({'x': x, 'y': y, 'tamano': tamano, 'confianza': confianza,
+                      'instante_frame': instante_frame})
+            contador.suma()
+
+            if visualizar:
+                muestra(sensor_objeto.visualizar_deteccion(frame, x, y, tamano, espejo=True), 'Deteccion Objeto')
+    finally:
+        # las vistas del anillo se sueltan antes de cerrarlo, también si parar
+        # llegó antes de la primera vuelta (p. ej. mientras se cargaba YOLO)
+        del frame
+        anillo.cierra()
+
+
+def etapa_telecontrol(anillo, cola, contador, parar, nucleo, hilos_torch):
+    """YOLO de pose sobre la webcam: publica la acción del gesto"""
+    _prepara_etapa('telecontrol', nucleo, hilos_torch)
+    from ModeloTelecontrol import carga_modelo_telecontrol
+
+    modelo_telecontrol = carga_modelo_telecontrol()
+    anillo = AnilloFrames(*anillo)
+
+    ultimo = -1
+    frame = None
+    try:
+        while not parar.is_set():
+            frame, ultimo, instante_frame = anillo.vista(ultimo)
+            if frame is None:
+                time.sleep(0.002)
+                continue
+
+            accion = modelo_telecontrol.predict(frame)
+            if not anillo.vigente(ultimo):
+                continue
+            cola.pon((accion, instante_frame))
+            contador.suma()
+    finally:
+        # las vistas del anillo se sueltan antes de cerrarlo, también si parar
+        # llegó antes de la primera vuelta (p. ej. mientras se cargaba YOLO)
+        del frame
+        anillo.cierra()
+
+
+def etapa_control(cola_percepcion, cola_telecontrol, contador, parar, nucleo):
+    """Entorno y política: lee lo último de las otras etapas y mueve el robot"""
+    _prepara_etapa('control', nucleo)
+    import numpy as np
+    from ui import ui
+    from Entorno import Entorno
+    from DetectorAsincrono import DetectorRemoto
+    from utils import carga_politica, esta_viendo
+
+    entorno = Entorno(
+        ip=config['ip'],
+        mundo_real=config['mundo_real'],
+        clase_objeto=config.get('clase_objeto', 'cup'),
+        visualizar_detecciones=False,
+        detector=DetectorRemoto(cola_percepcion) if config['mundo_real'] else None
+    )
+    politica = carga_politica(config['ruta_politica'], entorno)
+    accion_telecontrol = None
+
+    observacion, _ = entorno.reset()
+    with ui.start():
+        try:
+            while not parar.is_set():
+                mensaje = cola_telecontrol.ultimo()
+                if mensaje is not None:
+                    accion_telecontrol = mensaje[0]
+
+                if esta_viendo(observacion, cierra_ventana=False):
+                    entorno.ui_origen = "POLITICA P1"
+                    accion = politica.predict(observacion)[0]
+                elif accion_telecontrol is not None or not config['mundo_real']:
+                    entorno.ui_origen = "telecontrol"
+                    accion = accion_telecontrol if accion_telecontrol is not None else np.zeros(2, dtype=np.float32)
+                else:
+                    # como main.py: sin nada de la webcam todavía no se mueve
+                    time.sleep(0.005)
+                    continue
+
+                observacion, recompensa, terminated, truncated, info = entorno.step(accion)
+                contador.suma()
+        finally:
+            entorno.desconecta()
+
+
+# ---- supervisor
+
+def informa(contadores, colas, anterior, intervalo):
+    """Una línea con el ritmo de cada etapa y cuántos mensajes hay esperando"""
+    partes = []
+    for etapa in ETAPAS:
+        total = contadores[etapa].total
+        texto = f"{etapa} {(total - anterior[etapa]) / intervalo:5.1f}/s"
+        if etapa in colas:
+            cola = colas[etapa]
+            texto += f" (cola {cola.profundidad}, descartes {cola.descartados.value})"
+        anterior[etapa] = total
+        partes.append(texto)
+    print("[Pipeline] " + " | ".join(partes))
+
+
+def main():
+    opciones = config.get('pipeline') or {}
+    nucleos = opciones.get('nucleos') or [None] * len(ETAPAS)
+    hilos_torch = opciones.get('hilos_torch', 1)
+    ranuras = opciones.get('ranuras', 3)
+    informe_cada = opciones.get('informe_cada', 2.0)
+    forma = (config['frame_y'], config['frame_x'], 3)
+
+    nombres_anillos = ['webcam'] + (['deteccion'] if config['mundo_real'] else [])
+    anillos = {nombre: AnilloFrames(f"ria_{nombre}_{os.getpid()}", forma, ranuras, crea=True)
+               for nombre in nombres_anillos}
+    # lo que necesita un proceso hijo para abrir el mismo anillo
+    datos_anillos = {nombre: (anillo.nombre, anillo.forma, anillo.ranuras) for nombre, anillo in anillos.items()}
+
+    contadores = {etapa: Contador() for etapa in ETAPAS}
+    colas = {'deteccion': ColaUltimos(opciones.get('profundidad_cola', 2)),
+             'telecontrol': ColaUltimos(opciones.get('profundidad_cola', 2))}
+    parar = mp.Event()
+    nucleo = dict(zip(ETAPAS, nucleos))
+
+    procesos = [
+        mp.Process(target=etapa_captura, name='captura',
+                   args=(datos_anillos, contadores['captura'], parar, nucleo['captura'])),
+        mp.Process(target=etapa_telecontrol, name='telecontrol',
+                   args=(datos_anillos['webcam'], colas['telecontrol'], contadores['telecontrol'],
+                         parar, nucleo['telecontrol'], hilos_torch)),
+        mp.Process(target=etapa_control, name='control',
+                   args=(colas['deteccion'], colas['telecontrol'], contadores['control'],
+                         parar, nucleo['control'])),
+    ]
+    if 'deteccion' in anillos:
+        procesos.append(mp.Process(target=etapa_deteccion, name='deteccion',
+                                   args=(datos_anillos['deteccion'], colas['deteccion'], contadores['deteccion'],
+                                         parar, nucleo['deteccion'], hilos_torch)))
+
+    for proceso in procesos:
+        proceso.start()
+    print(f"[Pipeline] {len(procesos)} procesos: {', '.join(p.name for p in procesos)}")
+
+    anterior = {etapa: 0 for etapa in ETAPAS}
+    try:
+        while not parar.is_set() and all(proceso.is_alive() for proceso in procesos):
+            parar.wait(informe_cada)
+            informa(contadores, colas, anterior, informe_cada)
+        caidos = [proceso.name for proceso in procesos if not proceso.is_alive()]
+        print(f"[Pipeline] terminó {', '.join(caidos) or 'la captura'}, parando el resto")
+
+    except KeyboardInterrupt:
+        print("\n=== INTERRUPCIÓN POR USUARIO ===")
+
+    finally:
+        parar.set()
+        for proceso in procesos:
+            proceso.join(timeout=3)
+            if proceso.is_alive():
+                proceso.terminate()
+        for anillo in anillos.values():
+            anillo.cierra()
+        print("Programa finalizado")
+
+
+if __name__ == '__main__':
+    main()
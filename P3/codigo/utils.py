@@ -1,14 +1,17 @@
-from stable_baselines3 import SAC
-from ultralytics import YOLO
-import cv2
-import torch
-import yaml
+import threading
+import time
+import numpy as np
 
-with open("P3/configs/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+from BackendYOLO import elige_backend, exporta, ajusta_hilos
+from configuracion import config
+
+# torch, stable_baselines3, ultralytics y cv2 se importan dentro de las
+# funciones que los usan: importar utils (lo hacen RoboboAPI, Entorno y las
+# etapas de pipeline.py) no arrastra los módulos pesados si no hacen falta.
 
 def get_device():
     """Determine the best available device"""
+    import torch
     if torch.backends.mps.is_available():
         return "mps"
     elif torch.cuda.is_available():
@@ -17,36 +20,118 @@ def get_device():
         return "cpu"
 
 def carga_politica(politica_ruta, entorno):
+    from stable_baselines3 import SAC
     modelo = SAC.load(politica_ruta, env=entorno)
     print(f"Modelo cargado de {politica_ruta}")
     return modelo
 
-def carga_modelo_YOLO(pose=True):
-    device = get_device()
-    print(f"[YOLO] Usando dispositivo: {device}")
-    if pose:
-        model = YOLO('yolov8n-pose.pt', verbose=False)
-    else:
-        model = YOLO('yolov8n.pt', verbose=False)
-    model.to(device)
-    return model
+class RegistroModelos:
+    """
+    Modelos YOLO del proceso: cada fichero de pesos se carga una sola vez, se
+    lleva al dispositivo y se calienta con frames vacíos al arrancar, así el
+    primer paso del robot no paga la inicialización perezosa de torch. Guarda
+    cuánto tardó cada carga y cada calentamiento.
+    """
+
+    def __init__(self):
+        self.modelos = {}
+        self.tiempos = {}   # pesos -> {'carga_s', 'calentamiento_s', 'dispositivo'}
+        self.lock = threading.Lock()
+        self._locks = {}    # pesos -> lock: modelos distintos se cargan a la vez (Arranque)
+
+    def obtiene(self, pesos, pose):
+        with self.lock:
+            lock = self._locks.setdefault(pesos, threading.Lock())
+        with lock:
+            if pesos not in self.modelos:
+                self.modelos[pesos] = self._carga(pesos, pose)
+            return self.modelos[pesos]
+
+    def _carga(self, pesos, pose):
+        device = get_device()
+        inicio = time.perf_counter()
+        # los modelos exportados (ONNX, OpenVINO, int8) van siempre en cpu
+        model, device_modelo = _carga_modelo_YOLO(pose, pesos, device)
+        carga = time.perf_counter() - inicio
+
+        calentamiento = config.get('modelos', {}).get('calentamiento', 2)
+        frame = np.zeros((config['frame_y'], config['frame_x'], 3), dtype=np.uint8)
+        inicio = time.perf_counter()
+        for _ in range(calentamiento):
+            model(frame, verbose=False, device=device_modelo)
+        self.tiempos[pesos] = {'carga_s': carga,
+                               'calentamiento_s': time.perf_counter() - inicio,
+                               'calentamientos': calentamiento,
+                               'dispositivo': device_modelo}
+        print(f"[YOLO] {pesos} cargado en {carga:.2f} s y calentado en "
+              f"{self.tiempos[pesos]['calentamiento_s']:.2f} s ({calentamiento} pasadas)")
+        return model
+
+    def imprime_informe(self):
+        total = sum(t['carga_s'] + t['calentamiento_s'] for t in self.tiempos.values())
+        print(f"[YOLO] {len(self.modelos)} modelos listos en {total:.2f} s")
+        for pesos, t in self.tiempos.items():
+            print(f"[YOLO]   {pesos:<24} {t['dispositivo']:<5} carga {t['carga_s']:.2f} s, "
+                  f"calentamiento {t['calentamiento_s']:.2f} s")
+
+
+registro_modelos = RegistroModelos()
+
+
+def carga_modelo_YOLO(pose=True, pesos=None):
+    """Modelo YOLO compartido del registro: se carga y calienta solo la primera vez"""
+    if pesos is None:
+        pesos = 'yolov8n-pose.pt' if pose else 'yolov8n.pt'
+    return registro_modelos.obtiene(pesos, pose)
+
+def _carga_modelo_YOLO(pose, pesos, device):
+    from ultralytics import YOLO
+    config_inferencia = config.get('inferencia', {})
+    backend = elige_backend(config_inferencia.get('backend', 'torch'), device)
+    print(f"[YOLO] Usando dispositivo: {device}, backend: {backend}")
+
+    # int8 solo en CPU; si no hay calibración o no pasa la comprobación, float
+    if device == 'cpu' and config.get('cuantizacion', {}).get('activo', False):
+        from Cuantizacion import carga_cuantizado
+        model = carga_cuantizado(pesos, 'pose' if pose else 'detect', YOLO, config['cuantizacion'])
+        if model is not None:
+            return model, 'cpu'
+
+    if backend == 'torch':
+        model = YOLO(pesos, verbose=False)
+        model.to(device)
+        return model, device
+
+    # ONNX Runtime / OpenVINO: misma clase YOLO sobre la exportación cacheada
+    ruta = exporta(pesos, backend, YOLO)
+    model = YOLO(ruta, task='pose' if pose else 'detect')
+    hilos = config_inferencia.get('hilos')
+    if hilos is not None:
+        model(np.zeros((config['frame_y'], config['frame_x'], 3), dtype=np.uint8), verbose=False)
+        ajusta_hilos(model, backend, ruta, hilos)
+    return model, 'cpu'
 
-def esta_viendo(observacion):
+def esta_viendo(observacion, cierra_ventana=True):
     x, y = observacion['blob_xy'][0], observacion['blob_xy'][1] 
     if x == -1 or x == 101 or x == 0: 
         return False
     else:
         print('--> HA VISTO')
-        cv2.destroyWindow("YOLO - Telecontrol")
+        # en pipeline.py la ventana de telecontrol es de otro proceso
+        if cierra_ventana:
+            import cv2
+            cv2.destroyWindow("YOLO - Telecontrol")
         return True
 
 def muestra(frame_anotado, titulo, posicion=None):
+    import cv2
     if posicion: 
         cv2.putText(frame_anotado, f"Posicion: {posicion}", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.3, (0, 255, 255), 3)
     cv2.imshow(f"YOLO - {titulo}", frame_anotado)
     cv2.waitKey(1)
 
 def limpia_recursos(camara_webcam, camara_smartphone):
+    import cv2
     print("=== LIMPIANDO RECURSOS ===")
     if camara_webcam is not None:
         camara_webcam.stop()
@@ -56,6 +141,7 @@ def limpia_recursos(camara_webcam, camara_smartphone):
     print("Programa finalizado")
 
 def muestra_doble(frame_webcam, frame_smartphone):
+    import cv2
     frame_webcam_labeled = frame_webcam.copy()
     frame_smartphone_labeled = frame_smartphone.copy()
     